@@ -1,55 +1,23 @@
+import time
+
+STARTED = time.perf_counter()  # for RTH_STARTUP_TIMING
+
 import tkinter as tk
 from tkinter import ttk, messagebox, filedialog
-import yt_dlp
+import hashlib
 import os
-import platform
-import subprocess
 import threading
 from pathlib import Path
-import sys
-from PIL import Image, ImageTk
-
-
-# --- Path Helper for PyInstaller ---
-def resource_path(relative_path):
-    """Get absolute path to resource, works for dev and for PyInstaller."""
-    # During runtime, PyInstaller sets the _MEIPASS attribute
-    # to the path of the temporary folder where bundled files are extracted.
-    base_path = getattr(sys, '_MEIPASS', os.path.dirname(os.path.abspath(__file__)))
-    return os.path.join(base_path, relative_path)
-
-
-# --- Custom Logger for Error Reporting ---
-class YtdlpLogger:
-    """A custom logger to capture yt-dlp errors and warnings for the GUI."""
-
-    def __init__(self):
-        self.failed_downloads = []
-
-    def debug(self, msg):
-        pass
-
-    def warning(self, msg):
-        pass
+import multiprocessing
 
-    def error(self, msg):
-        self.failed_downloads.append(msg)
-
-
-# --- Cross-Platform Downloads Folder Function ---
-def get_download_folder():
-    """Determines the cross-platform default Downloads folder path."""
-    if platform.system() == "Windows":
-        try:
-            import winreg
-            sub_key = r'SOFTWARE\Microsoft\Windows\CurrentVersion\Explorer\Shell Folders'
-            downloads_guid = '{374DE290-123F-4565-9164-39C4925E467B}'
-            with winreg.OpenKey(winreg.HKEY_CURRENT_USER, sub_key) as key:
-                return Path(winreg.QueryValueEx(key, downloads_guid)[0])
-        except Exception:
-            return Path.home() / "Downloads"
-    else:
-        return Path.home() / "Downloads"
+# Heavy modules (yt-dlp via the engine, PIL, the metrics server) are imported after the window
+# is up: the engine on a background thread, PIL only when the resized logo is not cached yet.
+from rth_downloader import (AUDIO_FORMAT_OPTIONS, AUDIO_QUALITY_OPTIONS, VIDEO_QUALITY_OPTIONS, DEFAULT_MAX_WORKERS,
+                            DownloadConfig, FFmpegNotFoundError, get_app_data_dir, get_download_folder,
+                            resource_path, start_toolchain_probe)
+from rth_downloader.progress import (PROGRESS_FPS, TITLE, STATUS, DOWNLOADED, TOTAL, SPEED, ETA,
+                                     ProgressAggregator, format_bytes, format_eta)
+from rth_downloader.urls import extract_urls, normalize_urls, read_url_file
 
 
 # --- Downloader Application Class ---
@@ -59,38 +27,88 @@ class MediaDownloaderApp:
 
         master.title("RonsTechHub YouTube Downloader")
 
-        master.geometry("600x600")
+        master.geometry("600x780")
         self.master.grid_columnconfigure(0, weight=1)
 
         self.default_download_dir = get_download_folder()
-        self.audio_quality_options = ["320k (Best)", "192k (Standard)", "128k (Good)"]
-        self.video_quality_options = ["2160p (4K)", "1440p (2K)", "1080p (FHD)", "720p (HD)", "480p (SD)"]
+        self.audio_quality_options = AUDIO_QUALITY_OPTIONS
+        self.video_quality_options = VIDEO_QUALITY_OPTIONS
 
         self.download_mode_var = tk.StringVar(value="audio")
         self.input_mode_var = tk.StringVar(value="single")
         self.quality_var = tk.StringVar(value=self.audio_quality_options[0])
+        self.audio_format_var = tk.StringVar(value=AUDIO_FORMAT_OPTIONS[0])
         self.status_var = tk.StringVar(value="Ready")
+        self.throughput_var = tk.StringVar(value="")
         self.output_dir_var = tk.StringVar(value=str(self.default_download_dir))
+        self.workers_var = tk.IntVar(value=DEFAULT_MAX_WORKERS)
+        self.skip_archived_var = tk.BooleanVar(value=True)
+        self.rate_limit_var = tk.DoubleVar(value=0)
+        self.connections_var = tk.IntVar(value=1)
 
         self.url_entries = []
-        self.logger = YtdlpLogger()
+        self.batch_urls = []  # canonical, de-duplicated batch; shown in a Listbox (draws only visible rows)
+        self.batch_url_set = set()
+        self.url_entry_var = tk.StringVar()
+        self.url_count_var = tk.StringVar(value="No URLs added yet.")
+        start_toolchain_probe()  # FFmpeg is probed once, off the UI thread, before the first click
+        self.engine = None
+        self.daemon_client = None
+        self.engine_error = None
+        self.engine_ready = threading.Event()
+        threading.Thread(target=self.load_engine, daemon=True).start()
+        self.progress = ProgressAggregator()
+        self.progress_rows = {}
+        self.batch_running = False
+        self.refresh_job = None
 
         self.load_logo()
         self.create_widgets()
+        self.master.after(200, self.offer_resume)
 
-    def load_logo(self):
-        """Loads and resizes the logo image for the application."""
-        logo_filename = "RTH Logo.png"
+    def load_engine(self):
+        """Imports yt-dlp and opens the engine's stores off the UI thread, while the window paints.
 
+        With RTH_DAEMON set (a daemon's socket path, or its host:port, which is authenticated with
+        the daemon.token in the app data folder), the app is a thin client of a shared download
+        daemon instead and never loads yt-dlp itself.
+        """
         try:
-            image_path = resource_path(logo_filename)
-            logo_img = Image.open(image_path)
+            address = os.environ.get("RTH_DAEMON")
+            if address:
+                from rth_downloader.daemon import DaemonClient
+                self.daemon_client = DaemonClient(address, client_name=os.environ.get("USER"))
+                self.daemon_client.jobs()  # fail early if the daemon is not running
+                return
+            from rth_downloader import DownloadEngine
+            self.engine = DownloadEngine()
+            self.start_metrics_server()
+        except Exception as e:
+            print(f"Error loading the download engine: {e}")
+            self.engine_error = e
+            self.daemon_client = None
+        finally:
+            self.engine_ready.set()
 
-            self.icon_img = ImageTk.PhotoImage(logo_img)
+    def start_metrics_server(self):
+        """Serves Prometheus metrics and the profiling toggles if RTH_METRICS_PORT is set."""
+        port = os.environ.get("RTH_METRICS_PORT")
+        if not port:
+            return
+        from rth_downloader.metrics import MetricsServer
+        try:
+            MetricsServer(self.engine.metrics, int(port), self.engine.app_data_dir).start()
+        except (ValueError, OSError) as e:
+            print(f"Metrics server not started: {e}")
 
-            logo_img = logo_img.resize((40, 40), Image.LANCZOS)
-            self.tk_logo = ImageTk.PhotoImage(logo_img)
+    def load_logo(self):
+        """Loads the logo image for the application, using a cached 40x40 copy when there is one."""
+        logo_filename = "RTH Logo.png"
 
+        try:
+            image_path = resource_path(logo_filename)
+            self.icon_img = tk.PhotoImage(file=image_path)  # Tk 8.6 decodes PNG natively
+            self.tk_logo = tk.PhotoImage(file=self.cached_logo(image_path))
             self.master.iconphoto(False, self.icon_img)
 
         except Exception as e:
@@ -98,6 +116,21 @@ class MediaDownloaderApp:
             self.tk_logo = None
             self.icon_img = None
 
+    def cached_logo(self, image_path, size=40):
+        """Returns the path of the logo resized to size x size, resizing it (with PIL) only once.
+
+        The cache is keyed by the logo's content, since a one-file build unpacks it anew (with a
+        new modification time) on every start.
+        """
+        digest = hashlib.sha1(Path(image_path).read_bytes()).hexdigest()[:12]
+        cache_path = get_app_data_dir() / f"logo-{size}-{digest}.png"
+        if not cache_path.exists():
+            from PIL import Image
+            temp_path = cache_path.with_suffix('.tmp')
+            Image.open(image_path).resize((size, size), Image.LANCZOS).save(temp_path, format='PNG')
+            os.replace(temp_path, cache_path)
+        return cache_path
+
     def create_widgets(self):
         # --- APP TITLE AND LOGO ---
         title_frame = ttk.Frame(self.master)
@@ -154,6 +187,26 @@ class MediaDownloaderApp:
                                            *self.audio_quality_options)
         self.quality_menu.grid(row=0, column=1, padx=5)
 
+        ttk.Label(quality_frame, text="Parallel downloads:").grid(row=0, column=2, padx=(15, 5), sticky='w')
+        ttk.Spinbox(quality_frame, from_=1, to=16, width=4, textvariable=self.workers_var).grid(row=0, column=3, padx=5)
+
+        ttk.Checkbutton(quality_frame, text="Skip already downloaded", variable=self.skip_archived_var).grid(
+            row=1, column=0, columnspan=2, padx=5, pady=(5, 0), sticky='w')
+
+        ttk.Label(quality_frame, text="Speed limit (MB/s, 0 = off):").grid(row=1, column=2, padx=(15, 5),
+                                                                           pady=(5, 0), sticky='w')
+        ttk.Spinbox(quality_frame, from_=0, to=1000, increment=0.5, width=6, textvariable=self.rate_limit_var).grid(
+            row=1, column=3, padx=5, pady=(5, 0))
+
+        ttk.Label(quality_frame, text="Audio format:").grid(row=2, column=0, padx=5, pady=(5, 0), sticky='w')
+        ttk.OptionMenu(quality_frame, self.audio_format_var, self.audio_format_var.get(),
+                       *AUDIO_FORMAT_OPTIONS).grid(row=2, column=1, padx=5, pady=(5, 0), sticky='w')
+
+        ttk.Label(quality_frame, text="Connections per large file:").grid(row=2, column=2, padx=(15, 5),
+                                                                          pady=(5, 0), sticky='w')
+        ttk.Spinbox(quality_frame, from_=1, to=16, width=6, textvariable=self.connections_var).grid(
+            row=2, column=3, padx=5, pady=(5, 0))
+
         # --- 5. OUTPUT FOLDER SELECTION ---
         output_frame = ttk.LabelFrame(main_controls_frame, text="Output Directory")
         output_frame.grid(row=current_row, column=0, pady=10, padx=10, sticky='ew')
@@ -173,6 +226,26 @@ class MediaDownloaderApp:
         ttk.Label(self.master, textvariable=self.status_var, font=('Arial', 10, 'bold'), wraplength=580,
                   justify=tk.LEFT).grid(row=current_row, column=0, pady=5, padx=10, sticky='ew')
         current_row += 1
+        ttk.Label(self.master, textvariable=self.throughput_var).grid(row=current_row, column=0, padx=10, sticky='w')
+        current_row += 1
+
+        # --- 7. PER-ITEM PROGRESS TABLE ---
+        progress_frame = ttk.Frame(self.master)
+        progress_frame.grid(row=current_row, column=0, pady=5, padx=10, sticky='nsew')
+        progress_frame.grid_columnconfigure(0, weight=1)
+        progress_frame.grid_rowconfigure(0, weight=1)
+        self.master.grid_rowconfigure(current_row, weight=1)
+        current_row += 1
+
+        self.progress_table = ttk.Treeview(progress_frame, columns=('status', 'progress', 'speed', 'eta'), height=6)
+        for column, heading, width in (('#0', "Item", 240), ('status', "Status", 100), ('progress', "Progress", 80),
+                                       ('speed', "Speed", 80), ('eta', "ETA", 60)):
+            self.progress_table.heading(column, text=heading)
+            self.progress_table.column(column, width=width, stretch=column == '#0')
+        self.progress_table.grid(row=0, column=0, sticky='nsew')
+        scrollbar = ttk.Scrollbar(progress_frame, orient=tk.VERTICAL, command=self.progress_table.yview)
+        scrollbar.grid(row=0, column=1, sticky='ns')
+        self.progress_table.configure(yscrollcommand=scrollbar.set)
         ttk.Label(self.master, text=f"Default Folder: {self.default_download_dir.name}").grid(row=current_row, column=0,
                                                                                               pady=(0, 10))
 
@@ -202,9 +275,38 @@ class MediaDownloaderApp:
         self.url_entries = []
 
         if self.input_mode_var.get() == "single":
-            self.add_url_entry()
-            ttk.Label(self.input_container, text="Paste URLs one by one:").grid(row=0, column=0, sticky='w',
-                                                                                pady=(5, 0), padx=5)
+            ttk.Label(self.input_container, text="Paste one or many URLs, or import a .txt/.csv/.json file:").grid(
+                row=0, column=0, sticky='w', pady=(5, 0), padx=5)
+
+            entry_row = ttk.Frame(self.input_container)
+            entry_row.grid(row=1, column=0, pady=5, padx=5, sticky='ew')
+            entry_row.grid_columnconfigure(0, weight=1)
+            entry = ttk.Entry(entry_row, textvariable=self.url_entry_var)
+            entry.grid(row=0, column=0, sticky='ew')
+            entry.bind('<Return>', self.add_entered_urls)
+            entry.bind('<<Paste>>', self.paste_urls)
+            ttk.Button(entry_row, text="Add", command=self.add_entered_urls).grid(row=0, column=1, padx=(5, 0))
+            ttk.Button(entry_row, text="Import File...", command=self.import_url_file).grid(row=0, column=2,
+                                                                                           padx=(5, 0))
+
+            list_frame = ttk.Frame(self.input_container)
+            list_frame.grid(row=2, column=0, padx=5, sticky='ew')
+            list_frame.grid_columnconfigure(0, weight=1)
+            self.url_listbox = tk.Listbox(list_frame, height=5, selectmode=tk.EXTENDED, activestyle='none')
+            self.url_listbox.grid(row=0, column=0, sticky='ew')
+            url_scrollbar = ttk.Scrollbar(list_frame, orient=tk.VERTICAL, command=self.url_listbox.yview)
+            url_scrollbar.grid(row=0, column=1, sticky='ns')
+            self.url_listbox.configure(yscrollcommand=url_scrollbar.set)
+            self.url_listbox.bind('<Delete>', self.remove_selected_urls)
+            if self.batch_urls:
+                self.url_listbox.insert('end', *self.batch_urls)
+
+            list_buttons = ttk.Frame(self.input_container)
+            list_buttons.grid(row=3, column=0, pady=(5, 0), padx=5, sticky='ew')
+            list_buttons.grid_columnconfigure(0, weight=1)
+            ttk.Label(list_buttons, textvariable=self.url_count_var).grid(row=0, column=0, sticky='w')
+            ttk.Button(list_buttons, text="Remove Selected", command=self.remove_selected_urls).grid(row=0, column=1)
+            ttk.Button(list_buttons, text="Clear All", command=self.clear_urls).grid(row=0, column=2, padx=(5, 0))
         else:  # playlist mode
             var = tk.StringVar()
             entry = ttk.Entry(self.input_container, textvariable=var)
@@ -213,32 +315,79 @@ class MediaDownloaderApp:
             ttk.Label(self.input_container, text="Paste single Playlist/Channel URL:").grid(row=0, column=0, sticky='w',
                                                                                             pady=(5, 0), padx=5)
 
-    def add_url_entry(self, *args):
-        """Dynamically adds a new URL input box when the last one is edited."""
-
-        current_rows = len(self.input_container.winfo_children())
-
-        last_entry_var = self.url_entries[-1] if self.url_entries else None
+    # --- Batch URL List ---
+
+    def add_urls(self, urls):
+        """Normalizes, de-duplicates and appends URLs to the batch list in a single pass."""
+        new_urls, duplicates = normalize_urls(urls, known=self.batch_url_set)
+        self.batch_urls.extend(new_urls)
+        self.batch_url_set.update(new_urls)
+        if new_urls:
+            self.url_listbox.insert('end', *new_urls)
+            self.url_listbox.see('end')
+
+        note = f" ({duplicates} duplicate(s) skipped)" if duplicates else ""
+        self.url_count_var.set(f"{len(self.batch_urls)} URL(s) in batch{note}")
+
+    def add_entered_urls(self, *args):
+        """Moves whatever was typed or pasted into the entry box into the batch list."""
+        urls = extract_urls(self.url_entry_var.get())
+        if urls:
+            self.add_urls(urls)
+            self.url_entry_var.set("")
+
+    def paste_urls(self, event):
+        """Adds every URL on the clipboard at once, so a multi-line paste does not end up in one line."""
+        try:
+            urls = extract_urls(self.master.clipboard_get())
+        except tk.TclError:
+            return None
+        if not urls:
+            return None  # not URLs; let the entry paste the text normally
+        self.add_urls(urls)
+        return "break"
 
-        if last_entry_var and last_entry_var.get().strip() == "":
+    def import_url_file(self):
+        path = filedialog.askopenfilename(filetypes=[("URL lists", "*.txt *.csv *.json"), ("All files", "*.*")])
+        if not path:
             return
+        try:
+            urls = read_url_file(path)
+        except (OSError, ValueError) as e:
+            messagebox.showerror("Error", f"Could not read {Path(path).name}: {e}")
+            return
+        if not urls:
+            messagebox.showinfo("Import URLs", f"No URLs found in {Path(path).name}.")
+            return
+        self.add_urls(urls)
 
-        var = tk.StringVar()
-        entry = ttk.Entry(self.input_container, textvariable=var)
-
-        entry.grid(row=current_rows, column=0, pady=5, padx=5, sticky='ew')
-
-        entry.bind('<KeyRelease>', self.add_url_entry)
-        self.url_entries.append(var)
-        self.master.update_idletasks()
+    def remove_selected_urls(self, *args):
+        selected = set(self.url_listbox.curselection())
+        if not selected:
+            return
+        for index in sorted(selected, reverse=True):
+            self.url_listbox.delete(index)
+        self.batch_urls = [url for index, url in enumerate(self.batch_urls) if index not in selected]
+        self.batch_url_set = set(self.batch_urls)
+        self.url_count_var.set(f"{len(self.batch_urls)} URL(s) in batch")
+
+    def clear_urls(self):
+        self.url_listbox.delete(0, 'end')
+        self.batch_urls = []
+        self.batch_url_set = set()
+        self.url_count_var.set("No URLs added yet.")
 
     # --- Downloader Execution Methods (The Fix is Here) ---
 
     def start_download_thread(self):
         """Collects all URLs and starts the download process in a separate thread."""
 
-        urls = [v.get().strip() for v in self.url_entries]
-        urls = [url for url in urls if url]
+        if self.input_mode_var.get() == "single":
+            self.add_entered_urls()
+            urls = list(self.batch_urls)
+        else:
+            urls = [v.get().strip() for v in self.url_entries]
+            urls = [url for url in urls if url]
 
         output_dir = self.output_dir_var.get()
         if not output_dir or not Path(output_dir).is_dir():
@@ -249,129 +398,176 @@ class MediaDownloaderApp:
             messagebox.showerror("Error", "Please enter at least one URL.")
             return
 
-        self.logger = YtdlpLogger()
-
         self.download_button.config(state=tk.DISABLED)
         self.status_var.set(f"Starting download of {len(urls)} item(s)...")
+        self.start_progress_refresh()
 
         download_thread = threading.Thread(target=self.download_media, args=(urls, output_dir))
         download_thread.start()
 
-    def download_media(self, urls, output_dir):
-        """Core download logic using yt-dlp."""
-        mode = self.download_mode_var.get()
-        is_playlist = self.input_mode_var.get() == "playlist"
-        selected_quality = self.quality_var.get().split(' ')[0]
-
-        # --- FIX: Explicitly check for and reference bundled FFmpeg ---
-        ffmpeg_path = resource_path("ffmpeg.exe")
-        ffprobe_path = resource_path("ffprobe.exe")
+    def offer_resume(self):
+        """Offers to resume a batch that was interrupted by closing the app or a crash."""
+        if not self.engine_ready.is_set():
+            self.master.after(100, self.offer_resume)
+            return
+        if self.engine is None:
+            return  # no engine of our own (failed, or a daemon resumes its own batches)
+        batch = self.engine.job_store.latest_unfinished_batch()
+        if not batch:
+            return
 
-        ffmpeg_found = False
-        try:
-            # First, check if the bundled version exists
-            if Path(ffmpeg_path).exists() and Path(ffprobe_path).exists():
-                # If they exist, we assume the bundling was successful.
-                # We skip the system PATH check, as we will use the explicit path below.
-                ffmpeg_found = True
-            else:
-                # If the bundled version is not found, check system PATH as a fallback
-                # (useful when running the script directly, not as an EXE)
-                subprocess.run(['ffmpeg', '-version'], check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
-                ffmpeg_found = True
-        except (subprocess.CalledProcessError, FileNotFoundError):
-            # If neither the bundled version nor the system PATH version is found
-            self.master.after(0, lambda: messagebox.showerror("Error",
-                                                              "FFmpeg is required but not found. Please ensure FFmpeg is in your system's PATH, or that the --add-binary commands for PyInstaller were correct."))
-            self.master.after(0, lambda: self.download_button.config(state=tk.NORMAL))
-            self.status_var.set("Error: FFmpeg not found")
+        config_data, _ = self.engine.job_store.load_batch(batch['id'])
+        partial_mb = batch['partial'] / (1024 * 1024)
+        if not messagebox.askyesno(
+                "Resume Downloads",
+                f"A previous batch did not finish: {batch['remaining']} item(s) remaining "
+                f"({partial_mb:.1f} MB already downloaded).\n\nResume it now?"):
+            self.engine.discard(batch['id'])
             return
 
-        # --- yt-dlp Options Configuration ---
-        ydl_opts = {
-            'outtmpl': str(Path(output_dir) / '%(title)s.%(ext)s'),
-            'keep_intermediate_files': False,
-            'ignoreerrors': True,
-            'progress_hooks': [self.hook],
-            'logger': self.logger,
-            'noplaylist': not is_playlist,
-        }
-
-        # --- CRITICAL FIX: Only set executables if the bundled files exist ---
-        if Path(ffmpeg_path).exists() and Path(ffprobe_path).exists():
-            ydl_opts['executables'] = {
-                'postprocessor': ffmpeg_path,
-                'downloader': ffmpeg_path,
-            }
-
-        if mode == "audio":
-            ydl_opts.update({
-                'format': 'bestaudio/best',
-                'postprocessors': [{
-                    'key': 'FFmpegExtractAudio',
-                    'preferredcodec': 'mp3',
-                    'preferredquality': selected_quality,
-                }],
-            })
-
-        else:  # Video mode
-            target_res = int(selected_quality.replace('p', ''))
-
-            ydl_opts.update({
-                'format': f'bestvideo[height<={target_res}]+bestaudio/best',
-            })
+        output_dir = config_data['output_dir']
+        self.download_button.config(state=tk.DISABLED)
+        self.status_var.set(f"Resuming {batch['remaining']} item(s)...")
+        self.start_progress_refresh()
+        threading.Thread(target=self.run_batch, args=(
+            lambda: self.engine.resume(batch['id'], monitor=self.progress), output_dir)).start()
 
+    def download_media(self, urls, output_dir):
+        """Runs the shared download engine with the settings currently selected in the GUI."""
         try:
-            with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-                ydl.download(urls)
-
-            if self.logger.failed_downloads:
-                num_failed = len(self.logger.failed_downloads)
-                total_items = len(urls)
-
-                error_details = "\n\nFailed Items Summary:\n" + "\n".join(self.logger.failed_downloads[:5])
+            max_workers = self.workers_var.get()
+        except tk.TclError:
+            max_workers = DEFAULT_MAX_WORKERS
+        try:
+            rate_limit = self.rate_limit_var.get() * 1024 * 1024
+        except tk.TclError:
+            rate_limit = None
+        try:
+            connections = self.connections_var.get()
+        except tk.TclError:
+            connections = 1
+
+        config = DownloadConfig(urls, output_dir, mode=self.download_mode_var.get(),
+                                quality=self.quality_var.get(), playlist=self.input_mode_var.get() == "playlist",
+                                max_workers=max_workers, skip_archived=self.skip_archived_var.get(),
+                                rate_limit=rate_limit, connections=connections,
+                                audio_format=self.audio_format_var.get())
+
+        if config.playlist:
+            self.master.after(0, lambda: self.status_var.set("Resolving playlist entries..."))
+        self.run_batch(lambda: (self.daemon_client or self.engine).run(config, monitor=self.progress), output_dir)
+
+    def run_batch(self, run, output_dir):
+        """Runs one engine batch (new or resumed) and reports the outcome in the GUI."""
+        try:
+            self.engine_ready.wait()  # only the first click right after start-up can get here early
+            if self.engine is None and self.daemon_client is None:
+                raise self.engine_error
+            result = run()
+
+            failed_records = result.failed_records
+            skipped_note = f" ({len(result.skipped)} already downloaded, skipped)" if result.skipped else ""
+            if result.linked_records:
+                skipped_note += (f" ({len(result.linked_records)} linked to existing copies, "
+                                 f"{result.bytes_saved / (1024 * 1024):.0f} MB saved)")
+
+            if failed_records:
+                num_failed = len(failed_records)
+                total_items = result.total
+                succeeded = result.succeeded
+
+                error_details = "\n\nFailed Items Summary:\n" + "\n".join(
+                    f"[{record.error_class}] {record.error}" for record in failed_records[:5])
                 if num_failed > 5:
                     error_details += f"\n... and {num_failed - 5} more errors."
 
                 self.master.after(0, lambda: self.status_var.set(
-                    f"Download Finished! {total_items - num_failed}/{total_items} succeeded."))
+                    f"Download Finished! {succeeded}/{total_items} succeeded.{skipped_note}"))
                 self.master.after(0, lambda: messagebox.showwarning("Download Complete with Errors",
-                                                                    f"Successfully downloaded {total_items - num_failed} items.\n{num_failed} items failed to download or process." + error_details))
+                                                                    f"Successfully downloaded {succeeded} items.\n{num_failed} items failed to download or process." + error_details))
             else:
-                self.master.after(0,
-                                  lambda: self.status_var.set(f"Download Complete! Saved to {Path(output_dir).name}"))
+                self.master.after(0, lambda: self.status_var.set(
+                    f"Download Complete! Saved to {Path(output_dir).name}{skipped_note}"))
                 self.master.after(0, lambda: messagebox.showinfo("Success",
                                                                  f"All media downloaded successfully to: {output_dir}"))
 
+        except FFmpegNotFoundError as e:
+            # 'e' is unbound once the except block ends, before the deferred callbacks run.
+            msg = str(e)
+            self.master.after(0, lambda: messagebox.showerror("Error", msg))
+            self.master.after(0, lambda: self.status_var.set("Error: FFmpeg not found"))
+
         except Exception as e:
-            self.master.after(0, lambda: self.status_var.set(f"Critical Error: {e}"))
-            self.master.after(0, lambda: messagebox.showerror("Critical Error", f"A critical error occurred: {e}"))
+            msg = str(e)
+            self.master.after(0, lambda: self.status_var.set(f"Critical Error: {msg}"))
+            self.master.after(0, lambda: messagebox.showerror("Critical Error", f"A critical error occurred: {msg}"))
 
         finally:
+            self.master.after(0, self.stop_progress_refresh)
             self.master.after(0, lambda: self.download_button.config(state=tk.NORMAL))
 
-    def hook(self, d):
-        """Progress hook function to update the GUI status with title, speed, and ETA."""
-        if d['status'] == 'downloading':
-            percent_str = d.get('_percent_str', 'N/A')
-            speed_str = d.get('_speed_str', 'N/A')
-            eta_str = d.get('_eta_str', 'N/A')
-
-            title = d.get('info_dict', {}).get('title', 'Current Item')
+    # --- Progress Display (sampled at PROGRESS_FPS, not per yt-dlp callback) ---
+
+    def start_progress_refresh(self):
+        """Clears the progress table and starts sampling the progress aggregator."""
+        self.progress.clear()
+        self.progress_table.delete(*self.progress_table.get_children())
+        self.progress_rows = {}
+        self.throughput_var.set("")
+        self.batch_running = True
+        self.refresh_progress()
+
+    def stop_progress_refresh(self):
+        self.batch_running = False
+        self.refresh_progress()
+
+    def refresh_progress(self):
+        """Applies the items changed since the last frame to the table and updates the totals line."""
+        started = time.perf_counter()
+        if self.refresh_job:
+            self.master.after_cancel(self.refresh_job)
+            self.refresh_job = None
+
+        for url, record in self.progress.changes():
+            if record[TOTAL]:
+                progress_text = f"{100 * record[DOWNLOADED] / record[TOTAL]:.1f}%"
+            else:
+                progress_text = format_bytes(record[DOWNLOADED])
+            speed_text = f"{format_bytes(record[SPEED])}/s" if record[SPEED] else ""
+            values = (record[STATUS], progress_text, speed_text, format_eta(record[ETA]))
 
-            status_text = f"Downloading: '{title}' - {percent_str} at {speed_str} (ETA: {eta_str})"
-            self.master.after(0, lambda: self.status_var.set(status_text))
+            row = self.progress_rows.get(url)
+            if row is None:
+                self.progress_rows[url] = self.progress_table.insert('', 'end', text=record[TITLE], values=values)
+            else:
+                self.progress_table.item(row, text=record[TITLE], values=values)
 
-        elif d['status'] == 'finished':
-            title = d.get('info_dict', {}).get('title', 'Current Item')
-            self.master.after(0, lambda: self.status_var.set(f"Post-processing: '{title}' (Conversion/Merging)..."))
+        totals = self.progress.totals()
+        if totals['total']:
+            counts = totals['counts']
+            self.throughput_var.set(
+                f"{counts['done']}/{totals['total']} done, {counts['failed']} failed, "
+                f"{counts['downloading']} downloading, {counts['retrying']} retrying, {counts['paused']} paused, "
+                f"{counts['post-processing']} converting  |  "
+                f"{format_bytes(totals['speed'])}/s  |  ETA {format_eta(totals['eta'])}")
 
-        elif d['status'] == 'error':
-            self.master.after(0, lambda: self.status_var.set(f"Download Error: {d['error']}"))
+        if self.engine is not None:
+            self.engine.metrics.observe('ui_refresh', time.perf_counter() - started)
+        if self.batch_running:
+            self.refresh_job = self.master.after(1000 // PROGRESS_FPS, self.refresh_progress)
 
 
 # --- Run the Application ---
 if __name__ == "__main__":
+    multiprocessing.freeze_support()
     root = tk.Tk()
     app = MediaDownloaderApp(root)
+    if os.environ.get("RTH_STARTUP_TIMING"):
+        # Prints the time to the first paint; 'exit' closes the window right after (see benchmarks/bench_startup.py).
+        def report_first_paint():
+            print(f"First paint after {(time.perf_counter() - STARTED) * 1000:.0f} ms", flush=True)
+            if os.environ["RTH_STARTUP_TIMING"] == "exit":
+                root.destroy()
+
+        root.after_idle(lambda: root.after(0, report_first_paint))
     root.mainloop()
\ No newline at end of file
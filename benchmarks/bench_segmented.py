@@ -0,0 +1,88 @@
+"""Benchmark: single-file throughput of SegmentedDownloader against a throttled local server.
+
+Serves one synthetic file from a local server that supports Range requests and caps every
+connection at a fixed rate (standing in for per-connection throttling on a CDN), then downloads
+it with an increasing number of connections and reports MB/s for each.
+
+Usage:
+    python benchmarks/bench_segmented.py --size-mb 64 --per-connection-mb 4 --connections 1,2,4,8
+"""
+import argparse
+import os
+import re
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from rth_downloader.segmented import SegmentedDownloader  # noqa: E402
+
+CHUNK_SIZE = 64 * 1024
+
+
+def make_handler(payload, rate):
+    class RangeHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_GET(self):
+            start, end = 0, len(payload) - 1
+            match = re.match(r"bytes=(\d+)-(\d*)", self.headers.get("Range") or "")
+            if match:
+                start = int(match.group(1))
+                end = min(int(match.group(2)), end) if match.group(2) else end
+                self.send_response(206)
+                self.send_header("Content-Range", f"bytes {start}-{end}/{len(payload)}")
+            else:
+                self.send_response(200)
+            self.send_header("Accept-Ranges", "bytes")
+            self.send_header("Content-Type", "video/mp4")
+            self.send_header("Content-Length", str(end - start + 1))
+            self.end_headers()
+
+            for offset in range(start, end + 1, CHUNK_SIZE):
+                chunk = payload[offset:min(offset + CHUNK_SIZE, end + 1)]
+                self.wfile.write(chunk)
+                time.sleep(len(chunk) / rate)
+
+        def log_message(self, *args):
+            pass
+
+    return RangeHandler
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--size-mb", type=int, default=64)
+    parser.add_argument("--per-connection-mb", type=float, default=4.0, help="MB/s the server allows per connection")
+    parser.add_argument("--connections", default="1,2,4,8")
+    args = parser.parse_args()
+
+    payload = os.urandom(args.size_mb * 1024 * 1024)
+    server = ThreadingHTTPServer(("127.0.0.1", 0), make_handler(payload, args.per_connection_mb * 1024 * 1024))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_address[1]}/media.mp4"
+
+    print(f"{'conns':>6} {'seconds':>9} {'MB/s':>8} {'speed-up':>9} {'intact':>7}")
+    baseline = None
+    try:
+        for connections in [int(c) for c in args.connections.split(",")]:
+            with tempfile.TemporaryDirectory() as output_dir:
+                dest = Path(output_dir) / "media.mp4"
+                start = time.perf_counter()
+                SegmentedDownloader(connections).download(url, dest)
+                elapsed = time.perf_counter() - start
+                intact = dest.read_bytes() == payload
+            baseline = baseline or elapsed
+            print(f"{connections:>6} {elapsed:>9.2f} {args.size_mb / elapsed:>8.2f} {baseline / elapsed:>8.2f}x "
+                  f"{'yes' if intact else 'NO':>7}")
+    finally:
+        server.shutdown()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,147 @@
+"""Benchmark: connection reuse of the shared DownloadSession against a local HTTPS stand-in.
+
+Serves small watch pages with an embedded <video> over HTTPS (self-signed certificate made
+with the openssl CLI) and delays every new connection by two simulated round trips before
+its TLS handshake, then downloads a few batches through DownloadWorkerPool with and without
+a shared session. Connections and requests are counted on the server side.
+
+Keep-alive needs yt-dlp's 'requests' handler (pip install "yt-dlp[default]").
+
+Usage:
+    python benchmarks/bench_session.py --items 20 --batches 3 --rtt 0.05 --workers 4
+"""
+import argparse
+import os
+import ssl
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from rth_downloader.pool import DownloadWorkerPool  # noqa: E402
+from rth_downloader.session import DownloadSession  # noqa: E402
+
+
+class Counters:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.connections = 0
+        self.requests = 0
+
+
+def make_certificate(directory):
+    cert, key = Path(directory) / "cert.pem", Path(directory) / "key.pem"
+    subprocess.run(["openssl", "req", "-x509", "-newkey", "rsa:2048", "-nodes", "-days", "1", "-subj", "/CN=localhost",
+                    "-keyout", str(key), "-out", str(cert)], check=True, stdout=subprocess.DEVNULL,
+                   stderr=subprocess.DEVNULL)
+    return cert, key
+
+
+def make_server(payload, rtt, context, counters):
+    class MediaHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def _body(self):
+            with counters.lock:
+                counters.requests += 1
+            name = self.path.rsplit("/", 1)[-1]
+            if self.path.startswith("/watch/"):
+                page = f'<html><head><title>{name}</title></head><body><video src="/media/{name}.mp4"></video></body></html>'
+                return "text/html; charset=utf-8", page.encode()
+            return "video/mp4", payload
+
+        def _send(self, include_body):
+            content_type, body = self._body()
+            self.send_response(200)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            if include_body:
+                self.wfile.write(body)
+
+        def do_HEAD(self):
+            self._send(False)
+
+        def do_GET(self):
+            self._send(True)
+
+        def log_message(self, *args):
+            pass
+
+    class TLSServer(ThreadingHTTPServer):
+        daemon_threads = True
+
+        def finish_request(self, request, client_address):
+            with counters.lock:
+                counters.connections += 1
+            time.sleep(2 * rtt)  # TCP + TLS round trips a real CDN connection would cost
+            try:
+                request = context.wrap_socket(request, server_side=True)
+            except (ssl.SSLError, OSError):
+                return
+            super().finish_request(request, client_address)
+
+        def handle_error(self, request, client_address):
+            pass  # clients dropping idle keep-alive connections
+
+    return TLSServer(("127.0.0.1", 0), MediaHandler)
+
+
+def run_batches(base, args, session, tag):
+    ydl_opts = {'ignoreerrors': True, 'quiet': True, 'noprogress': True, 'format': 'best',
+                'nocheckcertificate': True}
+    start = time.perf_counter()
+    for batch in range(args.batches):
+        urls = [f"{base}/watch/{tag}-{batch}-{i}" for i in range(args.items)]
+        with tempfile.TemporaryDirectory() as output_dir:
+            opts = dict(ydl_opts, outtmpl=str(Path(output_dir) / '%(id)s.%(ext)s'))
+            DownloadWorkerPool(opts, max_workers=args.workers, session=session).run(urls)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--items", type=int, default=20, help="items per batch")
+    parser.add_argument("--batches", type=int, default=3)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--size-kb", type=int, default=64)
+    parser.add_argument("--rtt", type=float, default=0.05, help="simulated round-trip time in seconds")
+    args = parser.parse_args()
+
+    counters = Counters()
+    with tempfile.TemporaryDirectory() as cert_dir:
+        context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+        context.load_cert_chain(*make_certificate(cert_dir))
+    server = make_server(os.urandom(args.size_kb * 1024), args.rtt, context, counters)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f"https://localhost:{server.server_address[1]}"
+
+    print(f"{'session':>8} {'seconds':>9} {'requests':>9} {'conns':>7} {'reused':>7}")
+    session = None
+    try:
+        for name in ("none", "shared"):
+            if name == "shared":
+                session = DownloadSession()
+            before = (counters.requests, counters.connections)
+            elapsed = run_batches(base, args, session, name)
+            requests, connections = counters.requests - before[0], counters.connections - before[1]
+            reused = 1 - connections / requests if requests else 0.0
+            print(f"{name:>8} {elapsed:>9.2f} {requests:>9} {connections:>7} {100 * reused:>6.0f}%")
+    finally:
+        server.shutdown()
+
+    stats = session.stats.snapshot()
+    print(f"shared session: {stats['tls_handshakes']} TLS handshakes averaging "
+          f"{1000 * stats['tls_handshake_time'] / max(1, stats['tls_handshakes']):.1f} ms, "
+          f"~{stats['handshake_time_saved']:.2f}s of handshakes saved, {stats['dns_hits']} DNS cache hits")
+    session.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
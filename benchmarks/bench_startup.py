@@ -0,0 +1,120 @@
+"""Benchmark and regression check: GUI cold-start imports and time to first paint.
+
+Imports the GUI module (without opening a window) under `python -X importtime` and sums the
+import time of everything it pulls in before the window can be drawn. yt-dlp, PIL and the
+other heavy modules must stay out of that path (the engine loads them on a background thread
+once the window is up), so the check fails if any of them is imported eagerly or if the median
+import time exceeds --budget-ms.
+
+With --first-paint the GUI is also started for real (RTH_STARTUP_TIMING=exit makes it print
+the time to its first paint and close); that needs a display.
+
+Usage:
+    python benchmarks/bench_startup.py                 # exit status 1 on a regression
+    python benchmarks/bench_startup.py --runs 10 --budget-ms 150 --first-paint --output startup.json
+"""
+import argparse
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+REPO_DIR = Path(__file__).resolve().parent.parent
+GUI_SCRIPT = REPO_DIR / "RonsTechHub YouTubeDownloader-v02.py"
+DEFERRED_MODULES = ('yt_dlp', 'PIL', 'requests', 'urllib3', 'rth_downloader.engine', 'rth_downloader.metrics')
+DEFAULT_BUDGET_MS = 250
+IMPORT_LINE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \| ( *)(\S+)")
+
+# Loads the GUI module the way `python "<script>"` would, minus the __main__ block that opens the window.
+CHILD_CODE = (
+    "import importlib.util, sys; "
+    f"spec = importlib.util.spec_from_file_location('rth_gui', {str(GUI_SCRIPT)!r}); "
+    "module = importlib.util.module_from_spec(spec); spec.loader.exec_module(module)"
+)
+
+
+def measure_imports():
+    """Imports the GUI module once in a fresh interpreter; returns (total ms, {top-level module: ms}, modules)."""
+    proc = subprocess.run([sys.executable, '-X', 'importtime', '-c', CHILD_CODE], cwd=REPO_DIR,
+                          capture_output=True, text=True)
+    if proc.returncode != 0:
+        raise RuntimeError(f"importing the GUI failed:\n{proc.stderr.strip()[-2000:]}")
+
+    top_level = {}
+    modules = []
+    for line in proc.stderr.splitlines():
+        match = IMPORT_LINE.match(line)
+        if not match:
+            continue
+        _, cumulative, indent, name = match.groups()
+        modules.append(name)
+        if not indent:
+            top_level[name] = int(cumulative) / 1000
+    return sum(top_level.values()), top_level, modules
+
+
+def eager_modules(modules, deferred=DEFERRED_MODULES):
+    """The deferred modules (or their submodules) found among the imported module names."""
+    return [name for name in deferred if any(module == name or module.startswith(name + '.') for module in modules)]
+
+
+def measure_first_paint():
+    """Starts the GUI and returns the milliseconds it reports until its first paint."""
+    env = dict(os.environ, RTH_STARTUP_TIMING="exit")
+    proc = subprocess.run([sys.executable, str(GUI_SCRIPT)], cwd=REPO_DIR, env=env, capture_output=True,
+                          text=True, timeout=120)
+    match = re.search(r"First paint after (\d+) ms", proc.stdout)
+    if not match:
+        raise RuntimeError(f"the GUI did not report its first paint:\n{(proc.stderr or proc.stdout).strip()[-2000:]}")
+    return int(match.group(1))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5, help="cold starts to measure (the median is checked)")
+    parser.add_argument("--budget-ms", type=float, default=DEFAULT_BUDGET_MS,
+                        help=f"fail if the median import time exceeds this (default: {DEFAULT_BUDGET_MS})")
+    parser.add_argument("--first-paint", action="store_true", help="also start the GUI and time its first paint")
+    parser.add_argument("--output", help="write the results as JSON to this file")
+    args = parser.parse_args()
+
+    totals = []
+    for _ in range(max(1, args.runs)):
+        total, top_level, modules = measure_imports()
+        totals.append(total)
+    eager = eager_modules(modules)
+
+    results = {
+        'import_ms_median': round(statistics.median(totals), 1),
+        'import_ms_runs': [round(total, 1) for total in totals],
+        'budget_ms': args.budget_ms,
+        'slowest_imports_ms': {name: round(ms, 1) for name, ms in
+                               sorted(top_level.items(), key=lambda item: -item[1])[:10]},
+        'eager_heavy_modules': eager,
+    }
+    if args.first_paint:
+        paints = [measure_first_paint() for _ in range(max(1, args.runs))]
+        results['first_paint_ms_median'] = statistics.median(paints)
+        results['first_paint_ms_runs'] = paints
+
+    text = json.dumps(results, indent=2)
+    print(text)
+    if args.output:
+        Path(args.output).write_text(text + "\n", encoding='utf-8')
+
+    failed = False
+    if eager:
+        print(f"REGRESSION: imported before the first paint: {', '.join(eager)}", file=sys.stderr)
+        failed = True
+    if results['import_ms_median'] > args.budget_ms:
+        print(f"REGRESSION: start-up imports took {results['import_ms_median']} ms "
+              f"(budget {args.budget_ms} ms)", file=sys.stderr)
+        failed = True
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,175 @@
+"""Benchmark suite: end-to-end scenarios through DownloadEngine against the local mock server.
+
+Each scenario runs in its own child process (so peak RSS is per scenario) with a fresh app
+data directory. The child starts benchmarks/mock_server.py, loads the fake extractor as a
+yt-dlp plugin and calls DownloadEngine.run() with a DownloadConfig, the same path the GUI's
+download_media and the CLI take. Results are printed (or written with --output) as JSON:
+items/s, MB/s, p50/p95 item latency (download + transcode time, seconds), peak RSS in MiB and
+the MB written to disk (raw downloads that were stored plus the finished files).
+
+Scenarios:
+    single_large     one large video over 4 connections (segmented Range download)
+    batch_500        500 small videos
+    playlist_2000    one 2000-entry playlist, expanded while downloading
+    transcode_audio  100 AAC tracks downloaded, then re-encoded to MP3 on the transcode stage
+    stream_audio     the same tracks encoded to MP3 while they download (no raw files on disk)
+    stream_long      one 1-hour track encoded while downloading (memory must not grow with length)
+
+--scale multiplies item counts and file sizes (e.g. 0.1 for a quick smoke run).
+FFmpeg must be available (the engine requires it for every mode).
+
+Usage:
+    python benchmarks/bench_suite.py --output bench.json
+    python benchmarks/bench_suite.py --scenario batch_500,transcode_audio --scale 0.2
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from mock_server import MOCK_PLUGIN_DIR, MockMediaServer  # noqa: E402
+
+MiB = 1024 ** 2
+
+SCENARIOS = {
+    'single_large': {'profile': 'large', 'kind': 'video', 'items': 1, 'size': 256 * MiB, 'connections': 4},
+    'batch_500': {'profile': 'small', 'kind': 'video', 'items': 500, 'size': 256 * 1024},
+    'playlist_2000': {'profile': 'small', 'kind': 'video', 'items': 2000, 'size': 64 * 1024, 'playlist': True},
+    'transcode_audio': {'profile': 'audio', 'kind': 'audio', 'items': 100, 'duration': 30, 'stream': False},
+    'stream_audio': {'profile': 'audio', 'kind': 'audio', 'items': 100, 'duration': 30, 'stream': True},
+    'stream_long': {'profile': 'audio', 'kind': 'audio', 'items': 1, 'duration': 3600, 'stream': True},
+}
+
+
+def percentile(values, fraction):
+    """Nearest-rank percentile of a list of numbers (None if empty)."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    return round(ordered[min(len(ordered) - 1, max(0, round(fraction * len(ordered)) - 1))], 3)
+
+
+def peak_rss_mib(who):
+    """Peak resident set size of this process ('self') or its reaped children ('children')."""
+    try:
+        import resource
+    except ImportError:  # Windows
+        return None
+    usage = resource.getrusage(resource.RUSAGE_SELF if who == 'self' else resource.RUSAGE_CHILDREN)
+    # ru_maxrss is in KiB on Linux and in bytes on macOS
+    return round(usage.ru_maxrss / (MiB if sys.platform == 'darwin' else 1024), 1)
+
+
+def run_scenario(name, scale, workers, latency):
+    """Runs one scenario in this process and returns its metrics."""
+    sys.path.insert(0, str(MOCK_PLUGIN_DIR))  # before the first YoutubeDL loads plugins
+    from rth_downloader.config import DownloadConfig
+    from rth_downloader.engine import DownloadEngine
+    from rth_downloader.toolchain import get_toolchain
+
+    spec = SCENARIOS[name]
+    items = max(1, round(spec['items'] * scale))
+    with tempfile.TemporaryDirectory(prefix="rth-bench-") as scratch:
+        scratch = Path(scratch)
+        (scratch / "media").mkdir()
+        server = MockMediaServer(scratch / "media", latency=latency)
+        if spec['kind'] == 'audio':
+            server.add_audio_profile(spec['profile'], get_toolchain().ffmpeg, spec['duration'])
+        else:
+            server.add_video_profile(spec['profile'], max(1024, int(spec['size'] * scale)))
+
+        with server:
+            if spec.get('playlist'):
+                urls = [server.playlist_url(spec['profile'], items)]
+            else:
+                urls = [server.video_url(spec['profile'], n) for n in range(items)]
+            # Every item of a profile serves the same bytes, so deduplication would link all but the first.
+            config = DownloadConfig(urls, scratch / "out", mode=spec['kind'], playlist=spec.get('playlist', False),
+                                    max_workers=workers, skip_archived=False, connections=spec.get('connections', 1),
+                                    dedup=False, stream_audio=spec.get('stream', False))
+            engine = DownloadEngine(app_data_dir=scratch / "app")
+            start = time.perf_counter()
+            result = engine.run(config)
+            elapsed = time.perf_counter() - start
+            engine.close()
+
+            done = [record for record in result.records if record.status == 'done']
+            written = sum(os.path.getsize(record.path) for record in done
+                          if record.path and os.path.exists(record.path))
+            written += sum(record.downloaded_bytes or 0 for record in done if record.pipeline != 'stream')
+
+    # A streamed item's transcode_time is already part of its download_time.
+    latencies = [(record.download_time or 0) + (0 if record.pipeline == 'stream' else record.transcode_time or 0)
+                 for record in done]
+    downloaded = sum(record.downloaded_bytes or 0 for record in done)
+    return {
+        'items': len(result.records),
+        'succeeded': len(done),
+        'failed': len(result.failed_records),
+        'seconds': round(elapsed, 3),
+        'items_per_s': round(len(done) / elapsed, 2),
+        'mb_per_s': round(downloaded / elapsed / 1e6, 2),
+        'disk_written_mb': round(written / 1e6, 2),
+        'latency_p50': percentile(latencies, 0.50),
+        'latency_p95': percentile(latencies, 0.95),
+        'peak_rss_mib': peak_rss_mib('self'),
+        'peak_child_rss_mib': peak_rss_mib('children'),  # largest child, i.e. FFmpeg
+        'workers': workers,
+        'scale': scale,
+    }
+
+
+def environment():
+    import yt_dlp
+    return {'python': platform.python_version(), 'platform': platform.platform(), 'cpus': os.cpu_count(),
+            'yt_dlp': yt_dlp.version.__version__}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scenario", default=",".join(SCENARIOS), help="comma-separated scenario names")
+    parser.add_argument("--scale", type=float, default=1.0, help="multiplies item counts and file sizes")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--latency", type=float, default=0.02, help="seconds added to every metadata request")
+    parser.add_argument("--output", help="write the JSON report to this file instead of stdout")
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(run_scenario(args.child, args.scale, args.workers, args.latency)))
+        return 0
+
+    names = [name.strip() for name in args.scenario.split(",") if name.strip()]
+    unknown = [name for name in names if name not in SCENARIOS]
+    if unknown:
+        parser.error(f"unknown scenario(s) {', '.join(unknown)} (choose from {', '.join(SCENARIOS)})")
+
+    report = {'environment': environment(), 'scenarios': {}}
+    for name in names:
+        print(f"Running {name}...", file=sys.stderr)
+        child = subprocess.run([sys.executable, __file__, "--child", name, "--scale", str(args.scale),
+                                "--workers", str(args.workers), "--latency", str(args.latency)],
+                               capture_output=True, text=True)
+        if child.returncode:
+            report['scenarios'][name] = {'error': (child.stderr.strip().splitlines() or ['failed'])[-1]}
+        else:
+            report['scenarios'][name] = json.loads(child.stdout.strip().splitlines()[-1])
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        Path(args.output).write_text(text + "\n", encoding="utf-8")
+        print(f"Report written to {args.output}", file=sys.stderr)
+    else:
+        print(text)
+    return 1 if any('error' in scenario for scenario in report['scenarios'].values()) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,91 @@
+"""Benchmark: batch throughput of DownloadWorkerPool against a local HTTP stand-in.
+
+Serves synthetic media files from a local server that adds a fixed per-request latency
+(standing in for extraction round-trips and TCP slow-start), then downloads the same batch
+with an increasing number of workers and reports items/s for each.
+
+Usage:
+    python benchmarks/bench_worker_pool.py --items 40 --latency 0.25 --workers 1,2,4,8
+"""
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from rth_downloader.pool import DownloadWorkerPool  # noqa: E402
+
+
+def make_handler(payload, latency):
+    class MediaHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def _send_headers(self):
+            time.sleep(latency)
+            self.send_response(200)
+            self.send_header("Content-Type", "video/mp4")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+
+        def do_HEAD(self):
+            self._send_headers()
+
+        def do_GET(self):
+            self._send_headers()
+            self.wfile.write(payload)
+
+        def log_message(self, *args):
+            pass
+
+    return MediaHandler
+
+
+def run_batch(urls, workers, output_dir):
+    ydl_opts = {
+        'outtmpl': str(Path(output_dir) / '%(id)s.%(ext)s'),
+        'ignoreerrors': True,
+        'quiet': True,
+        'noprogress': True,
+        'format': 'best',
+    }
+    start = time.perf_counter()
+    results = DownloadWorkerPool(ydl_opts, max_workers=workers).run(urls)
+    elapsed = time.perf_counter() - start
+    failed = sum(1 for errors in results.values() if errors)
+    return elapsed, failed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--items", type=int, default=40)
+    parser.add_argument("--size-kb", type=int, default=256)
+    parser.add_argument("--latency", type=float, default=0.25, help="seconds added to every request")
+    parser.add_argument("--workers", default="1,2,4,8")
+    args = parser.parse_args()
+
+    payload = os.urandom(args.size_kb * 1024)
+    server = ThreadingHTTPServer(("127.0.0.1", 0), make_handler(payload, args.latency))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{server.server_address[1]}"
+
+    print(f"{'workers':>8} {'seconds':>9} {'items/s':>9} {'speed-up':>9} {'failed':>7}")
+    baseline = None
+    try:
+        for workers in [int(w) for w in args.workers.split(",")]:
+            urls = [f"{base}/media/w{workers}-{i}.mp4" for i in range(args.items)]
+            with tempfile.TemporaryDirectory() as output_dir:
+                elapsed, failed = run_batch(urls, workers, output_dir)
+            baseline = baseline or elapsed
+            print(f"{workers:>8} {elapsed:>9.2f} {args.items / elapsed:>9.2f} {baseline / elapsed:>8.2f}x {failed:>7}")
+    finally:
+        server.shutdown()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,122 @@
+"""Mock video site that fails on purpose: HTTP errors, rate limits and dropped media streams.
+
+A FaultInjectingServer is a MockMediaServer with a script of faults, each used up after a
+given number of requests, so retries and resumes can be checked end to end:
+
+    server.add_fault('small_1', status=503, count=2)         # 503 for the first 2 API requests
+    server.add_fault('small_2', status=429, retry_after=1)   # one 429 with 'Retry-After: 1'
+    server.add_fault('flaky.mp4', reset_after=256 * 1024)    # media cut off (TCP reset) at 256 KiB
+
+Faults keyed by a video ID apply to its /api/video request, faults keyed by a file name to
+/media/<file>. Every media request's Range start is kept in range_starts.
+
+    python benchmarks/fault_server.py --port 8766
+serves the 'small' profile with one fault of each kind (printed at start-up).
+"""
+import argparse
+import socket
+import struct
+import sys
+import threading
+from collections import deque
+
+from mock_server import CHUNK_SIZE, MockMediaServer
+
+
+class FaultInjectingServer(MockMediaServer):
+    """MockMediaServer that answers scripted requests with errors or a connection reset."""
+
+    def __init__(self, media_dir=None, latency=0.0, rate=None, port=0):
+        self.faults = {}  # video ID or media file name -> deque of fault dicts
+        self.range_starts = {}  # media file name -> [Range start of each request, 0 without Range]
+        super().__init__(media_dir, latency, rate, port)
+
+    def add_fault(self, target, status=None, retry_after=None, reset_after=None, count=1):
+        """Fails the next count requests for target with status (and Retry-After), or resets
+        a media response after reset_after bytes of its body."""
+        fault = {'status': status, 'retry_after': retry_after, 'reset_after': reset_after}
+        with self._lock:
+            self.faults.setdefault(target, deque()).extend([fault] * count)
+
+    def _take_fault(self, target):
+        with self._lock:
+            faults = self.faults.get(target)
+            return faults.popleft() if faults else None
+
+    def _make_handler(self):
+        server = self
+        base_handler = super()._make_handler()
+
+        class FaultHandler(base_handler):
+            def _send_api(self, path):
+                fault = server._take_fault(path.rsplit("/", 1)[-1])
+                if fault is None or fault['status'] is None:
+                    super()._send_api(path)
+                    return
+                self._send_status(fault)
+
+            def _send_media(self, path):
+                start = self.headers.get("Range", "bytes=0-").removeprefix("bytes=").split("-")[0]
+                with server._lock:
+                    server.range_starts.setdefault(path.name, []).append(int(start or 0))
+                fault = server._take_fault(path.name)
+                if fault is None:
+                    super()._send_media(path)
+                elif fault['status'] is not None:
+                    self._send_status(fault)
+                else:
+                    self._send_reset(path, fault['reset_after'])
+
+            def _send_status(self, fault):
+                self.send_response(fault['status'])
+                if fault['retry_after'] is not None:
+                    self.send_header("Retry-After", str(fault['retry_after']))
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+
+            def _send_reset(self, path, reset_after):
+                """Promises the whole file, sends reset_after bytes of it, then resets the connection."""
+                self.send_response(200)
+                self.send_header("Accept-Ranges", "bytes")
+                self.send_header("Content-Length", str(path.stat().st_size))
+                self.end_headers()
+                with open(path, "rb") as f:
+                    remaining = reset_after
+                    while remaining > 0:
+                        chunk = f.read(min(CHUNK_SIZE, remaining))
+                        remaining -= len(chunk)
+                        self.wfile.write(chunk)
+                self.wfile.flush()
+                # SO_LINGER with a zero timeout makes close() send RST instead of FIN.
+                self.connection.setsockopt(socket.SOL_SOCKET, socket.SO_LINGER, struct.pack("ii", 1, 0))
+                self.close_connection = True
+
+        return FaultHandler
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--port", type=int, default=8766)
+    parser.add_argument("--size-mb", type=float, default=1.0, help="size of the 'small' video profile")
+    args = parser.parse_args()
+
+    server = FaultInjectingServer(port=args.port)
+    server.add_video_profile("small", int(args.size_mb * 1024 ** 2))
+    server.add_video_profile("flaky", int(args.size_mb * 1024 ** 2))
+    server.add_fault("small_1", status=503, count=2)
+    server.add_fault("small_2", status=429, retry_after=2)
+    server.add_fault("flaky.mp4", reset_after=int(args.size_mb * 1024 ** 2) // 2)
+    with server:
+        print(f"Serving at {server.base_url} (Ctrl+C to stop)")
+        print(f"  {server.video_url('small', 1)}   503 twice, then OK")
+        print(f"  {server.video_url('small', 2)}   429 with Retry-After: 2 once, then OK")
+        print(f"  {server.video_url('flaky', 1)}   media reset half-way once, then OK")
+        try:
+            threading.Event().wait()
+        except KeyboardInterrupt:
+            pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,26 @@
+"""yt-dlp extractors for benchmarks/mock_server.py (loaded as a yt-dlp plugin)."""
+from yt_dlp.extractor.common import InfoExtractor
+
+MOCK_HOST = r'https?://(?P<base>(?:127\.0\.0\.1|localhost):\d+)'
+
+
+class RthMockIE(InfoExtractor):
+    IE_NAME = 'rthmock'
+    _VALID_URL = MOCK_HOST + r'/watch\?v=(?P<id>\w+)'
+
+    def _real_extract(self, url):
+        base, video_id = self._match_valid_url(url).group('base', 'id')
+        return self._download_json(f'http://{base}/api/video/{video_id}', video_id)
+
+
+class RthMockPlaylistIE(InfoExtractor):
+    IE_NAME = 'rthmock:playlist'
+    _VALID_URL = MOCK_HOST + r'/playlist\?list=(?P<id>\w+)'
+
+    def _real_extract(self, url):
+        base, playlist_id = self._match_valid_url(url).group('base', 'id')
+        playlist = self._download_json(f'http://{base}/api/playlist/{playlist_id}', playlist_id)
+        entries = [self.url_result(f'http://{base}/watch?v={entry["id"]}', RthMockIE, entry['id'],
+                                   duration=entry.get('duration'))
+                   for entry in playlist['entries']]
+        return self.playlist_result(entries, playlist_id, playlist.get('title'))
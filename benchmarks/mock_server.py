@@ -0,0 +1,238 @@
+"""Local stand-in for a video site: metadata API, playlists and Range-capable media files.
+
+Media comes from named profiles. A profile is one synthetic file plus the format metadata
+the fake extractor (mock_plugins/yt_dlp_plugins/extractor/rth_mock.py) reports for it:
+video IDs look like '<profile>_<n>' and playlist IDs like '<profile>_<count>', so any
+number of distinct items can share one file on disk.
+
+    GET /api/video/<id>        info JSON (id, title, duration, formats)
+    GET /api/playlist/<id>     playlist JSON (id, title, entries)
+    GET /media/<file>          the media bytes; Range requests are answered with 206
+
+yt-dlp finds the extractor when mock_plugins is on sys.path. To point the GUI at it:
+    python benchmarks/mock_server.py --port 8765
+    PYTHONPATH=benchmarks/mock_plugins python "RonsTechHub YouTubeDownloader-v02.py"
+and paste http://127.0.0.1:8765/watch?v=small_1 or http://127.0.0.1:8765/playlist?list=small_20.
+"""
+import argparse
+import json
+import random
+import re
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+CHUNK_SIZE = 64 * 1024
+MOCK_PLUGIN_DIR = Path(__file__).resolve().parent / "mock_plugins"
+
+
+def write_random_file(path, size, seed=0):
+    """Writes size reproducible pseudo-random bytes (incompressible, like real media)."""
+    rng = random.Random(seed)
+    with open(path, "wb") as f:
+        for offset in range(0, size, CHUNK_SIZE):
+            f.write(rng.randbytes(min(CHUNK_SIZE, size - offset)))
+
+
+def write_sine_audio(path, ffmpeg, duration):
+    """Encodes a sine tone as AAC in an M4A container (a real, decodable audio stream).
+
+    The index goes in front of the media, as in the DASH M4A streams sites serve, so the file
+    can also be decoded as it arrives (see rth_downloader.streaming).
+    """
+    subprocess.run([ffmpeg, "-v", "error", "-y", "-f", "lavfi", "-i", f"sine=frequency=440:duration={duration}",
+                    "-c:a", "aac", "-b:a", "128k", "-movflags", "+faststart", str(path)], check=True)
+
+
+class MockMediaServer:
+    """ThreadingHTTPServer serving the mock API and media from a scratch directory.
+
+    latency is added to every API request (standing in for extraction round trips);
+    rate caps each media response in bytes per second. requests counts every request and
+    media_requests those for media bytes, per file name.
+    """
+
+    def __init__(self, media_dir=None, latency=0.0, rate=None, port=0):
+        self._scratch = None if media_dir else tempfile.TemporaryDirectory(prefix="rth-mock-")
+        self.media_dir = Path(media_dir or self._scratch.name)
+        self.latency = latency
+        self.rate = rate
+        self.profiles = {}
+        self.requests = 0
+        self.media_requests = {}
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(("127.0.0.1", port), self._make_handler())
+        self._server.daemon_threads = True
+        self.base_url = f"http://127.0.0.1:{self._server.server_address[1]}"
+
+    # --- Profiles ---
+    def add_profile(self, name, filename, duration, ext, vcodec, acodec, height=None, abr=None):
+        path = self.media_dir / filename
+        self.profiles[name] = {'file': filename, 'size': path.stat().st_size, 'duration': duration, 'ext': ext,
+                               'vcodec': vcodec, 'acodec': acodec, 'height': height, 'abr': abr}
+
+    def add_video_profile(self, name, size, duration=60, height=720):
+        """A single muxed MP4 of random bytes (format 'best'; needs no FFmpeg merge)."""
+        filename = f"{name}.mp4"
+        if not (self.media_dir / filename).exists():
+            write_random_file(self.media_dir / filename, size, seed=len(name))
+        self.add_profile(name, filename, duration, 'mp4', 'avc1.64001F', 'mp4a.40.2', height=height)
+
+    def add_audio_profile(self, name, ffmpeg, duration=30):
+        """An audio-only AAC/M4A stream FFmpeg can really decode, for transcode scenarios."""
+        filename = f"{name}.m4a"
+        if not (self.media_dir / filename).exists():
+            write_sine_audio(self.media_dir / filename, ffmpeg, duration)
+        self.add_profile(name, filename, duration, 'm4a', 'none', 'mp4a.40.2', abr=128)
+
+    def video_url(self, profile, n):
+        return f"{self.base_url}/watch?v={profile}_{n}"
+
+    def playlist_url(self, profile, count):
+        return f"{self.base_url}/playlist?list={profile}_{count}"
+
+    # --- API ---
+    def video_info(self, video_id):
+        profile = self.profiles.get(video_id.split("_", 1)[0])
+        if profile is None:
+            return None
+        media_format = {'format_id': 'mock', 'url': f"{self.base_url}/media/{profile['file']}",
+                        'ext': profile['ext'], 'vcodec': profile['vcodec'], 'acodec': profile['acodec'],
+                        'filesize': profile['size'], 'height': profile['height'], 'abr': profile['abr']}
+        return {'id': video_id, 'title': f"Mock {video_id}", 'duration': profile['duration'],
+                'formats': [{key: value for key, value in media_format.items() if value is not None}]}
+
+    def playlist_info(self, playlist_id):
+        match = re.fullmatch(r"([a-z]+)_(\d+)", playlist_id)
+        if not match or match.group(1) not in self.profiles:
+            return None
+        profile, count = match.group(1), int(match.group(2))
+        duration = self.profiles[profile]['duration']
+        return {'id': playlist_id, 'title': f"Mock playlist {playlist_id}",
+                'entries': [{'id': f"{profile}_{count}x{i}", 'duration': duration} for i in range(count)]}
+
+    # --- Serving ---
+    def _make_handler(self):
+        server = self
+
+        class MockHandler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                with server._lock:
+                    server.requests += 1
+                path = self.path.split("?", 1)[0]
+                if path.startswith("/api/"):
+                    self._send_api(path)
+                elif path.startswith("/media/"):
+                    self._send_media(server.media_dir / Path(path).name)
+                else:
+                    self.send_error(404)
+
+            def _send_api(self, path):
+                time.sleep(server.latency)
+                kind, _, item_id = path[len("/api/"):].partition("/")
+                info = {'video': server.video_info, 'playlist': server.playlist_info}.get(kind, lambda _: None)(item_id)
+                if info is None:
+                    self.send_error(404)
+                    return
+                body = json.dumps(info).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def _send_media(self, path):
+                with server._lock:
+                    server.media_requests[path.name] = server.media_requests.get(path.name, 0) + 1
+                if not path.is_file():
+                    self.send_error(404)
+                    return
+                size = path.stat().st_size
+                start, end = 0, size - 1
+                match = re.match(r"bytes=(\d+)-(\d*)", self.headers.get("Range") or "")
+                if match:
+                    start = int(match.group(1))
+                    end = min(int(match.group(2)), end) if match.group(2) else end
+                    if start > end:
+                        self.send_response(416)
+                        self.send_header("Content-Range", f"bytes */{size}")
+                        self.send_header("Content-Length", "0")
+                        self.end_headers()
+                        return
+                    self.send_response(206)
+                    self.send_header("Content-Range", f"bytes {start}-{end}/{size}")
+                else:
+                    self.send_response(200)
+                self.send_header("Accept-Ranges", "bytes")
+                self.send_header("Content-Type", "audio/mp4" if path.suffix == ".m4a" else "video/mp4")
+                self.send_header("Content-Length", str(end - start + 1))
+                self.end_headers()
+
+                with open(path, "rb") as f:
+                    f.seek(start)
+                    remaining = end - start + 1
+                    while remaining > 0:
+                        chunk = f.read(min(CHUNK_SIZE, remaining))
+                        remaining -= len(chunk)
+                        self.wfile.write(chunk)
+                        if server.rate:
+                            time.sleep(len(chunk) / server.rate)
+
+            def log_message(self, *args):
+                pass
+
+        return MockHandler
+
+    def start(self):
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+        if self._scratch is not None:
+            self._scratch.cleanup()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds added to every API request")
+    parser.add_argument("--size-mb", type=float, default=1.0, help="size of the 'small' video profile")
+    parser.add_argument("--large-mb", type=float, default=64.0, help="size of the 'large' video profile")
+    args = parser.parse_args()
+
+    sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+    from rth_downloader.toolchain import FFmpegNotFoundError, get_toolchain
+
+    server = MockMediaServer(latency=args.latency, port=args.port)
+    server.add_video_profile("small", int(args.size_mb * 1024 ** 2))
+    server.add_video_profile("large", int(args.large_mb * 1024 ** 2))
+    try:
+        server.add_audio_profile("audio", get_toolchain().ffmpeg)
+    except FFmpegNotFoundError:
+        print("FFmpeg not found; the 'audio' profile is unavailable.")
+    with server:
+        print(f"Serving profiles {', '.join(server.profiles)} at {server.base_url} (Ctrl+C to stop)")
+        print(f"  {server.video_url('small', 1)}\n  {server.playlist_url('small', 20)}")
+        try:
+            threading.Event().wait()
+        except KeyboardInterrupt:
+            pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
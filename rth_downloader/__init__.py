@@ -0,0 +1,38 @@
+"""Download engine behind the RonsTechHub YouTube Downloader.
+
+Importable without tkinter or PIL, so it can run headless (see ``python -m rth_downloader --help``).
+The engine (and with it yt-dlp, the slowest import by far) is only loaded on first access to
+DownloadEngine, so a GUI can paint its window before paying for it.
+"""
+from .config import (AUDIO_FORMAT_OPTIONS, AUDIO_QUALITY_OPTIONS, DEFAULT_MAX_WORKERS, VIDEO_QUALITY_OPTIONS,
+                     DownloadConfig)
+from .paths import get_app_data_dir, get_download_folder, resource_path
+from .report import BatchResult
+from .toolchain import FFmpegNotFoundError, Toolchain, get_toolchain, start_toolchain_probe
+
+LAZY_ENGINE_NAMES = ('DownloadEngine',)
+
+
+def __getattr__(name):
+    if name in LAZY_ENGINE_NAMES:
+        from . import engine
+        return getattr(engine, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+__all__ = [
+    'AUDIO_QUALITY_OPTIONS',
+    'AUDIO_FORMAT_OPTIONS',
+    'VIDEO_QUALITY_OPTIONS',
+    'DEFAULT_MAX_WORKERS',
+    'DownloadConfig',
+    'DownloadEngine',
+    'BatchResult',
+    'FFmpegNotFoundError',
+    'Toolchain',
+    'get_toolchain',
+    'start_toolchain_probe',
+    'get_app_data_dir',
+    'get_download_folder',
+    'resource_path',
+]
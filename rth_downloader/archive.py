@@ -0,0 +1,56 @@
+import threading
+from pathlib import Path
+
+from yt_dlp.utils import make_archive_id
+
+
+# --- Persistent Download Archive ---
+class DownloadArchive:
+    """Append-only log of finished items with an in-memory set, so lookups stay O(1) at any size.
+
+    Each line is '<extractor> <video id> <variant>', where the variant is the mode and quality
+    (e.g. 'audio:320k'), so the same video can still be fetched in another format.
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self._keys = set()
+        self._lock = threading.Lock()
+
+        if self.path.exists():
+            with open(self.path, encoding='utf-8') as f:
+                self._keys.update(line.strip() for line in f if line.strip())
+        self._file = open(self.path, 'a', encoding='utf-8')
+
+    @staticmethod
+    def make_key(archive_id, variant):
+        return f"{archive_id} {variant}"
+
+    def __len__(self):
+        return len(self._keys)
+
+    def contains(self, archive_id, variant):
+        return self.make_key(archive_id, variant) in self._keys
+
+    def add(self, archive_id, variant):
+        """Records an item; safe to call from several threads."""
+        key = self.make_key(archive_id, variant)
+        with self._lock:
+            if key in self._keys:
+                return
+            self._keys.add(key)
+            self._file.write(key + '\n')
+            self._file.flush()
+
+    def close(self):
+        with self._lock:
+            self._file.close()
+
+
+def archive_id_for_url(ydl, url):
+    """Derives '<extractor> <video id>' from the URL alone (no network), or None if it can't be known."""
+    for ie_key, ie in ydl._ies.items():
+        if ie.suitable(url):
+            video_id = ie.get_temp_id(url)
+            return make_archive_id(ie_key, video_id) if video_id else None
+    return None
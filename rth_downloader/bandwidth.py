@@ -0,0 +1,96 @@
+import threading
+import time
+
+
+# --- Token Bucket ---
+class TokenBucket:
+    """Thread-safe token bucket measured in bytes; consume() sleeps until the bytes are within budget.
+
+    Consumers may overdraw the bucket (a single yt-dlp block can exceed the burst size); the debt
+    is paid back by sleeping, so concurrent consumers queue up behind each other fairly.
+    """
+
+    def __init__(self, rate, burst=None):
+        self.rate = float(rate)
+        self.burst = float(burst or rate)
+        self._tokens = self.burst
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now):
+        self._tokens = min(self.burst, self._tokens + (now - self._last) * self.rate)
+        self._last = now
+
+    def set_rate(self, rate, burst=None):
+        with self._lock:
+            self._refill(time.monotonic())
+            self.rate = float(rate)
+            self.burst = float(burst or rate)
+            self._tokens = min(self._tokens, self.burst)
+
+    def consume(self, num_bytes):
+        """Takes num_bytes from the bucket, blocking the caller until they are paid for."""
+        with self._lock:
+            self._refill(time.monotonic())
+            self._tokens -= num_bytes
+            delay = -self._tokens / self.rate if self._tokens < 0 else 0
+        if delay > 0:
+            time.sleep(delay)
+
+
+# --- Global Bandwidth Scheduler ---
+class BandwidthManager:
+    """Applies one global rate cap across all active downloads plus an optional per-item cap.
+
+    Every byte is charged to one global bucket, so the cap is shared by the items that are
+    actually transferring: bandwidth an item cannot use (e.g. its server is slower) goes to the
+    others instead of idling in a fixed share. With a per-item cap, each item also has its own
+    bucket at that rate. Throttling happens inside the yt-dlp progress callback, which runs
+    synchronously after every block an item downloads.
+    """
+
+    def __init__(self, global_limit=None, per_item_limit=None):
+        self.global_limit = global_limit
+        self.per_item_limit = per_item_limit
+        self._global_bucket = TokenBucket(global_limit) if global_limit else None
+        self._items = {}
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self):
+        return bool(self.global_limit or self.per_item_limit)
+
+    def start_item(self, key):
+        """Registers an active download."""
+        if not self.enabled:
+            return
+        with self._lock:
+            if key not in self._items:
+                bucket = TokenBucket(self.per_item_limit) if self.per_item_limit else None
+                self._items[key] = {'bucket': bucket, 'file': None, 'seen': 0}
+
+    def finish_item(self, key):
+        with self._lock:
+            self._items.pop(key, None)
+
+    def on_progress(self, key, d):
+        """yt-dlp progress callback: charges the bytes written since the last call and sleeps if over budget."""
+        if d['status'] != 'downloading' or not self.enabled:
+            return
+        with self._lock:
+            item = self._items.get(key)
+            if item is None:
+                return
+            downloaded = d.get('downloaded_bytes') or 0
+            if item['file'] != d.get('tmpfilename'):
+                item['file'], item['seen'] = d.get('tmpfilename'), downloaded  # new file or resumed .part
+                return
+            if downloaded <= item['seen']:
+                return  # out of order (segments report outside their lock); those bytes were charged
+            delta, item['seen'] = downloaded - item['seen'], downloaded
+            bucket = item['bucket']
+
+        if bucket:
+            bucket.consume(delta)
+        if self._global_bucket:
+            self._global_bucket.consume(delta)
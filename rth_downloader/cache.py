@@ -0,0 +1,164 @@
+import copy
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from urllib.parse import urlsplit, urlunsplit
+
+
+# --- Extraction Info Cache (in-memory LRU + optional on-disk tier with TTL) ---
+DEFAULT_INFO_CACHE_TTL = 60 * 60  # stream URLs in extracted info expire after a few hours
+DEFAULT_MAX_DISK_ENTRIES = 1000  # a YouTube result is often a few hundred KB
+DISK_PRUNE_INTERVAL = 100  # disk writes between sweeps of expired and surplus files
+
+
+def normalize_url(url):
+    """Normalizes a URL for use as a cache key (case of scheme/host, default ports, fragment)."""
+    parts = urlsplit(url.strip())
+    netloc = parts.netloc.lower()
+    if (parts.scheme.lower(), netloc.rsplit(':', 1)[-1]) in (('http', '80'), ('https', '443')):
+        netloc = netloc.rsplit(':', 1)[0]
+    return urlunsplit((parts.scheme.lower(), netloc, parts.path or '/', parts.query, ''))
+
+
+class InfoCache:
+    """Caches raw (unprocessed) yt-dlp extraction results keyed by normalized URL.
+
+    The raw result still holds every available format, so changing the quality or retrying
+    a failed item reuses it and only re-runs format selection and the download. The disk tier
+    is swept of expired files on start-up and every DISK_PRUNE_INTERVAL writes, keeping at most
+    max_disk_entries of the newest.
+    """
+
+    def __init__(self, max_entries=256, ttl=DEFAULT_INFO_CACHE_TTL, cache_dir=None,
+                 max_disk_entries=DEFAULT_MAX_DISK_ENTRIES):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.cache_dir = Path(cache_dir) if cache_dir else None
+        self.max_disk_entries = max_disk_entries
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._disk_writes = 0
+        if self.cache_dir:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            self.prune()
+
+    def _disk_path(self, key):
+        return self.cache_dir / (hashlib.sha1(key.encode('utf-8')).hexdigest() + '.json')
+
+    def get(self, url):
+        """Returns a private copy of the cached info, or None on a miss or expired entry."""
+        key = normalize_url(url)
+        now = time.time()
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and now - entry[0] < self.ttl:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return copy.deepcopy(entry[1])
+            self._entries.pop(key, None)
+
+        info = self._disk_get(key, now)
+        with self._lock:
+            if info is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self.disk_hits += 1
+        self._remember(key, now, info)
+        return copy.deepcopy(info)
+
+    def peek(self, url):
+        """Returns the memory tier's info for a URL without copying it or counting a hit (read-only use)."""
+        with self._lock:
+            entry = self._entries.get(normalize_url(url))
+        return entry[1] if entry else None
+
+    def put(self, url, info):
+        key = normalize_url(url)
+        now = time.time()
+        info = {k: v for k, v in info.items() if not k.startswith('__')}
+        self._remember(key, now, copy.deepcopy(info))
+        self._disk_put(key, now, info)
+
+    def discard(self, url):
+        """Drops a URL from both tiers, e.g. when its stream URLs turned out to be stale."""
+        key = normalize_url(url)
+        with self._lock:
+            self._entries.pop(key, None)
+        if self.cache_dir:
+            self._disk_path(key).unlink(missing_ok=True)
+
+    def stats(self):
+        with self._lock:
+            return {'hits': self.hits, 'disk_hits': self.disk_hits, 'misses': self.misses,
+                    'entries': len(self._entries)}
+
+    def prune(self, now=None):
+        """Deletes expired disk entries (by file age), then the oldest beyond max_disk_entries."""
+        if not self.cache_dir:
+            return
+        now = time.time() if now is None else now
+        files = []
+        for path in self.cache_dir.glob('*.json'):
+            try:
+                mtime = path.stat().st_mtime
+                if now - mtime >= self.ttl:
+                    path.unlink()
+                else:
+                    files.append((mtime, path))
+            except OSError:
+                continue  # removed meanwhile (e.g. by another process)
+        files.sort(reverse=True)
+        for _, path in files[self.max_disk_entries:]:
+            path.unlink(missing_ok=True)
+
+    def _remember(self, key, timestamp, info):
+        with self._lock:
+            self._entries[key] = (timestamp, info)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def _disk_get(self, key, now):
+        if not self.cache_dir:
+            return None
+        path = self._disk_path(key)
+        try:
+            with open(path, encoding='utf-8') as f:
+                record = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if record.get('url') != key or now - record.get('time', 0) >= self.ttl:
+            path.unlink(missing_ok=True)
+            return None
+        return record['info']
+
+    def _disk_put(self, key, timestamp, info):
+        if not self.cache_dir:
+            return
+        try:
+            # Results holding non-JSON values (e.g. lazily generated fragments) stay memory-only.
+            data = json.dumps({'url': key, 'time': timestamp, 'info': info})
+        except (TypeError, ValueError):
+            return
+        path = self._disk_path(key)
+        temp_path = path.with_suffix('.tmp')
+        try:
+            temp_path.write_text(data, encoding='utf-8')
+            os.replace(temp_path, path)
+        except OSError:
+            pass
+        with self._lock:
+            self._disk_writes += 1
+            due = self._disk_writes % DISK_PRUNE_INTERVAL == 0
+        if due:
+            self.prune()
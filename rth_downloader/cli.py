@@ -0,0 +1,298 @@
+import argparse
+import getpass
+import sys
+import threading
+from pathlib import Path
+
+from .config import (DEFAULT_MAX_WORKERS, DEFAULT_MIN_FREE_SPACE, DEFAULT_RETRIES, DownloadConfig, parse_rate,
+                     quality_values)
+from .daemon import DEFAULT_MAX_JOBS, DaemonClient, DaemonError, DownloadDaemon
+from .engine import DownloadEngine, FFmpegNotFoundError
+from .metrics import MetricsServer
+from .paths import get_download_folder
+from .report import failed_urls, read_report, write_report
+from .urls import normalize_urls, read_url_file, read_url_text
+
+
+def read_batch_file(path):
+    """Reads the URLs in a .txt (# comments allowed), .csv or .json file; '-' reads text from stdin."""
+    if path == '-':
+        return read_url_text(sys.stdin.read())
+    return read_url_file(path)
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog="rth_downloader",
+        description="Download YouTube audio (MP3) or video (MP4) without the GUI.")
+    parser.add_argument("urls", nargs="*", help="video, playlist or channel URLs")
+    parser.add_argument("-b", "--batch-file",
+                        help="text, CSV or JSON file with URLs, e.g. one per line ('-' reads stdin)")
+    parser.add_argument("--retry-failed", metavar="REPORT",
+                        help="download again the failed items of a report written by --report")
+
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument("-a", "--audio", dest="mode", action="store_const", const="audio",
+                      help="download audio as MP3 (default)")
+    mode.add_argument("-v", "--video", dest="mode", action="store_const", const="video",
+                      help="download video")
+    parser.set_defaults(mode="audio")
+
+    parser.add_argument("--audio-format", choices=("mp3", "m4a"), default="mp3",
+                        help="audio output: mp3 (re-encoded) or m4a (AAC stream copy, no re-encode; default: mp3)")
+    parser.add_argument("--stream", dest="stream_audio", action="store_true",
+                        help="pipe audio downloads straight into FFmpeg instead of saving the raw file first")
+    parser.add_argument("-q", "--quality",
+                        help=f"audio bitrate ({', '.join(quality_values('audio'))}) or video height "
+                             f"({', '.join(quality_values('video'))}); defaults to the best")
+    parser.add_argument("-o", "--output-dir", default=str(get_download_folder()),
+                        help="output directory (default: your Downloads folder)")
+    parser.add_argument("--scratch-dir", metavar="DIR",
+                        help="download raw streams here (e.g. a tmpfs or fast SSD); only finished files are "
+                             "moved to the output directory")
+    parser.add_argument("--min-free", metavar="SIZE", default=DEFAULT_MIN_FREE_SPACE,
+                        help=f"pause downloads while less than SIZE would stay free on the output or scratch "
+                             f"volume (default: {DEFAULT_MIN_FREE_SPACE}; 0 disables)")
+    parser.add_argument("-p", "--playlist", action="store_true",
+                        help="treat URLs as entire playlists/channels")
+    parser.add_argument("-j", "--workers", type=int, default=DEFAULT_MAX_WORKERS,
+                        help=f"parallel downloads (default: {DEFAULT_MAX_WORKERS})")
+    parser.add_argument("--per-host", type=int, metavar="N",
+                        help="at most N downloads at a time from one site (default: no limit besides --workers)")
+    parser.add_argument("--first", action="append", default=[], metavar="URL",
+                        help="download URL before the rest of the batch (may be repeated; added if not listed)")
+    parser.add_argument("-N", "--connections", type=int, default=1,
+                        help="connections per large file (segmented download of files over 32 MiB; default: 1)")
+    parser.add_argument("-r", "--limit-rate", metavar="RATE",
+                        help="global bandwidth cap shared by all downloads, e.g. 2M or 500K (bytes/s)")
+    parser.add_argument("--per-item-limit", metavar="RATE", help="bandwidth cap for each single download")
+    parser.add_argument("--retries", type=int, default=DEFAULT_RETRIES,
+                        help=f"retries for timeouts, 5xx and 429 errors, with backoff (default: {DEFAULT_RETRIES})")
+    parser.add_argument("--no-archive", dest="skip_archived", action="store_false",
+                        help="download again even if an item is already in the download archive")
+    parser.add_argument("--no-dedup", dest="dedup", action="store_false",
+                        help="always store a new copy, even of media already downloaded under another URL or folder")
+    parser.add_argument("--resume", action="store_true",
+                        help="resume the most recent interrupted batch (other options are taken from it)")
+    parser.add_argument("--report", metavar="FILE",
+                        help="write one result record per item to FILE (CSV if it ends in .csv, else JSON Lines)")
+    parser.add_argument("--quiet", action="store_true", help="only print the final summary")
+
+    daemon = parser.add_argument_group("shared daemon")
+    daemon.add_argument("--serve", nargs="?", const="", metavar="ADDRESS",
+                        help="run as a daemon that accepts jobs on ADDRESS (a Unix socket path, or host:port with "
+                             "an access token in daemon.token; default: daemon.sock in the app data folder); "
+                             "-j and -r then limit all jobs together")
+    daemon.add_argument("--max-jobs", type=int, default=DEFAULT_MAX_JOBS,
+                        help=f"with --serve: batches running at once (default: {DEFAULT_MAX_JOBS})")
+    daemon.add_argument("--allow-dir", action="append", metavar="DIR",
+                        help="with --serve: let jobs write below DIR (repeatable; default: your home folder)")
+    daemon.add_argument("--daemon", action="store_true",
+                        help="hand the batch to the local daemon instead of downloading in this process")
+    daemon.add_argument("--daemon-socket", "--daemon-url", dest="daemon_address", metavar="ADDRESS",
+                        help="like --daemon, for the daemon at ADDRESS (a Unix socket path or host:port)")
+
+    diagnostics = parser.add_argument_group("diagnostics")
+    diagnostics.add_argument("--metrics-file", metavar="FILE",
+                             help="write Prometheus-format metrics to FILE after the batch "
+                                  "(default: metrics.prom in the app data folder)")
+    diagnostics.add_argument("--metrics-port", type=int, metavar="PORT",
+                             help="serve metrics on http://127.0.0.1:PORT/metrics while running, with "
+                                  "POST /debug/profile/start|stop and /debug/tracemalloc/start|stop toggles "
+                                  "(authorized with the token in metrics.token in the app data folder)")
+    diagnostics.add_argument("--profile", metavar="FILE",
+                             help="cProfile the download workers into FILE (pstats format)")
+    diagnostics.add_argument("--trace-memory", metavar="FILE",
+                             help="trace Python allocations with tracemalloc (slow) and write the top sites to FILE")
+    return parser
+
+
+def console_hook(d):
+    """Progress hook that prints one line per finished download."""
+    if d['status'] == 'finished':
+        title = d.get('info_dict', {}).get('title', 'Current Item')
+        sys.stderr.write(f"Downloaded: '{title}'\n")
+
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    progress_hook = None if args.quiet else console_hook
+
+    if args.serve is not None:
+        return serve(args)
+    if args.resume:
+        return resume_latest(args, progress_hook)
+
+    urls = list(args.urls)
+    first, _ = normalize_urls(args.first)
+    if args.batch_file:
+        try:
+            urls += read_batch_file(args.batch_file)
+        except (OSError, ValueError) as e:
+            parser.error(f"cannot read batch file: {e}")
+    if args.retry_failed:
+        try:
+            retry_urls = failed_urls(read_report(args.retry_failed))
+        except (OSError, ValueError, KeyError) as e:
+            parser.error(f"cannot read report: {e}")
+        if not retry_urls and not urls and not first:
+            print("No failed items in the report.")
+            return 0
+        urls += retry_urls
+    if not urls and not first:
+        parser.error("please give at least one URL, a --batch-file or --retry-failed")
+    urls, duplicates = normalize_urls(urls)
+    if duplicates and not args.quiet:
+        print(f"Skipping {duplicates} duplicate URL(s).", file=sys.stderr)
+    urls = first + [url for url in urls if url not in first]
+    if not Path(args.output_dir).is_dir():
+        parser.error(f"output directory does not exist: {args.output_dir}")
+
+    try:
+        config = DownloadConfig(urls, args.output_dir, mode=args.mode, quality=args.quality,
+                                playlist=args.playlist, max_workers=args.workers,
+                                skip_archived=args.skip_archived, rate_limit=args.limit_rate,
+                                per_item_rate_limit=args.per_item_limit, connections=args.connections,
+                                retries=args.retries, audio_format=args.audio_format,
+                                scratch_dir=args.scratch_dir, min_free_space=args.min_free, dedup=args.dedup,
+                                per_host_limit=args.per_host, priorities=dict.fromkeys(first, 1),
+                                stream_audio=args.stream_audio)
+    except ValueError as e:
+        parser.error(str(e))
+
+    if args.daemon or args.daemon_address:
+        try:
+            result = DaemonClient(args.daemon_address, client_name=getpass.getuser()).run(config,
+                                                                                          progress_hook=progress_hook)
+        except DaemonError as e:
+            print(f"Error: {e}", file=sys.stderr)
+            return 2
+        return print_summary(result, args.report)
+
+    engine = DownloadEngine()
+    try:
+        result = run_instrumented(engine, args, lambda: engine.run(config, progress_hook=progress_hook))
+    except FFmpegNotFoundError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 2
+    finally:
+        engine.close()
+    return print_summary(result, args.report)
+
+
+def serve(args):
+    """Runs the shared download daemon until interrupted."""
+    address = args.serve or None
+    try:
+        daemon = DownloadDaemon(max_jobs=args.max_jobs, max_downloads=args.workers,
+                                rate_limit=parse_rate(args.limit_rate), per_item_limit=parse_rate(args.per_item_limit),
+                                allowed_roots=args.allow_dir)
+        daemon.start()
+        server = daemon.serve(address)
+    except (OSError, ValueError) as e:
+        print(f"Error: cannot start the daemon on {address or 'its default socket'}: {e}", file=sys.stderr)
+        return 2
+    address = server.server_address
+    listening = address if isinstance(address, str) else f"{address[0]}:{address[1]}"
+    print(f"Download daemon listening on {listening} (Ctrl+C to stop)", file=sys.stderr)
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        daemon.stop()
+    return 0
+
+
+def run_instrumented(engine, args, run):
+    """Calls run() with the --metrics-*, --profile and --trace-memory options applied to the engine."""
+    if args.metrics_file:
+        engine.metrics_path = Path(args.metrics_file)
+    profiler = engine.metrics.profiler
+    server = None
+    if args.metrics_port is not None:
+        try:
+            server = MetricsServer(engine.metrics, args.metrics_port, engine.app_data_dir).start()
+        except OSError as e:
+            print(f"Warning: cannot serve metrics on port {args.metrics_port}: {e}", file=sys.stderr)
+        else:
+            print(f"Serving metrics on http://127.0.0.1:{server.port}/metrics (the debug toggles need the token in "
+                  f"{server.token_file})", file=sys.stderr)
+    if args.profile:
+        profiler.start_profile()
+    if args.trace_memory:
+        profiler.start_tracemalloc()
+    try:
+        return run()
+    finally:
+        if args.profile:
+            summary = profiler.stop_profile(args.profile)
+            if not args.quiet:
+                print(summary, file=sys.stderr)
+            print(f"Profile written to {args.profile} (open with: python -m pstats {args.profile})", file=sys.stderr)
+        if args.trace_memory:
+            profiler.stop_tracemalloc(args.trace_memory)
+            print(f"Allocation report written to {args.trace_memory}", file=sys.stderr)
+        if server is not None:
+            server.stop()
+
+
+def resume_latest(args, progress_hook):
+    """Resumes the most recent unfinished batch recorded in the job store."""
+    engine = DownloadEngine()
+    batch = engine.job_store.latest_unfinished_batch()
+    if not batch:
+        print("No interrupted batch to resume.")
+        return 0
+
+    print(f"Resuming batch {batch['id']}: {batch['remaining']} item(s) remaining, "
+          f"{batch['partial'] / (1024 * 1024):.1f} MB already downloaded.", file=sys.stderr)
+    try:
+        result = run_instrumented(engine, args, lambda: engine.resume(batch['id'], progress_hook=progress_hook))
+    except FFmpegNotFoundError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 2
+    finally:
+        engine.close()
+    return print_summary(result, args.report)
+
+
+def print_summary(result, report_path=None):
+    failed = result.failed_records
+    print(f"{result.succeeded}/{result.total} succeeded, {len(failed)} failed, "
+          f"{len(result.skipped)} skipped (already downloaded).")
+    network = result.network
+    if network.get('requests'):
+        print(f"HTTP: {network['requests']} requests over {network['connections']} new connections "
+              f"({100 * network['reuse_rate']:.0f}% reused, ~{network['handshake_time_saved']:.2f}s of TLS "
+              f"handshakes and {network['dns_hits']} DNS lookups saved).")
+    phases = {phase: sum(getattr(record, f"{phase}_time") or 0 for record in result.records)
+              for phase in ('queue', 'extract', 'transfer', 'finalize', 'transcode')}
+    if any(phases.values()):
+        print("Time by phase (summed over items): " +
+              ", ".join(f"{phase} {seconds:.1f}s" for phase, seconds in phases.items()) + ".")
+    copied = [record for record in result.records if record.pipeline == 'copy']
+    copy_cpu_saved = sum(record.cpu_saved or 0 for record in copied)
+    if copy_cpu_saved:
+        print(f"Stream copy instead of re-encoding: {len(copied)} item(s), ~{copy_cpu_saved:.1f} CPU seconds saved.")
+    streamed = [record for record in result.records if record.pipeline == 'stream']
+    if streamed:
+        print(f"Encoded while downloading: {len(streamed)} item(s), "
+              f"{sum(record.downloaded_bytes or 0 for record in streamed) / (1024 * 1024):.1f} MB of raw audio "
+              f"never written to disk.")
+    linked = result.linked_records
+    if linked:
+        link_cpu_saved = sum(record.cpu_saved or 0 for record in linked)
+        print(f"Deduplicated: {len(linked)} item(s) linked to existing files, "
+              f"{result.bytes_saved / (1024 * 1024):.1f} MB and ~{link_cpu_saved:.1f} CPU seconds saved.")
+    for record in failed:
+        print(f"FAILED [{record.error_class}] {record.title or record.url}: {record.error}", file=sys.stderr)
+    if report_path:
+        try:
+            write_report(result.records, report_path)
+        except OSError as e:
+            print(f"Error: cannot write report: {e}", file=sys.stderr)
+            return 1
+        print(f"Report written to {report_path}")
+    return 1 if failed or result.failed else 0
@@ -0,0 +1,94 @@
+AUDIO_QUALITY_OPTIONS = ["320k (Best)", "192k (Standard)", "128k (Good)"]
+VIDEO_QUALITY_OPTIONS = ["2160p (4K)", "1440p (2K)", "1080p (FHD)", "720p (HD)", "480p (SD)"]
+AUDIO_FORMAT_OPTIONS = ["mp3 (Re-encoded)", "m4a (No re-encode, fastest)"]
+DEFAULT_MAX_WORKERS = 4
+DEFAULT_RETRIES = 3
+DEFAULT_MIN_FREE_SPACE = "500M"  # kept free on the output and scratch volumes
+RATE_UNITS = {'': 1, 'K': 1024, 'M': 1024 ** 2, 'G': 1024 ** 3}
+
+
+def quality_values(mode):
+    """Returns the accepted quality values ('320k', '1080p', ...) for a download mode."""
+    options = VIDEO_QUALITY_OPTIONS if mode == "video" else AUDIO_QUALITY_OPTIONS
+    return [option.split(' ')[0] for option in options]
+
+
+def parse_rate(value):
+    """Parses a bandwidth limit such as '500K' or '2.5M' (bytes per second); None/'0' mean unlimited."""
+    if value in (None, ''):
+        return None
+    if isinstance(value, (int, float)):
+        return value or None
+    try:
+        return parse_size(str(value).strip().upper().removesuffix('/S')) or None
+    except ValueError:
+        raise ValueError(f"Invalid rate limit '{value}' (examples: 500K, 2.5M).")
+
+
+def parse_size(value):
+    """Parses a byte count such as '500M' or '2G' (or a plain number of bytes)."""
+    if isinstance(value, (int, float)):
+        return int(value)
+    text = str(value).strip().upper().removesuffix('B')
+    unit = text[-1:] if text[-1:] in RATE_UNITS else ''
+    try:
+        return int(float(text[:len(text) - len(unit)]) * RATE_UNITS[unit])
+    except ValueError:
+        raise ValueError(f"Invalid size '{value}' (examples: 500M, 2G).")
+
+
+# --- Download Settings ---
+class DownloadConfig:
+    """Plain-Python settings for one download batch, shared by the GUI and the CLI."""
+
+    def __init__(self, urls, output_dir, mode="audio", quality=None, playlist=False,
+                 max_workers=DEFAULT_MAX_WORKERS, skip_archived=True, rate_limit=None, per_item_rate_limit=None,
+                 connections=1, retries=DEFAULT_RETRIES, audio_format="mp3", scratch_dir=None,
+                 min_free_space=DEFAULT_MIN_FREE_SPACE, dedup=True, per_host_limit=None, priorities=None,
+                 stream_audio=False):
+        if mode not in ("audio", "video"):
+            raise ValueError(f"Unknown download mode '{mode}' (expected 'audio' or 'video').")
+
+        allowed = quality_values(mode)
+        quality = (quality or allowed[0]).split(' ')[0]
+        if mode == "video" and quality.isdigit():
+            quality += 'p'
+        if quality not in allowed:
+            raise ValueError(f"Unsupported {mode} quality '{quality}' (choose from {', '.join(allowed)}).")
+
+        audio_format = audio_format.split(' ')[0].lower()
+        formats = [option.split(' ')[0] for option in AUDIO_FORMAT_OPTIONS]
+        if audio_format not in formats:
+            raise ValueError(f"Unsupported audio format '{audio_format}' (choose from {', '.join(formats)}).")
+
+        self.urls = list(urls)
+        self.output_dir = str(output_dir)
+        self.mode = mode
+        self.quality = quality
+        self.playlist = playlist
+        self.max_workers = max(1, int(max_workers))
+        self.skip_archived = skip_archived
+        self.rate_limit = parse_rate(rate_limit)
+        self.per_item_rate_limit = parse_rate(per_item_rate_limit)
+        self.connections = max(1, int(connections))
+        self.retries = max(0, int(retries))
+        self.audio_format = audio_format
+        self.scratch_dir = str(scratch_dir) if scratch_dir else None
+        self.min_free_space = parse_size(min_free_space or 0)
+        self.dedup = dedup
+        self.per_host_limit = max(1, int(per_host_limit)) if per_host_limit else None
+        self.priorities = {url: int(priority) for url, priority in (priorities or {}).items()}
+        self.stream_audio = stream_audio
+
+    def to_dict(self):
+        """JSON-ready settings; DownloadConfig(**data) rebuilds the config (job store, daemon API)."""
+        return {
+            'urls': self.urls, 'output_dir': self.output_dir, 'mode': self.mode,
+            'quality': self.quality, 'playlist': self.playlist, 'max_workers': self.max_workers,
+            'skip_archived': self.skip_archived, 'rate_limit': self.rate_limit,
+            'per_item_rate_limit': self.per_item_rate_limit, 'connections': self.connections,
+            'retries': self.retries, 'audio_format': self.audio_format,
+            'scratch_dir': self.scratch_dir, 'min_free_space': self.min_free_space, 'dedup': self.dedup,
+            'per_host_limit': self.per_host_limit, 'priorities': self.priorities,
+            'stream_audio': self.stream_audio,
+        }
@@ -0,0 +1,558 @@
+import heapq
+import hmac
+import http.client
+import itertools
+import json
+import os
+import socket
+import socketserver
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qs, urlsplit
+
+from .config import DEFAULT_MAX_WORKERS, DownloadConfig
+from .paths import get_app_data_dir, write_token_file
+from .progress import DOWNLOADED, ERROR, ETA, PROGRESS_FPS, SPEED, STATUS, TITLE, TOTAL, ProgressAggregator
+from .report import BatchResult, ItemResult
+
+
+# --- Download Daemon: one engine, queue and set of limits shared by every client ---
+DEFAULT_TCP_ADDRESS = "127.0.0.1:8790"  # the default where Unix sockets are unavailable (Windows)
+DAEMON_SOCKET_NAME = "daemon.sock"
+DAEMON_TOKEN_NAME = "daemon.token"
+DEFAULT_MAX_JOBS = 2  # batches running at once; the rest wait in the job queue
+EVENT_BACKLOG = 10000  # events kept for clients that reconnect with Last-Event-ID
+KEEPALIVE_INTERVAL = 15  # seconds between SSE comments on an idle stream
+JOB_STATES = ('queued', 'running', 'done', 'failed', 'cancelled')
+
+
+def default_daemon_address(app_data_dir=None):
+    """The daemon's Unix socket in the app data folder, or DEFAULT_TCP_ADDRESS without Unix sockets."""
+    if not hasattr(socket, 'AF_UNIX'):
+        return DEFAULT_TCP_ADDRESS
+    return str(Path(app_data_dir or get_app_data_dir()) / DAEMON_SOCKET_NAME)
+
+
+def parse_address(address):
+    """Splits a daemon address into ('unix', path) or ('tcp', host, port).
+
+    'unix:/run/rth.sock', a path containing a slash and anything ending in '.sock' are Unix
+    sockets; otherwise '[http://]host:port' or a bare port on 127.0.0.1.
+    """
+    address = str(address)
+    if address.startswith('unix:'):
+        return 'unix', address[len('unix:'):]
+    if '/' in address.removeprefix('http://') or address.endswith('.sock'):
+        return 'unix', address
+    host, _, port = address.removeprefix('http://').rstrip('/').rpartition(':')
+    return 'tcp', host or '127.0.0.1', int(port)
+
+
+class EventLog:
+    """Numbered events fanned out to any number of readers; each reader follows its own position."""
+
+    def __init__(self, size=EVENT_BACKLOG):
+        self._events = deque(maxlen=size)
+        self._seq = 0
+        self._changed = threading.Condition()
+
+    def publish(self, kind, job_id, data):
+        with self._changed:
+            self._seq += 1
+            self._events.append({'seq': self._seq, 'type': kind, 'job': job_id, 'time': time.time(), 'data': data})
+            self._changed.notify_all()
+
+    def since(self, seq, timeout=None):
+        """Returns the events after seq, waiting up to timeout seconds for one to arrive."""
+        with self._changed:
+            if self._seq <= seq:
+                self._changed.wait(timeout)
+            return [event for event in self._events if event['seq'] > seq]
+
+
+class DaemonJob:
+    """One submitted batch and its live progress."""
+
+    def __init__(self, job_id, config, priority=0, client=None):
+        self.id = job_id
+        self.config = config
+        self.priority = priority
+        self.client = client
+        self.state = 'queued'
+        self.error = None
+        self.submitted = time.time()
+        self.started = None
+        self.finished = None
+        self.result = None
+        self.progress = ProgressAggregator()
+
+    def summary(self):
+        summary = {'id': self.id, 'state': self.state, 'priority': self.priority, 'client': self.client,
+                   'urls': len(self.config.urls), 'output_dir': self.config.output_dir, 'mode': self.config.mode,
+                   'submitted': self.submitted, 'started': self.started, 'finished': self.finished,
+                   'error': self.error, 'totals': self.progress.totals()}
+        if self.result is not None:
+            summary.update(total=self.result.total, succeeded=self.result.succeeded,
+                           failed=len(self.result.failed_records), skipped=len(self.result.skipped),
+                           linked=len(self.result.linked_records), bytes_saved=self.result.bytes_saved)
+        return summary
+
+    def detail(self):
+        detail = self.summary()
+        detail['config'] = self.config.to_dict()
+        if self.result is not None:
+            detail['records'] = [record.to_dict() for record in self.result.records]
+            detail['results'] = self.result.results
+            detail['skipped'] = self.result.skipped
+        return detail
+
+
+def _item_event(url, record):
+    return {'url': url, 'title': record[TITLE], 'status': record[STATUS], 'downloaded_bytes': record[DOWNLOADED],
+            'total_bytes': record[TOTAL], 'speed': record[SPEED], 'eta': record[ETA], 'error': record[ERROR]}
+
+
+class DownloadDaemon:
+    """Owns one DownloadEngine (info cache, job store, dedup index, HTTP session, metrics) for many clients.
+
+    Jobs are DownloadConfigs submitted over a local HTTP API (see serve()); they wait in one queue,
+    higher priority first and then smaller batches first, and at most max_jobs run at once. All
+    running jobs share max_downloads download slots and, with rate_limit/per_item_limit, one
+    bandwidth budget, however many users submit work. Item progress is sampled at PROGRESS_FPS and
+    published with job state changes on an EventLog, which clients follow as Server-Sent Events.
+    Jobs may only write below allowed_roots (the user's home folder by default).
+    """
+
+    def __init__(self, engine=None, max_jobs=DEFAULT_MAX_JOBS, max_downloads=DEFAULT_MAX_WORKERS, rate_limit=None,
+                 per_item_limit=None, allowed_roots=None):
+        from .bandwidth import BandwidthManager
+        from .engine import DownloadEngine
+
+        self.engine = engine or DownloadEngine()
+        self.engine.bandwidth = BandwidthManager(rate_limit, per_item_limit)
+        self.engine.download_slots = threading.BoundedSemaphore(max(1, int(max_downloads)))
+        self.max_jobs = max(1, int(max_jobs))
+        self.allowed_roots = [Path(root).resolve() for root in (allowed_roots or [Path.home()])]
+        self.events = EventLog()
+        self.jobs = {}
+        self._queue = []  # heap of (-priority, url count, job id)
+        self._seq = itertools.count(1)
+        self._lock = threading.Lock()
+        self._queued = threading.Condition(self._lock)
+        self._stopping = threading.Event()
+        self._threads = []
+        self._servers = []
+        self._token = None
+        self.engine.metrics.add_gauge('daemon_jobs', "Daemon jobs by state.", self._job_counts)
+
+    def _job_counts(self):
+        with self._lock:
+            states = [job.state for job in self.jobs.values()]
+        return {(('state', state),): states.count(state) for state in JOB_STATES}
+
+    # --- Jobs ---
+    def check_dirs(self, config):
+        """Raises PermissionError unless the config's output and scratch folders lie below an allowed root."""
+        for folder in (config.output_dir, config.scratch_dir):
+            if folder is None:
+                continue
+            path = Path(folder).resolve()
+            if not any(path == root or root in path.parents for root in self.allowed_roots):
+                raise PermissionError(f"{folder} is outside the folders this daemon may write to")
+
+    def submit(self, config, priority=0, client=None):
+        """Queues a DownloadConfig and returns its DaemonJob."""
+        with self._lock:
+            job = DaemonJob(next(self._seq), config, priority, client)
+            self.jobs[job.id] = job
+            heapq.heappush(self._queue, (-priority, len(config.urls), job.id))
+            self._queued.notify()
+        self.events.publish('job', job.id, job.summary())
+        return job
+
+    def cancel(self, job_id):
+        """Cancels a queued job; returns False if it is already running or finished."""
+        with self._lock:
+            job = self.jobs[job_id]
+            if job.state != 'queued':
+                return False
+            job.state = 'cancelled'
+            job.finished = time.time()
+        self.events.publish('job', job.id, job.summary())
+        return True
+
+    def _next_job(self):
+        with self._queued:
+            while not self._stopping.is_set():
+                while self._queue:
+                    job = self.jobs[heapq.heappop(self._queue)[2]]
+                    if job.state == 'queued':
+                        job.state = 'running'
+                        job.started = time.time()
+                        return job
+                self._queued.wait()
+            return None
+
+    def _run_jobs(self):
+        while True:
+            job = self._next_job()
+            if job is None:
+                return
+            self.events.publish('job', job.id, job.summary())
+            result, state, error = None, 'done', None
+            try:
+                result = self.engine.run(job.config, monitor=job.progress)
+            except Exception as e:
+                state, error = 'failed', str(e)
+            with self._lock:
+                job.result, job.state, job.error, job.finished = result, state, error, time.time()
+            self._publish_progress(job)
+            self.events.publish('job', job.id, job.summary())
+
+    def _publish_progress(self, job):
+        changes = job.progress.changes()
+        for url, record in changes:
+            self.events.publish('item', job.id, _item_event(url, record))
+        return bool(changes)
+
+    def _sample_progress(self):
+        while not self._stopping.wait(1 / PROGRESS_FPS):
+            with self._lock:
+                running = [job for job in self.jobs.values() if job.state == 'running']
+            for job in running:
+                if self._publish_progress(job):
+                    self.events.publish('totals', job.id, job.progress.totals())
+
+    # --- Service ---
+    def start(self):
+        """Starts the job runners and the progress sampler."""
+        for target, count in ((self._run_jobs, self.max_jobs), (self._sample_progress, 1)):
+            for _ in range(count):
+                thread = threading.Thread(target=target, daemon=True)
+                thread.start()
+                self._threads.append(thread)
+        return self
+
+    def serve(self, address=None):
+        """Serves the job API on a Unix socket (default_daemon_address()) or a TCP port; returns the server.
+
+        The API (JSON bodies and responses):
+            POST   /jobs            submit {"config": {DownloadConfig fields}, "priority": 0, "client": "name"}
+            GET    /jobs            list job summaries
+            GET    /jobs/<id>       one job, with its per-item records once finished
+            DELETE /jobs/<id>       cancel a queued job
+            GET    /events          Server-Sent Events; ?job=<id> filters, Last-Event-ID or ?since=<seq> resumes
+            GET    /metrics         the engine's Prometheus metrics
+        A Unix socket is created with mode 0600, so only the daemon's user can connect. A TCP port
+        is open to every local user, so each request there must carry 'Authorization: Bearer
+        <token>', with the token the daemon writes to daemon.token in its app data folder (0600).
+        """
+        kind, *target = parse_address(address or default_daemon_address(self.engine.app_data_dir))
+        handler = self._make_handler()
+        if kind == 'unix':
+            path = Path(target[0])
+            path.unlink(missing_ok=True)
+            umask = os.umask(0o177)  # no window in which the socket is reachable by others
+            try:
+                server = ThreadingUnixHTTPServer(str(path), handler)
+            finally:
+                os.umask(umask)
+            os.chmod(path, 0o600)
+            server.token = None
+        else:
+            server = ThreadingHTTPServer(tuple(target), handler)
+            if self._token is None:
+                self._token = write_token_file(self.engine.app_data_dir / DAEMON_TOKEN_NAME)
+            server.token = self._token
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        self._servers.append(server)
+        return server
+
+    def stop(self):
+        """Stops accepting work; running batches are left to finish (or be resumed later from the job store)."""
+        self._stopping.set()
+        with self._queued:
+            self._queued.notify_all()
+        for server in self._servers:
+            server.shutdown()
+            server.server_close()
+            if isinstance(server, ThreadingUnixHTTPServer):
+                Path(server.server_address).unlink(missing_ok=True)
+
+    def _make_handler(self):
+        daemon = self
+
+        class DaemonHandler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def _send_json(self, status, data):
+                body = json.dumps(data).encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def _authorized(self):
+                token = self.server.token
+                sent = self.headers.get('Authorization', '')
+                if token is None or hmac.compare_digest(sent.encode(), f"Bearer {token}".encode()):
+                    return True
+                self._send_json(401, {'error': "Missing or wrong access token"})
+                return False
+
+            def _job(self, path):
+                try:
+                    return daemon.jobs[int(path.rsplit('/', 1)[1])]
+                except (KeyError, ValueError):
+                    self._send_json(404, {'error': "No such job"})
+                    return None
+
+            def do_GET(self):
+                if not self._authorized():
+                    return
+                parts = urlsplit(self.path)
+                path = parts.path.rstrip('/')
+                if path == '/jobs':
+                    with daemon._lock:
+                        jobs = list(daemon.jobs.values())
+                    self._send_json(200, [job.summary() for job in jobs])
+                elif path.startswith('/jobs/'):
+                    job = self._job(path)
+                    if job is not None:
+                        self._send_json(200, job.detail())
+                elif path == '/events':
+                    self._stream_events(parse_qs(parts.query))
+                elif path == '/metrics':
+                    body = daemon.engine.metrics.render().encode('utf-8')
+                    self.send_response(200)
+                    self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+                    self.send_header('Content-Length', str(len(body)))
+                    self.end_headers()
+                    self.wfile.write(body)
+                else:
+                    self._send_json(404, {'error': "Not found"})
+
+            def do_POST(self):
+                if not self._authorized():
+                    return
+                if urlsplit(self.path).path.rstrip('/') != '/jobs':
+                    self._send_json(404, {'error': "Not found"})
+                    return
+                try:
+                    request = json.loads(self.rfile.read(int(self.headers.get('Content-Length') or 0)) or b'{}')
+                    config = DownloadConfig(**request['config'])
+                    daemon.check_dirs(config)
+                    if not Path(config.output_dir).is_dir():
+                        raise ValueError(f"Output directory does not exist: {config.output_dir}")
+                    if not config.urls:
+                        raise ValueError("No URLs given")
+                    priority = int(request.get('priority') or 0)
+                except PermissionError as e:
+                    self._send_json(403, {'error': str(e)})
+                    return
+                except (ValueError, TypeError, KeyError) as e:
+                    self._send_json(400, {'error': str(e)})
+                    return
+                job = daemon.submit(config, priority, request.get('client'))
+                self._send_json(201, job.summary())
+
+            def do_DELETE(self):
+                if not self._authorized():
+                    return
+                job = self._job(urlsplit(self.path).path.rstrip('/'))
+                if job is None:
+                    return
+                if daemon.cancel(job.id):
+                    self._send_json(200, job.summary())
+                else:
+                    self._send_json(409, {'error': f"Job {job.id} is {job.state}; only queued jobs can be cancelled"})
+
+            def _stream_events(self, query):
+                try:
+                    job_id = int(query['job'][0]) if query.get('job') else None
+                    seq = int(self.headers.get('Last-Event-ID') or (query.get('since') or ['0'])[0])
+                except ValueError:
+                    self._send_json(400, {'error': "job, since and Last-Event-ID must be integers"})
+                    return
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/event-stream')
+                self.send_header('Cache-Control', 'no-cache')
+                self.send_header('Connection', 'close')
+                self.end_headers()
+                self.close_connection = True
+                try:
+                    while not daemon._stopping.is_set():
+                        events = daemon.events.since(seq, timeout=KEEPALIVE_INTERVAL)
+                        if not events:
+                            self.wfile.write(b": keepalive\n\n")
+                        for event in events:
+                            seq = event['seq']
+                            if job_id is None or event['job'] == job_id:
+                                self.wfile.write(f"id: {seq}\nevent: {event['type']}\ndata: {json.dumps(event)}\n\n"
+                                                 .encode('utf-8'))
+                        self.wfile.flush()
+                except (BrokenPipeError, ConnectionResetError):
+                    pass
+
+            def log_message(self, *args):
+                pass
+
+        return DaemonHandler
+
+
+class ThreadingUnixHTTPServer(socketserver.ThreadingUnixStreamServer):
+    daemon_threads = True
+
+    def get_request(self):
+        request, _ = super().get_request()
+        return request, ('unix', 0)  # BaseHTTPRequestHandler expects a (host, port) client address
+
+
+# --- Thin Client ---
+class UnixHTTPConnection(http.client.HTTPConnection):
+    def __init__(self, path, timeout=None):
+        super().__init__('localhost', timeout=timeout)
+        self.path = path
+
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(self.timeout)
+        self.sock.connect(self.path)
+
+
+class DaemonError(RuntimeError):
+    pass
+
+
+class DaemonClient:
+    """Talks to a DownloadDaemon; run() has the same shape as DownloadEngine.run(), so a GUI or the
+    CLI can hand batches to the shared daemon instead of downloading in-process.
+
+    A TCP address needs the daemon's access token, read from token_file (daemon.token in the
+    app data folder by default) unless token is given.
+    """
+
+    def __init__(self, address=None, client_name=None, timeout=30, token=None, token_file=None):
+        self.address = parse_address(address or default_daemon_address())
+        self.client_name = client_name
+        self.timeout = timeout
+        if token is None and self.address[0] == 'tcp':
+            try:
+                token = Path(token_file or get_app_data_dir() / DAEMON_TOKEN_NAME).read_text(encoding='utf-8').strip()
+            except OSError:
+                pass  # the daemon answers 401, which request() reports
+        self._headers = {'Authorization': f"Bearer {token}"} if token else {}
+
+    def _connection(self, timeout):
+        if self.address[0] == 'unix':
+            return UnixHTTPConnection(self.address[1], timeout=timeout)
+        return http.client.HTTPConnection(self.address[1], self.address[2], timeout=timeout)
+
+    def request(self, method, path, data=None):
+        conn = self._connection(self.timeout)
+        try:
+            body = json.dumps(data).encode('utf-8') if data is not None else None
+            headers = dict(self._headers, **({'Content-Type': 'application/json'} if body else {}))
+            conn.request(method, path, body=body, headers=headers)
+            response = conn.getresponse()
+            payload = json.loads(response.read() or b'null')
+        except (OSError, http.client.HTTPException, ValueError) as e:
+            raise DaemonError(f"Cannot reach the download daemon: {e}")
+        finally:
+            conn.close()
+        if response.status >= 400:
+            raise DaemonError((payload or {}).get('error') or f"HTTP {response.status}")
+        return payload
+
+    def submit(self, config, priority=0):
+        data = config.to_dict()
+        # The daemon runs in its own working directory: send relative folders as absolute paths.
+        for key in ('output_dir', 'scratch_dir'):
+            if data[key]:
+                data[key] = str(Path(data[key]).resolve())
+        return self.request('POST', '/jobs', {'config': data, 'priority': priority, 'client': self.client_name})
+
+    def jobs(self):
+        return self.request('GET', '/jobs')
+
+    def job(self, job_id):
+        return self.request('GET', f'/jobs/{job_id}')
+
+    def cancel(self, job_id):
+        return self.request('DELETE', f'/jobs/{job_id}')
+
+    def events(self, job_id=None, since=0):
+        """Yields event dicts as the daemon publishes them (reconnecting where it left off).
+
+        Each time the stream is (re)opened a {'type': 'connected', 'seq': since} event comes first:
+        events evicted from the daemon's backlog meanwhile are lost, so callers waiting for a
+        job's end should then check its state.
+        """
+        query = f"?job={job_id}" if job_id is not None else ""
+        while True:
+            conn = self._connection(KEEPALIVE_INTERVAL * 2)
+            try:
+                conn.request('GET', '/events' + query, headers=dict(self._headers, **{'Last-Event-ID': str(since)}))
+                response = conn.getresponse()
+                if response.status != 200:
+                    payload = json.loads(response.read() or b'null') or {}
+                    raise DaemonError(payload.get('error') or f"HTTP {response.status}")
+                yield {'seq': since, 'type': 'connected', 'job': job_id, 'time': time.time(), 'data': None}
+                data = None
+                while True:
+                    line = response.fp.readline()
+                    if not line:
+                        break
+                    line = line.decode('utf-8').rstrip('\r\n')
+                    if line.startswith('data: '):
+                        data = line[len('data: '):]
+                    elif not line and data:
+                        event = json.loads(data)
+                        since, data = event['seq'], None
+                        yield event
+            except (ConnectionRefusedError, FileNotFoundError) as e:
+                raise DaemonError(f"Cannot reach the download daemon: {e}")
+            except (OSError, http.client.HTTPException):
+                time.sleep(1)  # dropped or timed-out stream; resume after the last event seen
+            finally:
+                conn.close()
+
+    def run(self, config, progress_hook=None, monitor=None, priority=0):
+        """Submits a batch and returns a BatchResult, like DownloadEngine.run().
+
+        Item events reach monitor as update()/set_state() calls and progress_hook as yt-dlp-style
+        progress dicts ('downloading' while transferring, 'finished' once an item is done).
+        """
+        job = self.submit(config, priority)
+        finished_states = ('done', 'failed', 'cancelled')
+        for event in self.events(job['id']):
+            data = event['data']
+            if event['type'] == 'connected':
+                if self.job(job['id'])['state'] in finished_states:
+                    break  # it ended while we were not listening
+            elif event['type'] == 'item':
+                progress = {'status': 'downloading' if data['status'] == 'downloading' else 'finished',
+                            'info_dict': {'title': data['title'], 'webpage_url': data['url']},
+                            'downloaded_bytes': data['downloaded_bytes'], 'total_bytes': data['total_bytes'],
+                            'speed': data['speed'], 'eta': data['eta']}
+                if progress_hook is not None and data['status'] in ('downloading', 'done'):
+                    progress_hook(progress)
+                if monitor is None:
+                    continue
+                if data['status'] == 'downloading':
+                    monitor.update(data['url'], progress)
+                else:
+                    monitor.set_state(data['url'], data['status'], data['error'])
+            elif event['type'] == 'job' and data['state'] in finished_states:
+                break
+
+        detail = self.job(job['id'])
+        if detail['state'] != 'done':
+            raise DaemonError(detail.get('error') or f"Job {job['id']} was {detail['state']}")
+        return BatchResult(detail['results'], detail['skipped'], records=[ItemResult.from_dict(row) for row in
+                                                                          detail['records']])
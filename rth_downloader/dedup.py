@@ -0,0 +1,171 @@
+import errno
+import hashlib
+import os
+import shutil
+import sqlite3
+import sys
+import threading
+import time
+from pathlib import Path
+
+HASH_CHUNK_SIZE = 1024 * 1024
+FICLONE = 0x40049409  # Linux ioctl: share the source file's extents (Btrfs, XFS, bcachefs)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS media (
+    path TEXT PRIMARY KEY,
+    variant TEXT NOT NULL,
+    archive_id TEXT,
+    sha256 TEXT,
+    title TEXT,
+    size INTEGER NOT NULL,
+    transcode_cpu REAL,
+    created REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS media_by_id ON media (variant, archive_id);
+CREATE INDEX IF NOT EXISTS media_by_hash ON media (variant, sha256);
+"""
+
+
+def hash_files(paths):
+    """SHA-256 over the contents of one or more files (e.g. the video and audio of a merge)."""
+    digest = hashlib.sha256()
+    for path in paths:
+        with open(path, 'rb') as f:
+            while chunk := f.read(HASH_CHUNK_SIZE):
+                digest.update(chunk)
+        digest.update(b'\0')
+    return digest.hexdigest()
+
+
+def _reflink(src, dst):
+    if not sys.platform.startswith('linux'):
+        raise OSError(errno.EOPNOTSUPP, "reflinks are only tried on Linux")
+    import fcntl
+    with open(src, 'rb') as source, open(dst, 'wb') as target:
+        try:
+            fcntl.ioctl(target.fileno(), FICLONE, source.fileno())
+        except OSError:
+            target.close()
+            os.remove(dst)
+            raise
+
+
+def _check_free(dst):
+    if os.path.lexists(dst):
+        raise FileExistsError(errno.EEXIST, "File exists", str(dst))
+
+
+def link_file(src, dst, replace=True):
+    """Makes dst a copy of src that shares its storage; returns 'reflink', 'hardlink' or 'copy'.
+
+    A reflink (copy-on-write clone) is preferred, since later edits to either file (e.g. tag
+    editors) stay separate; a hardlink needs only the same volume; a plain copy is the fallback.
+    dst appears atomically and replaces any existing file, unless replace is False: then an
+    existing dst raises FileExistsError.
+    """
+    src, dst = Path(src), Path(dst)
+    if not replace:
+        _check_free(dst)
+    dst.parent.mkdir(parents=True, exist_ok=True)
+    temp_path = dst.with_name(dst.name + '.part')
+    temp_path.unlink(missing_ok=True)
+    for method, make in (('reflink', _reflink), ('hardlink', os.link), ('copy', shutil.copyfile)):
+        try:
+            make(src, temp_path)
+        except OSError:
+            if method == 'copy':
+                raise
+            continue
+        if not replace:
+            try:
+                _check_free(dst)  # created meanwhile
+            except FileExistsError:
+                temp_path.unlink(missing_ok=True)
+                raise
+        os.replace(temp_path, dst)
+        return method
+
+
+# --- Items Being Fetched ---
+class InFlightItems:
+    """Videos some worker is fetching right now, by (variant, video id).
+
+    Shared by every worker pool of an engine, so a worker of any batch that meets a video
+    another worker is still fetching waits for it instead of downloading it a second time.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._items = {}  # key -> threading.Event set once the item is finished
+
+    def claim(self, key):
+        """Marks key as being fetched and returns True; if another worker holds it, waits for it and returns False."""
+        with self._lock:
+            event = self._items.get(key)
+            if event is None:
+                self._items[key] = threading.Event()
+                return True
+        event.wait()
+        return False
+
+    def release(self, key):
+        with self._lock:
+            event = self._items.pop(key, None)
+        if event is not None:
+            event.set()
+
+
+# --- Content-Addressed Media Index ---
+class DedupIndex:
+    """Finished output files by (variant, video id) and by (variant, SHA-256 of the raw download).
+
+    Lets a repeat of the same video (another URL form, a playlist entry, a different output
+    folder) or of byte-identical media under another id reuse the existing file instead of
+    being downloaded or transcoded again. Rows whose file has gone or changed size are dropped
+    on lookup. Shares the journaled-SQLite setup of jobs.JobStore.
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False, isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.executescript(SCHEMA)
+
+    def add(self, path, variant, archive_id=None, sha256=None, title=None, transcode_cpu=None):
+        """Records a finished output file (its size is read from disk)."""
+        path = os.path.abspath(path)
+        with self._lock:
+            self._conn.execute(
+                'INSERT OR REPLACE INTO media (path, variant, archive_id, sha256, title, size, transcode_cpu, created) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                (path, variant, archive_id, sha256, title, os.path.getsize(path), transcode_cpu, time.time()))
+
+    def find(self, variant, archive_id=None, sha256=None):
+        """Returns the newest intact entry (a dict) for a video id or content hash, or None."""
+        if archive_id:
+            column, value = 'archive_id', archive_id
+        elif sha256:
+            column, value = 'sha256', sha256
+        else:
+            return None
+        with self._lock:
+            rows = self._conn.execute(f'SELECT * FROM media WHERE variant = ? AND {column} = ? ORDER BY created DESC',
+                                      (variant, value)).fetchall()
+        for row in rows:
+            try:
+                intact = os.path.getsize(row['path']) == row['size']
+            except OSError:
+                intact = False
+            if intact:
+                return dict(row)
+            with self._lock:
+                self._conn.execute('DELETE FROM media WHERE path = ?', (row['path'],))
+        return None
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
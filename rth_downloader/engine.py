@@ -0,0 +1,242 @@
+import threading
+from pathlib import Path
+
+from .archive import DownloadArchive
+from .bandwidth import BandwidthManager
+from .cache import InfoCache
+from .config import DownloadConfig
+from .dedup import DedupIndex, InFlightItems
+from .jobs import JobStore
+from .metrics import Metrics
+from .paths import get_app_data_dir
+from .planner import format_options
+from .pool import DownloadWorkerPool
+from .report import BatchResult
+from .retry import GlobalBackoff, RetryPolicy
+from .session import DownloadSession
+from .storage import OutputManager
+from .toolchain import FFmpegNotFoundError, get_toolchain
+from .transcode import TranscodeStage
+
+
+# --- yt-dlp Options Configuration ---
+def build_ydl_options(config, toolchain, progress_hook=None):
+    """Builds the yt-dlp options and transcode-stage options for a DownloadConfig and probed Toolchain."""
+    output_dir = Path(config.output_dir)
+    final_outtmpl = str(output_dir / '%(title)s.%(ext)s')
+    # Raw streams go to the scratch volume if one is set; only finished files land in output_dir.
+    raw_dir = Path(config.scratch_dir) if config.scratch_dir else output_dir
+
+    ydl_opts = {
+        'outtmpl': str(raw_dir / '%(title)s.%(ext)s'),
+        'keep_intermediate_files': False,
+        'ignoreerrors': True,
+        'continuedl': True,  # resume leftover .part files with HTTP range requests
+        'progress_hooks': [progress_hook] if progress_hook else [],
+        'noplaylist': not config.playlist,
+    }
+
+    # Only set executables if the bundled files exist
+    if toolchain.bundled:
+        ydl_opts['executables'] = {
+            'postprocessor': toolchain.ffmpeg,
+            'downloader': toolchain.ffmpeg,
+        }
+
+    # Post-processing (MP3 extraction / stream merge) runs in the TranscodeStage process pool,
+    # so downloads only write raw streams and move straight on to the next item.
+    # The planner prefers sources the target can take by stream copy instead of a re-encode.
+    ydl_opts.update(format_options(config.mode, config.quality, config.audio_format))
+    if config.mode == "video":
+        ydl_opts['outtmpl'] = str(raw_dir / '%(title)s.f%(format_id)s.%(ext)s')
+    elif config.stream_audio:
+        # Audio encoded while downloading is left under the raw name with the target extension;
+        # as with yt-dlp's own --extract-audio, final_ext makes yt-dlp take it as the download.
+        ydl_opts['final_ext'] = config.audio_format
+
+    # The archive keeps MP3 entries as '<mode>:<quality>' so existing archives stay valid.
+    if config.mode == "audio" and config.audio_format != 'mp3':
+        variant = f"audio:{config.audio_format}"
+    else:
+        variant = f"{config.mode}:{config.quality}"
+
+    transcode_options = {'mode': config.mode, 'quality': config.quality, 'final_outtmpl': final_outtmpl,
+                         'audio_format': config.audio_format, 'audio_encoder': toolchain.mp3_encoder,
+                         'muxers': toolchain.muxers, 'variant': variant}
+    return ydl_opts, transcode_options
+
+
+# --- Download Engine ---
+class DownloadEngine:
+    """Runs download batches; owns the state shared across batches (info cache, job store, HTTP session, metrics).
+
+    Finished outputs are indexed in media_index.sqlite3 (dedup.DedupIndex), so repeats of a video
+    or of identical media are linked instead of downloaded and converted again. After every batch the metrics
+    are written in Prometheus text format to metrics_path (metrics.prom in the app data folder by default).
+
+    Batches may run concurrently from several threads (see daemon.DownloadDaemon). They share one
+    download archive and one set of in-flight items, so a video two batches ask for at the same
+    time is fetched once and skipped or linked by the other. To hold them to global limits, set
+    bandwidth to a shared bandwidth.BandwidthManager (it then replaces each batch's own rate
+    limits) and download_slots to a semaphore bounding the downloads running at once. All batches
+    hand their FFmpeg jobs to one TranscodeStage, created with the first batch, so the encoder
+    processes are started once and never outnumber the CPUs however many batches run.
+    """
+
+    def __init__(self, app_data_dir=None):
+        self.app_data_dir = Path(app_data_dir) if app_data_dir else get_app_data_dir()
+        self.info_cache = InfoCache(cache_dir=self.app_data_dir / "info_cache")
+        self.job_store = JobStore(self.app_data_dir / "jobs.sqlite3")
+        self.dedup_index = DedupIndex(self.app_data_dir / "media_index.sqlite3")
+        self.archive = DownloadArchive(self.app_data_dir / "download_archive.txt")
+        self.in_flight = InFlightItems()
+        self.backoff = GlobalBackoff()  # one 429 pause for every batch, as they all hit the same sites
+        self.session = DownloadSession()
+        self.metrics = Metrics()
+        self.metrics_path = self.app_data_dir / "metrics.prom"
+        self.bandwidth = None
+        self.download_slots = None
+        self._transcode_stage = None
+        self._pools = set()  # worker pools of the batches running now
+        self._lock = threading.Lock()
+        self._add_session_gauges()
+
+    def _add_session_gauges(self):
+        stats = self.session.stats
+        self.metrics.add_gauge('http_requests', "HTTP requests sent through the shared session.",
+                               lambda: stats.snapshot()['requests'])
+        self.metrics.add_gauge('http_connections', "New HTTP connections opened.",
+                               lambda: stats.snapshot()['connections'])
+        self.metrics.add_gauge('http_tls_handshake_seconds', "Time spent in TLS handshakes.",
+                               lambda: stats.snapshot()['tls_handshake_time'])
+        self.metrics.add_gauge('traced_memory_bytes', "Python heap traced by tracemalloc (while it runs).",
+                               self.metrics.profiler.traced_memory)
+        cache = self.info_cache
+        self.metrics.add_gauge('info_cache_lookups', "Extraction cache lookups, by result.",
+                               lambda: self._cache_lookups(cache.stats()))
+        self.metrics.add_gauge('queued_items', "URLs waiting for a download worker, over all running batches.",
+                               self._queued_items)
+
+    @staticmethod
+    def _cache_lookups(stats):
+        return {(('result', 'memory_hit'),): stats['hits'] - stats['disk_hits'],
+                (('result', 'disk_hit'),): stats['disk_hits'], (('result', 'miss'),): stats['misses']}
+
+    def _queued_items(self):
+        with self._lock:
+            pools = list(self._pools)
+        return sum(pool.queued() for pool in pools)
+
+    def run(self, config, progress_hook=None, monitor=None):
+        """Downloads every URL in the config and returns a BatchResult.
+
+        progress_hook is a plain yt-dlp progress hook; monitor (e.g. a ProgressAggregator) gets
+        per-item update(url, d) and set_state(url, state, error) calls.
+        Raises FFmpegNotFoundError before any download starts if FFmpeg is missing or unsuitable.
+        """
+        toolchain = get_toolchain()
+        toolchain.require(config.mode, config.audio_format)
+        batch_id = self.job_store.create_batch(config)
+        return self._run_batch(config, batch_id, toolchain, progress_hook, monitor)
+
+    def resume(self, batch_id, progress_hook=None, monitor=None):
+        """Continues an interrupted batch: done items are skipped, failed and partial ones are retried."""
+        config_data, items = self.job_store.load_batch(batch_id)
+        config = DownloadConfig(**config_data)
+        toolchain = get_toolchain()
+        toolchain.require(config.mode, config.audio_format)
+        return self._run_batch(config, batch_id, toolchain, progress_hook, monitor, items=items)
+
+    def discard(self, batch_id):
+        """Abandons an unfinished batch and deletes the partial files it left behind."""
+        for tmp_path in self.job_store.discard_batch(batch_id):
+            for path in (Path(tmp_path), Path(tmp_path + '.ytdl')):
+                path.unlink(missing_ok=True)
+
+    def close(self):
+        """Waits for queued transcodes and closes the HTTP session (e.g. at exit); the engine is unusable after."""
+        with self._lock:
+            stage, self._transcode_stage = self._transcode_stage, None
+        if stage is not None:
+            stage.close()
+        self.session.close()
+
+    def _get_transcode_stage(self, ffmpeg):
+        with self._lock:
+            if self._transcode_stage is None:
+                self._transcode_stage = TranscodeStage(ffmpeg=ffmpeg)
+            return self._transcode_stage
+
+    @staticmethod
+    def _run_pool(pool, config, items):
+        if items is None:
+            if config.playlist:
+                return pool.run_streaming(config.urls)
+            return pool.run(config.urls)
+        remaining = [item for item in items if item['state'] != 'done']
+        if config.playlist:
+            return pool.run_streaming(
+                [item['url'] for item in remaining if item['kind'] == 'playlist'],
+                pending_urls=[item['url'] for item in remaining if item['kind'] != 'playlist'],
+                known_urls=[item['url'] for item in items if item['kind'] != 'playlist'])
+        return pool.run([item['url'] for item in remaining])
+
+    def _run_batch(self, config, batch_id, toolchain, progress_hook, monitor, items=None):
+        ydl_opts, transcode_options = build_ydl_options(config, toolchain, progress_hook)
+        store = self.job_store
+        bandwidth = self.bandwidth or BandwidthManager(config.rate_limit, config.per_item_rate_limit)
+
+        def on_state(url, state, error):
+            if state == 'downloading':
+                bandwidth.start_item((batch_id, url))
+            else:
+                bandwidth.finish_item((batch_id, url))
+            store.set_state(batch_id, url, state, error)
+            if monitor:
+                monitor.set_state(url, state, error)
+
+        def on_progress(url, d):
+            bandwidth.on_progress((batch_id, url), d)
+            if d['status'] == 'downloading':
+                store.update_progress(batch_id, url, d.get('downloaded_bytes'),
+                                      d.get('total_bytes') or d.get('total_bytes_estimate'), d.get('tmpfilename'))
+            if monitor:
+                monitor.update(url, d)
+
+        if monitor:
+            queued = config.urls if items is None else [item['url'] for item in items if item['state'] != 'done']
+            for url in queued:
+                monitor.set_state(url, 'pending')
+
+        output_manager = OutputManager(config.output_dir, config.scratch_dir, config.min_free_space)
+        pool = DownloadWorkerPool(ydl_opts, max_workers=config.max_workers,
+                                  transcode_stage=self._get_transcode_stage(toolchain.ffmpeg),
+                                  transcode_options=transcode_options,
+                                  archive=self.archive if config.skip_archived else None,
+                                  info_cache=self.info_cache,
+                                  state_callback=on_state, progress_callback=on_progress,
+                                  connections=config.connections,
+                                  retry_policy=RetryPolicy(config.retries), backoff=self.backoff,
+                                  session=self.session, metrics=self.metrics, output_manager=output_manager,
+                                  dedup=self.dedup_index if config.dedup else None,
+                                  per_host_limit=config.per_host_limit, priorities=config.priorities,
+                                  slots=self.download_slots, in_flight=self.in_flight,
+                                  stream_audio=config.mode == "audio" and config.stream_audio)
+        with self._lock:
+            self._pools.add(pool)
+        try:
+            results = self._run_pool(pool, config, items)
+        finally:
+            with self._lock:
+                self._pools.discard(pool)
+
+        result = BatchResult(results, pool.skipped, batch_id=batch_id, records=pool.records,
+                             network=self.session.stats.snapshot())
+        if self.metrics_path:
+            try:
+                self.metrics.write(self.metrics_path)
+            except OSError:
+                pass  # metrics are diagnostics; never fail a finished batch over them
+        if not result.failed:
+            store.finish_batch(batch_id)
+        return result
@@ -0,0 +1,128 @@
+import json
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+ITEM_STATES = ('pending', 'downloading', 'retrying', 'paused', 'post-processing', 'done', 'failed')
+PROGRESS_WRITE_INTERVAL = 1.0  # seconds between byte-offset writes per item
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS batches (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    created REAL NOT NULL,
+    config TEXT NOT NULL,
+    finished INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS items (
+    batch_id INTEGER NOT NULL REFERENCES batches(id),
+    url TEXT NOT NULL,
+    kind TEXT NOT NULL DEFAULT 'video',
+    state TEXT NOT NULL DEFAULT 'pending',
+    downloaded_bytes INTEGER NOT NULL DEFAULT 0,
+    total_bytes INTEGER,
+    tmp_path TEXT,
+    error TEXT,
+    updated REAL NOT NULL,
+    PRIMARY KEY (batch_id, url)
+);
+"""
+
+
+# --- Resumable Job Queue ---
+class JobStore:
+    """Crash-safe record of download batches and per-item state in a journaled SQLite file.
+
+    Every state change is committed through SQLite's write-ahead log, so a batch that was
+    interrupted by closing the app or a crash can be resumed where it stopped: finished items
+    are skipped and partial downloads continue from their .part file via HTTP range requests.
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        self._last_progress_write = {}
+
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False, isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.executescript(SCHEMA)
+
+    def create_batch(self, config):
+        """Records a new batch with all of its input URLs pending; returns the batch id."""
+        config_data = config.to_dict()
+        kind = 'playlist' if config.playlist else 'video'
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.execute('BEGIN')
+            cursor = self._conn.execute('INSERT INTO batches (created, config) VALUES (?, ?)',
+                                        (now, json.dumps(config_data)))
+            batch_id = cursor.lastrowid
+            self._conn.executemany(
+                'INSERT OR IGNORE INTO items (batch_id, url, kind, updated) VALUES (?, ?, ?, ?)',
+                [(batch_id, url, kind, now) for url in config.urls])
+        return batch_id
+
+    def set_state(self, batch_id, url, state, error=None):
+        """Records an item's state, adding the item (e.g. a playlist entry) if it is new."""
+        if state not in ITEM_STATES:
+            raise ValueError(f"Unknown item state '{state}'")
+        with self._lock:
+            self._conn.execute(
+                'INSERT INTO items (batch_id, url, state, error, updated) VALUES (?, ?, ?, ?, ?) '
+                'ON CONFLICT (batch_id, url) DO UPDATE SET state = excluded.state, error = excluded.error, '
+                'updated = excluded.updated',
+                (batch_id, url, state, error, time.time()))
+            if state in ('done', 'failed'):
+                self._last_progress_write.pop((batch_id, url), None)
+
+    def update_progress(self, batch_id, url, downloaded_bytes, total_bytes, tmp_path):
+        """Records the byte offset of a partial download (at most once per PROGRESS_WRITE_INTERVAL)."""
+        now = time.time()
+        key = (batch_id, url)
+        with self._lock:
+            if now - self._last_progress_write.get(key, 0) < PROGRESS_WRITE_INTERVAL:
+                return
+            self._last_progress_write[key] = now
+            self._conn.execute(
+                'UPDATE items SET downloaded_bytes = ?, total_bytes = ?, tmp_path = ?, updated = ? '
+                'WHERE batch_id = ? AND url = ?',
+                (downloaded_bytes or 0, total_bytes, tmp_path, now, batch_id, url))
+
+    def load_batch(self, batch_id):
+        """Returns (config dict, list of item dicts) for a batch."""
+        with self._lock:
+            row = self._conn.execute('SELECT config FROM batches WHERE id = ?', (batch_id,)).fetchone()
+            if row is None:
+                raise KeyError(f"No batch with id {batch_id}")
+            items = self._conn.execute('SELECT * FROM items WHERE batch_id = ? ORDER BY rowid',
+                                       (batch_id,)).fetchall()
+        return json.loads(row['config']), [dict(item) for item in items]
+
+    def latest_unfinished_batch(self):
+        """Returns a summary dict of the most recent unfinished batch, or None."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT b.id, b.created, COUNT(i.url) AS remaining, COALESCE(SUM(i.downloaded_bytes), 0) AS partial "
+                "FROM batches b JOIN items i ON i.batch_id = b.id AND i.state != 'done' "
+                "WHERE b.finished = 0 GROUP BY b.id ORDER BY b.id DESC LIMIT 1").fetchone()
+        return dict(row) if row else None
+
+    def finish_batch(self, batch_id):
+        with self._lock:
+            self._conn.execute('UPDATE batches SET finished = 1 WHERE id = ?', (batch_id,))
+
+    def discard_batch(self, batch_id):
+        """Marks a batch as abandoned and returns the temp-file paths of its unfinished items."""
+        with self._lock, self._conn:
+            self._conn.execute('BEGIN')
+            rows = self._conn.execute(
+                "SELECT tmp_path FROM items WHERE batch_id = ? AND state != 'done' AND tmp_path IS NOT NULL",
+                (batch_id,)).fetchall()
+            self._conn.execute('UPDATE batches SET finished = 1 WHERE id = ?', (batch_id,))
+        return [row['tmp_path'] for row in rows]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
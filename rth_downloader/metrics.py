@@ -0,0 +1,316 @@
+import contextlib
+import cProfile
+import hmac
+import io
+import os
+import pstats
+import threading
+import time
+import tracemalloc
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+from .paths import write_token_file
+
+
+# --- Metrics Registry ---
+# Phases of an item's life, in pipeline order (all in seconds):
+#   queue          queued until a worker picks the URL up
+#   extract        worker start until the first transfer byte (metadata extraction, format selection, connect)
+#   transfer       network transfer of each file, including yt-dlp's writes to the .part file
+#   finalize       end of the last transfer until the output is handed on (renames, moves, yt-dlp fixups)
+#   progress_hook  time spent in the progress callbacks (UI aggregation and job-store writes)
+#   transcode      FFmpeg conversion, merge or stream copy in the transcode stage; for audio encoded
+#                  while downloading, the encoder's run after the last byte (also part of finalize)
+#   ui_refresh     one GUI refresh on the Tk thread
+PHASES = ('queue', 'extract', 'transfer', 'finalize', 'progress_hook', 'transcode', 'ui_refresh')
+BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 5, 10, 30, 60, 300)
+COUNTERS = {
+    'items_total': "Items finished, by status.",
+    'attempts_total': "Download attempts, retries included.",
+    'downloaded_bytes_total': "Bytes of media downloaded.",
+    'progress_hook_calls_total': "yt-dlp progress hook calls.",
+    'transcode_cpu_seconds_total': "FFmpeg CPU time (user + system).",
+}
+PROMETHEUS_PREFIX = 'rth_'
+PROFILE_TOP = 30  # lines of cProfile/tracemalloc summary returned by stop_*()
+
+
+class Metrics:
+    """Thread-safe phase timings (as histograms), counters and gauges, rendered as Prometheus text.
+
+    Gauges are read at render time from callables registered with add_gauge(), so the registry
+    never polls. Writing a file with write() suits a node_exporter textfile collector; MetricsServer
+    serves the same text over HTTP. Each Metrics also owns a runtime-toggled Profiler.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._histograms = {}  # phase -> [bucket counts..., count, sum]
+        self._counters = {}  # (name, labels) -> value
+        self._gauges = {}  # name -> (help, callable returning a number or {labels: number})
+        self.profiler = Profiler()
+
+    def observe(self, phase, seconds):
+        with self._lock:
+            histogram = self._histograms.get(phase)
+            if histogram is None:
+                histogram = self._histograms[phase] = [0] * (len(BUCKETS) + 2)
+            for i, bound in enumerate(BUCKETS):
+                if seconds <= bound:
+                    histogram[i] += 1
+            histogram[-2] += 1
+            histogram[-1] += seconds
+
+    @contextlib.contextmanager
+    def timed(self, phase):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(phase, time.perf_counter() - started)
+
+    def inc(self, name, value=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def add_gauge(self, name, help_text, read):
+        self._gauges[name] = (help_text, read)
+
+    def phase_totals(self):
+        """Returns {phase: (count, total seconds)} for the phases observed so far."""
+        with self._lock:
+            return {phase: (histogram[-2], histogram[-1]) for phase, histogram in self._histograms.items()}
+
+    def render(self):
+        """Returns all metrics in the Prometheus text exposition format."""
+        with self._lock:
+            histograms = {phase: list(histogram) for phase, histogram in self._histograms.items()}
+            counters = dict(self._counters)
+
+        name = PROMETHEUS_PREFIX + 'phase_seconds'
+        lines = [f"# HELP {name} Time spent per item in each pipeline phase.", f"# TYPE {name} histogram"]
+        for phase in sorted(histograms, key=lambda p: PHASES.index(p) if p in PHASES else len(PHASES)):
+            histogram = histograms[phase]
+            for bound, count in zip(BUCKETS, histogram):
+                lines.append(f'{name}_bucket{{phase="{phase}",le="{bound}"}} {count}')
+            lines.append(f'{name}_bucket{{phase="{phase}",le="+Inf"}} {histogram[-2]}')
+            lines.append(f'{name}_sum{{phase="{phase}"}} {histogram[-1]:.6f}')
+            lines.append(f'{name}_count{{phase="{phase}"}} {histogram[-2]}')
+
+        for counter, help_text in COUNTERS.items():
+            values = [(labels, value) for (key, labels), value in counters.items() if key == counter]
+            if not values:
+                continue
+            name = PROMETHEUS_PREFIX + counter
+            lines += [f"# HELP {name} {help_text}", f"# TYPE {name} counter"]
+            lines += [f"{name}{_labels(labels)} {_number(value)}" for labels, value in sorted(values)]
+
+        for gauge, (help_text, read) in sorted(self._gauges.items()):
+            try:
+                value = read()
+            except Exception:
+                continue  # a gauge must never break the export
+            if value is None:
+                continue
+            values = value.items() if isinstance(value, dict) else [((), value)]
+            name = PROMETHEUS_PREFIX + gauge
+            lines += [f"# HELP {name} {help_text}", f"# TYPE {name} gauge"]
+            lines += [f"{name}{_labels(labels)} {_number(number)}" for labels, number in values]
+        return "\n".join(lines) + "\n"
+
+    def write(self, path):
+        """Writes render() to path atomically, so a scraper never reads a half-written file."""
+        path = Path(path)
+        tmp_path = path.with_name(path.name + '.tmp')
+        tmp_path.write_text(self.render(), encoding='utf-8')
+        os.replace(tmp_path, path)
+
+
+def _number(value):
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+def _labels(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{value}"' for key, value in labels) + "}"
+
+
+# --- Runtime Profiling ---
+class Profiler:
+    """cProfile and tracemalloc capture that can be switched on and off while a batch runs.
+
+    cProfile only sees the thread that enabled it, so worker threads wrap each item in
+    profiled(); the per-thread profiles are merged by stop_profile(). If another profiler
+    already owns a thread, that thread is left out rather than failing the download.
+    tracemalloc slows pure-Python code several times over, so keep traces short.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._profiles = []
+        self._local = threading.local()
+        self.profiling = False
+
+    @property
+    def tracing(self):
+        return tracemalloc.is_tracing()
+
+    def start_profile(self):
+        with self._lock:
+            if not self.profiling:
+                self._profiles = []
+                self._local = threading.local()
+                self.profiling = True
+
+    @contextlib.contextmanager
+    def profiled(self):
+        """Profiles the enclosed block on the current thread while profiling is on."""
+        profile = None
+        if self.profiling:
+            profile = getattr(self._local, 'profile', None)
+            if profile is None:
+                profile = self._local.profile = cProfile.Profile()
+                with self._lock:
+                    self._profiles.append(profile)
+            try:
+                profile.enable()
+            except ValueError:
+                profile = None
+        try:
+            yield
+        finally:
+            if profile is not None:
+                profile.disable()
+
+    def stop_profile(self, path=None):
+        """Stops profiling; dumps the merged stats to path (for snakeviz/pstats) and returns a summary."""
+        with self._lock:
+            profiles, self._profiles = self._profiles, []
+            self.profiling = False
+        profiles = [profile for profile in profiles if profile.getstats()]
+        if not profiles:
+            return "No profile data (no item ran while profiling was on)."
+        stats = pstats.Stats(*profiles, stream=io.StringIO())
+        if path:
+            stats.dump_stats(str(path))
+        stats.sort_stats('cumulative').print_stats(PROFILE_TOP)
+        return stats.stream.getvalue()
+
+    def start_tracemalloc(self, frames=1):
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(frames)
+
+    def stop_tracemalloc(self, path=None):
+        """Stops tracemalloc and returns (and optionally writes) the top allocation sites."""
+        if not tracemalloc.is_tracing():
+            return "tracemalloc is not running."
+        snapshot = tracemalloc.take_snapshot()
+        current, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        lines = [f"Traced memory: {current / 1024 ** 2:.1f} MiB current, {peak / 1024 ** 2:.1f} MiB peak"]
+        lines += [str(stat) for stat in snapshot.statistics('lineno')[:PROFILE_TOP]]
+        text = "\n".join(lines) + "\n"
+        if path:
+            Path(path).write_text(text, encoding='utf-8')
+        return text
+
+    def traced_memory(self):
+        if not tracemalloc.is_tracing():
+            return None
+        current, peak = tracemalloc.get_traced_memory()
+        return {(('kind', 'current'),): current, (('kind', 'peak'),): peak}
+
+
+# --- Local Metrics Endpoint ---
+METRICS_TOKEN_NAME = "metrics.token"
+
+
+class MetricsServer:
+    """Serves Prometheus text on http://127.0.0.1:<port>/metrics and the profiling toggles.
+
+    POST /debug/profile/start, /debug/profile/stop, /debug/tracemalloc/start and
+    /debug/tracemalloc/stop switch capture at runtime; stop writes its result into output_dir
+    (profile-<time>.prof / tracemalloc-<time>.txt) and returns a text summary. The toggles
+    change state and write files, so they refuse GET and need 'Authorization: Bearer <token>';
+    unless token is given, a new one is written to metrics.token in output_dir (mode 0600).
+    A browser cannot send that header cross-origin without a preflight, which this server
+    never allows, and other local users cannot read the token.
+    """
+
+    def __init__(self, metrics, port, output_dir, host='127.0.0.1', token=None):
+        self.metrics = metrics
+        self.output_dir = Path(output_dir)
+        self.token_file = None
+        if token is None:
+            self.token_file = self.output_dir / METRICS_TOKEN_NAME
+            token = write_token_file(self.token_file)
+        self.token = token
+        self._server = ThreadingHTTPServer((host, port), self._make_handler())
+        self._server.daemon_threads = True
+        self.port = self._server.server_address[1]
+
+    def _make_handler(self):
+        server = self
+
+        class MetricsHandler(BaseHTTPRequestHandler):
+            def _path(self):
+                return self.path.split('?', 1)[0].rstrip('/')
+
+            def do_GET(self):
+                path = self._path()
+                if path == '/metrics':
+                    self._send_text(server.metrics.render())
+                elif path in self._toggles():
+                    self.send_response(405)
+                    self.send_header('Allow', 'POST')
+                    self.send_header('Content-Length', '0')
+                    self.end_headers()
+                else:
+                    self.send_error(404)
+
+            def do_POST(self):
+                action = self._toggles().get(self._path())
+                if action is None:
+                    self.send_error(404)
+                    return
+                sent = self.headers.get('Authorization', '')
+                if not hmac.compare_digest(sent.encode(), f"Bearer {server.token}".encode()):
+                    self.send_error(403, "Missing or wrong access token")
+                    return
+                self._send_text(action())
+
+            @staticmethod
+            def _toggles():
+                profiler = server.metrics.profiler
+                stamp = time.strftime('%Y%m%d-%H%M%S')
+                return {
+                    '/debug/profile/start': lambda: profiler.start_profile() or "Profiling started.\n",
+                    '/debug/profile/stop': lambda: profiler.stop_profile(server.output_dir / f"profile-{stamp}.prof"),
+                    '/debug/tracemalloc/start': lambda: profiler.start_tracemalloc() or "tracemalloc started.\n",
+                    '/debug/tracemalloc/stop': lambda: profiler.stop_tracemalloc(
+                        server.output_dir / f"tracemalloc-{stamp}.txt"),
+                }
+
+            def _send_text(self, text):
+                body = text.encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        return MetricsHandler
+
+    def start(self):
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
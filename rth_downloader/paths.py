@@ -0,0 +1,62 @@
+import functools
+import os
+import platform
+import secrets
+import sys
+from pathlib import Path
+
+APP_NAME = "RonsTechHub YouTube Downloader"
+
+
+# --- Path Helper for PyInstaller ---
+@functools.lru_cache(maxsize=None)
+def _resource_base():
+    # During runtime, PyInstaller sets the _MEIPASS attribute
+    # to the path of the temporary folder where bundled files are extracted.
+    default_base = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    return getattr(sys, '_MEIPASS', default_base)
+
+
+def resource_path(relative_path):
+    """Get absolute path to resource, works for dev and for PyInstaller."""
+    return os.path.join(_resource_base(), relative_path)
+
+
+# --- Cross-Platform Downloads Folder Function ---
+def get_download_folder():
+    """Determines the cross-platform default Downloads folder path."""
+    if platform.system() == "Windows":
+        try:
+            import winreg
+            sub_key = r'SOFTWARE\Microsoft\Windows\CurrentVersion\Explorer\Shell Folders'
+            downloads_guid = '{374DE290-123F-4565-9164-39C4925E467B}'
+            with winreg.OpenKey(winreg.HKEY_CURRENT_USER, sub_key) as key:
+                return Path(winreg.QueryValueEx(key, downloads_guid)[0])
+        except Exception:
+            return Path.home() / "Downloads"
+    else:
+        return Path.home() / "Downloads"
+
+
+def get_app_data_dir():
+    """Determines the per-user folder for the download archive and other app state."""
+    if platform.system() == "Windows":
+        base_dir = Path(os.environ.get('LOCALAPPDATA') or Path.home() / "AppData" / "Local")
+    elif platform.system() == "Darwin":
+        base_dir = Path.home() / "Library" / "Application Support"
+    else:
+        base_dir = Path(os.environ.get('XDG_DATA_HOME') or Path.home() / ".local" / "share")
+
+    app_dir = base_dir / APP_NAME
+    app_dir.mkdir(parents=True, exist_ok=True)
+    return app_dir
+
+
+def write_token_file(path):
+    """Writes a new random access token to path, readable by the current user only, and returns it."""
+    token = secrets.token_urlsafe(32)
+    Path(path).unlink(missing_ok=True)
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+    with os.fdopen(fd, 'w', encoding='utf-8') as f:
+        f.write(token + '\n')
+    return token
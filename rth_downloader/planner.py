@@ -0,0 +1,64 @@
+from pathlib import Path
+
+
+# --- Stream-Copy Format Planner ---
+AAC_CODECS = ('mp4a', 'aac')
+MP3_ENCODE_CPU_PER_SECOND = 0.02  # rough libmp3lame cost per second of stereo audio, used for savings estimates
+
+
+def format_options(mode, quality, audio_format='mp3'):
+    """yt-dlp 'format'/'format_sort' options favouring sources the target can take by stream copy.
+
+    M4A audio prefers AAC streams (copied as they are); video prefers H.264 + AAC at the chosen
+    height and frame rate, so the merge can be stream-copied into MP4 instead of falling back to MKV.
+    """
+    if mode == "audio":
+        options = {'format': 'bestaudio/best'}
+        if audio_format == 'm4a':
+            options['format_sort'] = ['acodec:aac']
+        return options
+
+    target_res = int(quality.replace('p', ''))
+    return {'format': f'bestvideo[height<={target_res}]+bestaudio/best',
+            'format_sort': ['res', 'fps', 'vcodec:h264', 'acodec:aac']}
+
+
+def is_aac(codec):
+    return (codec or '').split('.')[0].lower() in AAC_CODECS
+
+
+def plan_audio_job(source, acodec, audio_format, quality, encoder=None):
+    """Returns the FFmpeg job that turns a downloaded audio file into the target format.
+
+    The job's kind is 'audio' (decode + encode) or 'remux' (stream copy); None means the file
+    already is in the target format.
+    """
+    source = Path(source)
+    if source.suffix.lower() == f'.{audio_format}':
+        return None
+
+    job = {'inputs': [str(source)], 'output': str(source.with_suffix(f'.{audio_format}')),
+           'container': audio_format, 'quality': quality}
+    if audio_format == 'm4a' and is_aac(acodec):
+        job['kind'] = 'remux'
+    else:
+        job.update(kind='audio', encoder=encoder if audio_format == 'mp3' else 'aac')
+    return job
+
+
+def pipeline_for(mode, job, streamed=False):
+    """Names how an item is produced: 'encode', 'copy' (audio stream copy or no work), 'merge' or 'none'.
+
+    An encode fed straight from the download (streamed) is 'stream'. Items served from the
+    dedup index are reported as 'link' by the pool instead.
+    """
+    if job is None:
+        return 'copy' if mode == "audio" else 'none'
+    return {'audio': 'stream' if streamed else 'encode', 'remux': 'copy', 'merge': 'merge'}[job['kind']]
+
+
+def estimate_cpu_saved(duration, pipeline, cpu_seconds=None):
+    """Estimated CPU seconds an MP3 encode would have cost minus what the stream copy took."""
+    if pipeline != 'copy' or not duration:
+        return None
+    return round(max(0.0, duration * MP3_ENCODE_CPU_PER_SECOND - (cpu_seconds or 0.0)), 3)
@@ -0,0 +1,594 @@
+import contextlib
+import os
+import threading
+import time
+
+import yt_dlp
+from yt_dlp.utils import PagedList
+
+from .archive import archive_id_for_url
+from .config import DEFAULT_MAX_WORKERS
+from .dedup import InFlightItems, link_file
+from .planner import estimate_cpu_saved
+from .report import ItemResult
+from .retry import is_rate_limited
+from .scheduler import JobScheduler
+from .segmented import SegmentedDownloadPP
+from .storage import DiskSpacePP
+from .streaming import StreamingAudioPP
+from .transcode import TranscodeHandoffPP, split_merged_formats
+
+
+# --- Custom Logger for Error Reporting ---
+class YtdlpLogger:
+    """A custom logger to capture yt-dlp errors and warnings for the GUI and CLI."""
+
+    def __init__(self):
+        self.failed_downloads = []
+
+    def debug(self, msg):
+        pass
+
+    def warning(self, msg):
+        pass
+
+    def error(self, msg):
+        self.failed_downloads.append(msg)
+
+
+# --- Streaming Playlist/Channel Expansion ---
+# Flat entries of some extractors carry a bare video id as 'url'; those are completed from their 'ie_key'.
+ENTRY_URL_TEMPLATES = {
+    'Youtube': 'https://www.youtube.com/watch?v={}',
+}
+
+
+def iter_playlist_entries(ie_result):
+    """Yields flat entries of an unprocessed playlist result as soon as yt-dlp resolves them."""
+    entries = ie_result.get('entries')
+    if isinstance(entries, PagedList):
+        # getslice() would fetch every page first; its generator fetches each page once it is reached.
+        entries = entries._getslice(0, None)
+
+    for entry in entries or []:
+        if not entry:
+            continue
+        if entry.get('_type') in ('playlist', 'multi_video'):
+            yield from iter_playlist_entries(entry)
+        else:
+            yield entry
+
+
+def entry_url(entry):
+    """The URL to download a flat playlist entry from, or None if it has none."""
+    url = entry.get('webpage_url') or entry.get('url')
+    if not url or '://' in url:
+        return url
+    template = ENTRY_URL_TEMPLATES.get(entry.get('ie_key'))
+    return template.format(url) if template else url
+
+
+# --- Concurrent Download Worker Pool ---
+class DownloadWorkerPool:
+    """Downloads URLs on a bounded pool of worker threads, each with its own YoutubeDL instance.
+
+    If given, state_callback(url, state, error=None) is told about every item's state changes
+    (see jobs.ITEM_STATES), and progress_callback(url, d) receives that item's yt-dlp progress dicts.
+    Besides the per-URL error lists, every video, skip and failure is kept as a report.ItemResult in records.
+    With a retry_policy, transient failures are retried after a backoff; a shared backoff
+    (retry.GlobalBackoff) pauses all workers when rate-limit errors cluster. Given a session
+    (session.DownloadSession), every YoutubeDL shares its connection pool and cookie jar.
+    Given metrics (metrics.Metrics), phase timings and counters are recorded there, and items
+    run under its profiler when profiling is switched on. Given an output_manager
+    (storage.OutputManager), every download first reserves its disk space and waits ('paused')
+    while the disk is too full. Given a dedup index (dedup.DedupIndex), a video already produced
+    in this variant is linked into the output folder instead of being downloaded again, unless
+    the archive skips it first or another file already has its name. With an archive or a
+    dedup index, a worker that meets a video another worker is still fetching waits
+    for it, then skips or links it; in_flight (a dedup.InFlightItems) extends that to every pool
+    sharing it, so concurrent batches of one engine never fetch the same video twice either.
+    URLs are handed to the workers by a scheduler.JobScheduler: by priority (priorities maps URLs
+    to numbers, higher first; playlist entries inherit their playlist's), then shortest first by
+    the duration or filesize known from playlist or cached metadata, with at most
+    per_host_limit downloads running against one host. slots (a semaphore shared with other
+    pools) bounds the downloads running at once across all of them. With stream_audio, audio
+    that needs converting is piped from the network into FFmpeg in the worker instead of being
+    written to disk and queued on the transcode stage (streaming.StreamingAudioPP).
+    """
+
+    def __init__(self, ydl_opts, max_workers=DEFAULT_MAX_WORKERS, transcode_stage=None, transcode_options=None,
+                 archive=None, info_cache=None, state_callback=None, progress_callback=None, connections=1,
+                 retry_policy=None, backoff=None, session=None, metrics=None, output_manager=None, dedup=None,
+                 per_host_limit=None, priorities=None, slots=None, stream_audio=False, in_flight=None):
+        self.ydl_opts = ydl_opts
+        self.max_workers = max(1, int(max_workers))
+        self.transcode_stage = transcode_stage
+        self.transcode_options = transcode_options or {}
+        self.archive = archive
+        self.info_cache = info_cache
+        self.state_callback = state_callback
+        self.progress_callback = progress_callback
+        self.connections = connections
+        self.retry_policy = retry_policy
+        self.backoff = backoff
+        self.session = session
+        self.metrics = metrics
+        self.output_manager = output_manager
+        self.dedup = dedup
+        self.priorities = priorities or {}
+        self.slots = slots
+        self.stream_audio = stream_audio
+        self.results = {}
+        self.skipped = []
+        self._records = {}  # (url, video id or None) -> ItemResult
+
+        self._scheduler = JobScheduler(per_host_limit)
+        self._lock = threading.Lock()
+        self._threads = []
+        self._transcoding = set()
+        self._pending_transcodes = 0  # this pool's jobs still queued or running on the transcode stage
+        self._transcodes_done = threading.Condition(self._lock)
+        self._queued_at = {}  # url -> perf_counter() when submitted
+        self._in_flight = in_flight or InFlightItems()
+        self._claims = {}  # url -> the _in_flight key it holds
+
+    def start(self, num_workers=None):
+        """Spawns the worker threads (at most max_workers)."""
+        count = self.max_workers if num_workers is None else max(1, min(self.max_workers, num_workers))
+        for _ in range(count):
+            thread = threading.Thread(target=self._worker, daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def submit(self, url, priority=None, duration=None, filesize=None):
+        """Queues a URL for download; duration (seconds) and filesize (bytes) order it among its priority."""
+        if priority is None:
+            priority = self.priorities.get(url, 0)
+        if duration is None and filesize is None and self.info_cache is not None:
+            info = self.info_cache.peek(url) or {}
+            duration, filesize = info.get('duration'), info.get('filesize') or info.get('filesize_approx')
+        with self._lock:
+            self._queued_at.setdefault(url, time.perf_counter())
+        self._scheduler.put(url, priority, duration, filesize)
+
+    def queued(self):
+        """Number of URLs waiting for a worker."""
+        return self._scheduler.qsize()
+
+    @property
+    def variant(self):
+        options = self.transcode_options
+        return options.get('variant') or f"{options.get('mode')}:{options.get('quality')}"
+
+    def is_archived(self, archive_id):
+        """True if the item was already downloaded in the current mode/quality."""
+        if self.archive is None or not archive_id:
+            return False
+        return self.archive.contains(archive_id, self.variant)
+
+    @property
+    def records(self):
+        """The per-item ItemResults collected so far, in completion order."""
+        with self._lock:
+            return list(self._records.values())
+
+    def _skip(self, url):
+        with self._lock:
+            self.skipped.append(url)
+            self.results[url] = []
+            self._records[(url, None)] = ItemResult(url, status='skipped')
+        self._count('items_total', status='skipped')
+        self._set_state(url, 'done')
+
+    def _fail(self, url, errors, attempts=1):
+        self._unclaim(url)
+        with self._lock:
+            self.results[url] = list(errors)
+            self._records[(url, None)] = ItemResult(url, attempts=attempts, error=errors[0])
+        self._count('items_total', status='failed')
+        self._set_state(url, 'failed', errors[0])
+
+    def _item_downloaded(self, url, info, output, downloaded_bytes, pipeline, download_time, attempts=1,
+                         timings=None, saved=None):
+        timings = {name: round(seconds, 3) for name, seconds in (timings or {}).items() if seconds is not None}
+        if saved is None:
+            bytes_saved, cpu_saved = None, estimate_cpu_saved(info.get('duration'), pipeline)
+        else:
+            bytes_saved, cpu_saved = saved['bytes'], saved['cpu']
+        record = ItemResult(url, video_id=info.get('id'), title=info.get('title'), path=output,
+                            downloaded_bytes=downloaded_bytes, download_time=round(download_time, 3),
+                            pipeline=pipeline, cpu_saved=cpu_saved, bytes_saved=bytes_saved,
+                            attempts=attempts, **timings)
+        with self._lock:
+            self._records[(url, info.get('id'))] = record
+        if self.metrics is not None:
+            for name, seconds in timings.items():
+                self.metrics.observe(name.removesuffix('_time'), seconds)
+            self.metrics.inc('downloaded_bytes_total', downloaded_bytes or 0)
+
+    def _count(self, name, value=1, **labels):
+        if self.metrics is not None:
+            self.metrics.inc(name, value, **labels)
+
+    def _profiled(self):
+        if self.metrics is None:
+            return contextlib.nullcontext()
+        return self.metrics.profiler.profiled()
+
+    def _set_state(self, url, state, error=None):
+        if self.state_callback:
+            self.state_callback(url, state, error)
+
+    @contextlib.contextmanager
+    def _shared_session(self, ydl):
+        if self.session is None:
+            yield
+            return
+        self.session.attach(ydl)
+        try:
+            yield
+        finally:
+            self.session.detach(ydl)
+
+    @contextlib.contextmanager
+    def _slots_released(self, url):
+        """Gives back the item's download slot and host slot while its worker sleeps, so others can run."""
+        if self.slots is not None:
+            self.slots.release()
+        self._scheduler.finish(url)
+        try:
+            yield
+        finally:
+            # Host first, then the shared slot: the order a job takes them in when it starts.
+            self._scheduler.resume(url)
+            if self.slots is not None:
+                self.slots.acquire()
+
+    def _disk_wait(self, url, message):
+        self._set_state(url, 'paused' if message else 'downloading', message)
+
+    def _release_space(self, url, video_id=None):
+        if self.output_manager is None:
+            return
+        if video_id is None:
+            self.output_manager.release_url(url)
+        else:
+            self.output_manager.release((url, video_id))
+
+    # --- Deduplication ---
+    def _claim(self, url, archive_id):
+        """Marks a video as being fetched; returns False (once it is finished) if another worker holds it."""
+        key = (self.variant, archive_id)
+        if not self._in_flight.claim(key):
+            return False
+        with self._lock:
+            self._claims[url] = key
+        return True
+
+    def _unclaim(self, url):
+        with self._lock:
+            key = self._claims.pop(url, None)
+        if key is not None:
+            self._in_flight.release(key)
+
+    def _link_existing(self, url, archive_id, started):
+        """Links a video already produced in this variant into the output folder; False if there is none."""
+        existing = self.dedup.find(self.variant, archive_id=archive_id)
+        if existing is None:
+            return False
+        source = existing['path']
+        final_outtmpl = self.transcode_options.get('final_outtmpl')
+        target = os.path.join(os.path.dirname(final_outtmpl), os.path.basename(source)) if final_outtmpl else source
+        try:
+            if os.path.exists(target) and os.path.samefile(source, target):
+                method = 'existing'
+            else:
+                method = link_file(source, target, replace=False)
+                self.dedup.add(target, self.variant, archive_id, existing['sha256'], existing['title'],
+                               existing['transcode_cpu'])
+        except OSError:
+            # e.g. another file already has the name, or the folder is not writable; a normal download copes
+            return False
+        if self.archive is not None:
+            self.archive.add(archive_id, self.variant)
+        record = ItemResult(url, video_id=archive_id.split(' ')[-1], title=existing['title'], path=target,
+                            downloaded_bytes=0, download_time=round(time.perf_counter() - started, 3),
+                            pipeline='link', bytes_saved=0 if method == 'copy' else existing['size'],
+                            cpu_saved=existing['transcode_cpu'])
+        with self._lock:
+            self.results[url] = []
+            self._records[(url, None)] = record
+        self._count('items_total', status='done')
+        self._set_state(url, 'done')
+        return True
+
+    def _reuse_existing(self, url, archive_id):
+        """True if the URL's video was skipped or served from the dedup index; otherwise claims it for download."""
+        if (self.dedup is None and self.archive is None) or not archive_id:
+            return False
+        started = time.perf_counter()
+        while not self._claim(url, archive_id):
+            pass  # another worker was fetching it; look again now that it is finished
+        if self.is_archived(archive_id):  # finished by a worker of this or another batch meanwhile
+            self._unclaim(url)
+            self._skip(url)
+            return True
+        if self.dedup is not None and self._link_existing(url, archive_id, started):
+            self._unclaim(url)
+            return True
+        return False
+
+    def _transcode_queued(self, url):
+        with self._lock:
+            self._transcoding.add(url)
+            self._pending_transcodes += 1
+        self._set_state(url, 'post-processing')
+
+    def _transcode_finished(self, url, info, error, stats):
+        try:
+            with self._lock:
+                record = self._records.get((url, info.get('id')))
+                if record is not None:
+                    if stats:
+                        record.transcode_time = round(stats['seconds'], 3)
+                        record.transcode_cpu = stats['cpu_seconds']
+                        record.cpu_saved = estimate_cpu_saved(info.get('duration'), record.pipeline,
+                                                              stats['cpu_seconds'])
+                    if error:
+                        record.fail(error)
+                if error:
+                    self.results.setdefault(url, []).append(str(error))
+            self._release_space(url, info.get('id'))
+            self._unclaim(url)
+            if self.metrics is not None and stats:
+                self.metrics.observe('transcode', stats['seconds'])
+                self.metrics.inc('transcode_cpu_seconds_total', stats['cpu_seconds'] or 0)
+            self._count('items_total', status='failed' if error else 'done')
+            self._set_state(url, 'failed' if error else 'done', str(error) if error else None)
+        finally:
+            with self._transcodes_done:
+                self._pending_transcodes -= 1
+                self._transcodes_done.notify_all()
+
+    def close(self):
+        """Signals the workers that no more URLs will be submitted."""
+        self._scheduler.close()
+
+    def join(self):
+        """Waits for all workers (and their queued transcodes) to finish and returns the per-URL error lists."""
+        for thread in self._threads:
+            thread.join()
+        with self._transcodes_done:
+            self._transcodes_done.wait_for(lambda: self._pending_transcodes == 0)
+        return self.results
+
+    def run(self, urls):
+        """Downloads a fixed batch of URLs and returns {url: [error messages]}."""
+        self.start(num_workers=len(urls))
+        for url in urls:
+            self.submit(url)
+        self.close()
+        return self.join()
+
+    def run_streaming(self, playlist_urls, pending_urls=(), known_urls=()):
+        """Expands playlists/channels lazily, feeding each entry to the workers as soon as it is known.
+
+        Only the flat entry list is resolved here; per-entry metadata extraction happens
+        concurrently in the download workers, so the first download starts right away.
+        When resuming, pending_urls are queued first and entries in known_urls are not re-queued.
+        """
+        self.ydl_opts = dict(self.ydl_opts, noplaylist=True)
+        self.start()
+        known_urls = set(known_urls)
+        for url in pending_urls:
+            self.submit(url)
+
+        logger = YtdlpLogger()
+        expand_opts = dict(self.ydl_opts, logger=logger, extract_flat='in_playlist', noplaylist=False)
+        try:
+            with yt_dlp.YoutubeDL(expand_opts) as ydl, self._shared_session(ydl):
+                for playlist_url in playlist_urls:
+                    logger.failed_downloads = []
+                    try:
+                        ie_result = ydl.extract_info(playlist_url, download=False, process=False)
+                        if ie_result and ie_result.get('entries') is not None:
+                            for entry in iter_playlist_entries(ie_result):
+                                url = entry_url(entry)
+                                if not url or url in known_urls:
+                                    continue
+                                self._set_state(url, 'pending')
+                                if self.is_archived(ydl._make_archive_id(entry)):
+                                    self._skip(url)
+                                else:
+                                    self.submit(url, self.priorities.get(playlist_url, 0),
+                                                entry.get('duration'),
+                                                entry.get('filesize') or entry.get('filesize_approx'))
+                        elif ie_result:
+                            self._set_state(playlist_url, 'pending')
+                            self.submit(playlist_url)
+                    except Exception as e:
+                        logger.error(str(e))
+
+                    if logger.failed_downloads:
+                        self._fail(playlist_url, logger.failed_downloads)
+                    else:
+                        self._set_state(playlist_url, 'done')
+        finally:
+            self.close()
+        return self.join()
+
+    def _worker(self):
+        # Each worker owns its YoutubeDL instance and logger, so errors can be attributed to the
+        # URL being processed; only the HTTP session (connection pool, cookies) is shared.
+        logger = YtdlpLogger()
+        opts = dict(self.ydl_opts, logger=logger)
+
+        # Phase marks of the item in progress (perf_counter() values): 'mark' is where the current
+        # video's timing starts, 'first_byte' its first transfer, 'file_start' the current file's
+        # first transfer and 'finished' the end of its last one; 'transfer' sums the file transfers.
+        current = {'url': None, 'mark': None, 'attempt': 0, 'queue_time': None}
+
+        def reset_phases(now):
+            current.update(mark=now, first_byte=None, file_start=None, finished=None, transfer=0.0)
+
+        def on_progress(d):
+            now = time.perf_counter()
+            if d['status'] == 'downloading':
+                if current['file_start'] is None:
+                    current['file_start'] = now
+                    current['first_byte'] = current['first_byte'] or now
+                if self.output_manager is not None:
+                    self.output_manager.update((current['url'], (d.get('info_dict') or {}).get('id')),
+                                               d.get('downloaded_bytes'))
+            elif d['status'] == 'finished':
+                if current['file_start'] is not None:
+                    current['transfer'] += now - current['file_start']
+                current['file_start'] = None
+                current['finished'] = now
+            if self.progress_callback:
+                self.progress_callback(current['url'], d)
+            if self.metrics is not None:
+                self.metrics.observe('progress_hook', time.perf_counter() - now)
+                self.metrics.inc('progress_hook_calls_total')
+
+        def on_downloaded(url, info, output, downloaded_bytes, pipeline, saved=None):
+            now = time.perf_counter()
+            timings = {'queue_time': current['queue_time'],
+                       'extract_time': (current['first_byte'] or now) - current['mark'],
+                       'transfer_time': current['transfer'],
+                       'finalize_time': now - (current['finished'] or now)}
+            self._item_downloaded(url, info, output, downloaded_bytes, pipeline, now - current['mark'],
+                                  current['attempt'] + 1, timings, saved)
+            current['queue_time'] = None
+            reset_phases(now)  # the next video of a multi-video URL is timed from here
+
+        with yt_dlp.YoutubeDL(opts) as ydl, self._shared_session(ydl):
+            if self.transcode_stage:
+                # Download raw streams only; FFmpeg work is handed to the transcode process pool.
+                ydl.format_selector = split_merged_formats(ydl.format_selector)
+            handoff = TranscodeHandoffPP(self.transcode_stage, archive=self.archive, dedup=self.dedup,
+                                         on_downloaded=on_downloaded,
+                                         on_queued=self._transcode_queued,
+                                         on_transcoded=self._transcode_finished,
+                                         downloader=ydl, **self.transcode_options)
+            ydl.add_post_processor(handoff, when='after_video')
+
+            options = self.transcode_options
+            streaming = None
+            if self.stream_audio and self.transcode_stage:
+                streaming = StreamingAudioPP(self.transcode_stage.ffmpeg, options.get('audio_format', 'mp3'),
+                                             options.get('quality'), options.get('audio_encoder'), downloader=ydl)
+
+            disk_space = None
+            if self.output_manager is not None:
+                # Registered first: the space must be reserved before any 'before_dl' download starts.
+                disk_space = DiskSpacePP(self.output_manager, options.get('mode'), options.get('audio_format', 'mp3'),
+                                         options.get('quality'), on_wait=self._disk_wait, streaming=streaming,
+                                         downloader=ydl)
+                ydl.add_post_processor(disk_space, when='before_dl')
+                if streaming is not None:
+                    streaming.on_fallback = disk_space.reserve
+
+            if streaming is not None:
+                ydl.add_post_processor(streaming, when='before_dl')
+
+            if self.connections > 1:
+                # Large single-file formats are fetched as parallel byte ranges before yt-dlp's own download.
+                ydl.add_post_processor(SegmentedDownloadPP(self.connections, downloader=ydl), when='before_dl')
+
+            if self.progress_callback or self.metrics is not None or self.output_manager is not None:
+                ydl.add_progress_hook(on_progress)
+
+            while True:
+                url = self._scheduler.get()
+                if url is None:
+                    break
+                if self.slots is not None:
+                    self.slots.acquire()
+                try:
+                    with self._lock:
+                        queued_at = self._queued_at.pop(url, None)
+
+                    # Known items are skipped (or linked from an earlier download) before any metadata extraction.
+                    archive_id = archive_id_for_url(ydl, url)
+                    if self.is_archived(archive_id):
+                        self._skip(url)
+                        continue
+                    if self._reuse_existing(url, archive_id):
+                        continue
+
+                    handoff.current_url = url
+                    if disk_space is not None:
+                        disk_space.current_url = url
+                    current['url'] = url
+                    current['attempt'] = 0
+                    current['queue_time'] = time.perf_counter() - queued_at if queued_at is not None else None
+                    while True:
+                        if self.backoff and self.backoff.remaining():
+                            with self._slots_released(url):
+                                self.backoff.wait()
+                        reset_phases(time.perf_counter())
+                        logger.failed_downloads = []
+                        self._set_state(url, 'downloading')
+                        self._count('attempts_total')
+                        try:
+                            with self._profiled():
+                                self._download(ydl, url)
+                        except Exception as e:
+                            # 'ignoreerrors' swallows per-item failures; anything reaching here is fatal for
+                            # this URL only.
+                            logger.error(str(e))
+
+                        errors = list(logger.failed_downloads)
+                        if not errors or not self.retry_policy or not self.retry_policy.should_retry(
+                                errors, current['attempt']):
+                            break
+                        self._wait_for_retry(url, errors, current['attempt'])
+                        current['attempt'] += 1
+
+                    if errors:
+                        self._release_space(url)
+                        self._fail(url, errors, current['attempt'] + 1)
+                        continue
+                    with self._lock:
+                        self.results.setdefault(url, [])  # a transcode may already have failed and reported
+                        transcoding = url in self._transcoding
+                    if not transcoding:
+                        self._release_space(url)
+                        self._unclaim(url)
+                        self._count('items_total', status='done')
+                        self._set_state(url, 'done')
+                except Exception as e:
+                    # A bug or I/O error outside the download itself; fail this URL and keep the worker alive.
+                    self._release_space(url)
+                    self._fail(url, [f"Unexpected error: {e}"])
+                finally:
+                    if self.slots is not None:
+                        self.slots.release()
+                    self._scheduler.finish(url)
+
+    def _wait_for_retry(self, url, errors, attempt):
+        delay = self.retry_policy.delay(attempt)
+        if self.backoff and is_rate_limited(errors):
+            delay = max(delay, self.backoff.rate_limited())
+        self._set_state(url, 'retrying', f"Retry {attempt + 1}/{self.retry_policy.max_retries} in {delay:.0f}s: "
+                                         f"{errors[0]}")
+        if self.info_cache is not None:
+            self.info_cache.discard(url)  # re-extract: the stream URLs may have expired
+        self._release_space(url)
+        with self._slots_released(url):
+            time.sleep(delay)
+
+    def _download(self, ydl, url):
+        if self.info_cache is None:
+            ydl.download([url])
+            return
+
+        ie_result = self.info_cache.get(url)
+        if ie_result is None:
+            ie_result = ydl.extract_info(url, download=False, process=False)
+            if not ie_result:
+                return  # extraction failed; already reported to the logger ('ignoreerrors')
+            if ie_result.get('_type', 'video') == 'video':
+                self.info_cache.put(url, ie_result)
+        ydl.process_ie_result(ie_result, download=True)
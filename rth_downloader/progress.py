@@ -0,0 +1,107 @@
+import threading
+
+PROGRESS_FPS = 10  # how often the UI samples the aggregator
+
+# Field positions in an item record (records are small lists updated in place).
+TITLE, STATUS, DOWNLOADED, TOTAL, SPEED, ETA, ERROR = range(7)
+
+
+def format_bytes(num_bytes):
+    """Formats a byte count as a short human-readable string."""
+    if num_bytes is None:
+        return "N/A"
+    for unit in ("B", "KiB", "MiB", "GiB"):
+        if num_bytes < 1024 or unit == "GiB":
+            return f"{num_bytes:.0f} {unit}" if unit == "B" else f"{num_bytes:.1f} {unit}"
+        num_bytes /= 1024
+
+
+def format_eta(seconds):
+    """Formats an ETA in seconds as H:MM:SS or M:SS."""
+    if seconds is None:
+        return "N/A"
+    minutes, secs = divmod(int(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours}:{minutes:02d}:{secs:02d}" if hours else f"{minutes}:{secs:02d}"
+
+
+# --- Throttled Progress Aggregation ---
+class ProgressAggregator:
+    """Keeps only the latest progress state per item; the UI samples it at a fixed frame rate.
+
+    yt-dlp can call progress hooks hundreds of times per second per download. Here each call
+    just overwrites a few fields of the item's record under a lock, with no UI scheduling and
+    no string formatting, so any number of concurrent downloads costs the UI one refresh per frame.
+    """
+
+    def __init__(self):
+        self._items = {}
+        self._dirty = set()
+        self._lock = threading.Lock()
+
+    def _record(self, url):
+        record = self._items.get(url)
+        if record is None:
+            record = self._items[url] = [url, 'pending', 0, None, None, None, None]
+        return record
+
+    def update(self, url, d):
+        """Progress callback for one item's yt-dlp progress dict."""
+        status = d['status']
+        with self._lock:
+            record = self._record(url)
+            title = (d.get('info_dict') or {}).get('title')
+            if title:
+                record[TITLE] = title
+
+            if status == 'downloading':
+                record[STATUS] = 'downloading'
+                record[DOWNLOADED] = d.get('downloaded_bytes') or 0
+                record[TOTAL] = d.get('total_bytes') or d.get('total_bytes_estimate')
+                record[SPEED] = d.get('speed')
+                record[ETA] = d.get('eta')
+            elif status == 'finished':
+                record[DOWNLOADED] = d.get('total_bytes') or d.get('downloaded_bytes') or record[DOWNLOADED]
+                record[TOTAL] = record[DOWNLOADED]
+                record[SPEED] = None
+                record[ETA] = 0
+            self._dirty.add(url)
+
+    def set_state(self, url, state, error=None):
+        """State callback (pending/downloading/retrying/paused/post-processing/done/failed) for one item."""
+        with self._lock:
+            record = self._record(url)
+            record[STATUS] = state
+            record[ERROR] = error
+            if state in ('done', 'failed'):
+                record[SPEED] = None
+                record[ETA] = 0 if state == 'done' else None
+            self._dirty.add(url)
+
+    def changes(self):
+        """Returns [(url, record copy)] for items updated since the previous call."""
+        with self._lock:
+            changed = [(url, list(self._items[url])) for url in self._dirty]
+            self._dirty.clear()
+        return changed
+
+    def totals(self):
+        """Returns aggregate counts, throughput (bytes/s) and ETA (seconds) over all items."""
+        counts = {'pending': 0, 'downloading': 0, 'retrying': 0, 'paused': 0, 'post-processing': 0, 'done': 0,
+                  'failed': 0}
+        speed = 0.0
+        remaining = 0
+        with self._lock:
+            for record in self._items.values():
+                counts[record[STATUS]] = counts.get(record[STATUS], 0) + 1
+                if record[STATUS] == 'downloading':
+                    speed += record[SPEED] or 0
+                    if record[TOTAL]:
+                        remaining += max(record[TOTAL] - record[DOWNLOADED], 0)
+        eta = remaining / speed if speed else None
+        return {'counts': counts, 'total': sum(counts.values()), 'speed': speed, 'eta': eta}
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+            self._dirty.clear()
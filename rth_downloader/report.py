@@ -0,0 +1,175 @@
+import csv
+import json
+import re
+from pathlib import Path
+
+
+# --- Per-Item Result Records ---
+RESULT_FIELDS = ('url', 'video_id', 'title', 'status', 'path', 'downloaded_bytes', 'download_time', 'queue_time',
+                 'extract_time', 'transfer_time', 'finalize_time', 'pipeline', 'transcode_time', 'transcode_cpu',
+                 'cpu_saved', 'bytes_saved', 'attempts', 'error_class', 'error')
+RESULT_STATES = ('done', 'failed', 'skipped')
+
+# First match wins, so the more specific patterns come first.
+ERROR_CLASSES = [(name, re.compile(pattern, re.IGNORECASE)) for name, pattern in (
+    ('geo_blocked', r"not available in your country|geo.?restrict"),
+    ('private', r"private video|sign in to confirm|members.only|login required|age.restricted"),
+    ('unavailable', r"video unavailable|has been removed|does not exist|is not available|HTTP Error 404"),
+    ('rate_limited', r"HTTP Error 429|too many requests"),
+    ('expired', r"HTTP Error 403"),  # usually a stream URL that expired; re-extraction fixes it
+    ('network', r"timed out|connection (reset|refused|aborted|broken)|temporary failure|name or service not known|"
+                r"remote end closed|unable to download|incompleteread|fragment|HTTP Error 5\d\d"),
+    ('disk_full', r"not enough disk space|no space left on device|disk quota exceeded"),
+    ('ffmpeg', r"ffmpeg"),
+    ('unsupported', r"unsupported url"),
+)]
+
+
+def classify_error(message):
+    """Maps a yt-dlp or FFmpeg error message to a coarse error class (e.g. 'network', 'private')."""
+    for name, pattern in ERROR_CLASSES:
+        if pattern.search(message):
+            return name
+    return 'other'
+
+
+class ItemResult:
+    """Outcome of one item: a downloaded video, a skipped one, or a URL that failed before yielding one.
+
+    Times are in seconds; download_time includes metadata extraction and is split into the
+    extract/transfer/finalize phases (see metrics.PHASES), while queue_time is spent before it.
+    pipeline says how the output was produced (see planner.pipeline_for; 'link' for media reused
+    from the dedup index) and cpu_saved estimates the encode a stream copy or link avoided;
+    bytes_saved is the size of a linked file that was not downloaded or stored again.
+    A 'stream' item was encoded while downloading: its transcode_time is the encoder's run after
+    the last byte, which download_time already includes.
+    """
+
+    def __init__(self, url, status='done', video_id=None, title=None, path=None, downloaded_bytes=None,
+                 download_time=None, pipeline=None, transcode_time=None, transcode_cpu=None, cpu_saved=None,
+                 attempts=1, error=None, queue_time=None, extract_time=None, transfer_time=None, finalize_time=None,
+                 bytes_saved=None):
+        self.url = url
+        self.status = status
+        self.video_id = video_id
+        self.title = title
+        self.path = path
+        self.downloaded_bytes = downloaded_bytes
+        self.download_time = download_time
+        self.queue_time = queue_time
+        self.extract_time = extract_time
+        self.transfer_time = transfer_time
+        self.finalize_time = finalize_time
+        self.pipeline = pipeline
+        self.transcode_time = transcode_time
+        self.transcode_cpu = transcode_cpu
+        self.cpu_saved = cpu_saved
+        self.bytes_saved = bytes_saved
+        self.attempts = attempts
+        self.error = None
+        self.error_class = None
+        if error:
+            self.fail(error)
+
+    def fail(self, error):
+        """Marks the item failed; the first error is kept as the cause."""
+        self.status = 'failed'
+        if self.error is None:
+            self.error = str(error)
+            self.error_class = classify_error(self.error)
+
+    def to_dict(self):
+        return {field: getattr(self, field) for field in RESULT_FIELDS}
+
+    @classmethod
+    def from_dict(cls, row):
+        """Rebuilds an ItemResult from to_dict() output (e.g. sent by the daemon)."""
+        fields = {field: row.get(field) for field in RESULT_FIELDS if field not in ('status', 'error_class', 'error')}
+        record = cls(status=row.get('status') or 'done', **fields)
+        record.error = row.get('error')
+        record.error_class = row.get('error_class')
+        return record
+
+    def __repr__(self):
+        return f"ItemResult({self.url!r}, status={self.status!r}, error_class={self.error_class!r})"
+
+
+# --- Batch Results ---
+class BatchResult:
+    """Outcome of one batch.
+
+    results maps each URL to its error messages and skipped lists the URLs skipped via the archive;
+    records holds one ItemResult per item, so a playlist URL counts once per video;
+    network is the engine's session.SessionStats snapshot (connection reuse, DNS cache).
+    """
+
+    def __init__(self, results, skipped, batch_id=None, records=(), network=None):
+        self.results = results
+        self.skipped = skipped
+        self.batch_id = batch_id
+        self.records = list(records)
+        self.network = network or {}
+
+    @property
+    def total(self):
+        return len(self.records)
+
+    @property
+    def succeeded(self):
+        """Number of items downloaded or already in the archive."""
+        return sum(1 for record in self.records if record.status != 'failed')
+
+    @property
+    def failed_records(self):
+        return [record for record in self.records if record.status == 'failed']
+
+    @property
+    def cpu_saved(self):
+        """Estimated FFmpeg CPU seconds saved by stream copies and deduplicated links."""
+        return sum(record.cpu_saved or 0 for record in self.records)
+
+    @property
+    def linked_records(self):
+        """Items served from the dedup index instead of a new copy."""
+        return [record for record in self.records if record.pipeline == 'link']
+
+    @property
+    def bytes_saved(self):
+        """Bytes not downloaded or stored again thanks to deduplication."""
+        return sum(record.bytes_saved or 0 for record in self.records)
+
+    @property
+    def failed(self):
+        return {url: errors for url, errors in self.results.items() if errors}
+
+    @property
+    def errors(self):
+        return [msg for errors in self.failed.values() for msg in errors]
+
+
+# --- Export / Import ---
+def write_report(records, path):
+    """Writes result records as CSV if the path ends in .csv, otherwise as JSON Lines."""
+    path = Path(path)
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        if path.suffix.lower() == '.csv':
+            writer = csv.DictWriter(f, fieldnames=RESULT_FIELDS)
+            writer.writeheader()
+            writer.writerows(record.to_dict() for record in records)
+        else:
+            for record in records:
+                f.write(json.dumps(record.to_dict(), ensure_ascii=False) + '\n')
+
+
+def read_report(path):
+    """Reads a report written by write_report back as a list of dicts."""
+    path = Path(path)
+    with open(path, encoding='utf-8', newline='') as f:
+        if path.suffix.lower() == '.csv':
+            return list(csv.DictReader(f))
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def failed_urls(rows):
+    """Returns the URLs of failed items in report rows, without duplicates and in report order."""
+    return list(dict.fromkeys(row['url'] for row in rows if row.get('status') == 'failed'))
@@ -0,0 +1,87 @@
+import random
+import threading
+import time
+from collections import deque
+
+from .report import classify_error
+
+
+# --- Automatic Retry of Transient Failures ---
+TRANSIENT_ERROR_CLASSES = frozenset({'network', 'rate_limited', 'expired'})
+
+
+def is_transient(errors):
+    """True if every error logged for an attempt is worth retrying (timeouts, 5xx, 429, expired links)."""
+    return bool(errors) and all(classify_error(error) in TRANSIENT_ERROR_CLASSES for error in errors)
+
+
+def is_rate_limited(errors):
+    return any(classify_error(error) == 'rate_limited' for error in errors)
+
+
+class RetryPolicy:
+    """Exponential backoff with jitter for item-level retries.
+
+    Retry n waits between half and all of min(max_delay, base_delay * 2**n) seconds, so
+    items that failed together do not all come back at the same moment.
+    """
+
+    def __init__(self, max_retries=3, base_delay=2.0, max_delay=60.0):
+        self.max_retries = max(0, int(max_retries))
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+    def delay(self, attempt):
+        """Seconds to wait before retry number attempt + 1."""
+        cap = min(self.max_delay, self.base_delay * 2 ** attempt)
+        return cap / 2 + random.uniform(0, cap / 2)
+
+    def should_retry(self, errors, attempt):
+        return attempt < self.max_retries and is_transient(errors)
+
+
+class GlobalBackoff:
+    """Pauses every worker once HTTP 429 responses cluster (threshold within window seconds).
+
+    Each further cluster doubles the pause up to max_pause; a quiet period resets it.
+    """
+
+    def __init__(self, threshold=3, window=30.0, pause=30.0, max_pause=600.0):
+        self.threshold = threshold
+        self.window = window
+        self.pause = pause
+        self.max_pause = max_pause
+
+        self._hits = deque()
+        self._next_pause = pause
+        self._resume_at = 0.0
+        self._lock = threading.Lock()
+
+    def rate_limited(self):
+        """Reports a 429; returns the global pause (seconds) it triggered, or 0."""
+        now = time.monotonic()
+        with self._lock:
+            if now - self._resume_at > self.window + self._next_pause:
+                self._next_pause = self.pause  # quiet since the last pause: start over
+            self._hits.append(now)
+            while self._hits and now - self._hits[0] > self.window:
+                self._hits.popleft()
+            if len(self._hits) < self.threshold:
+                return 0
+
+            self._hits.clear()
+            pause = self._next_pause
+            self._resume_at = max(self._resume_at, now + pause)
+            self._next_pause = min(self.max_pause, pause * 2)
+            return pause
+
+    def remaining(self):
+        with self._lock:
+            return max(0.0, self._resume_at - time.monotonic())
+
+    def wait(self):
+        """Blocks while a global pause is in effect."""
+        remaining = self.remaining()
+        while remaining > 0:
+            time.sleep(remaining)
+            remaining = self.remaining()
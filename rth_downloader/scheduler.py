@@ -0,0 +1,111 @@
+import heapq
+import itertools
+import threading
+import time
+from urllib.parse import urlsplit
+
+
+# --- Priority Job Scheduler ---
+ASSUMED_BYTES_PER_SECOND = 256 * 1024  # turns a known filesize into seconds of media when the duration is unknown
+SJF_WEIGHT = 1.0  # seconds of queue time one second of media costs; 0 is plain FIFO
+
+
+def host_of(url):
+    """The host a URL's page requests go to ('www.' dropped), used for per-host concurrency caps."""
+    host = (urlsplit(url).hostname or '').lower()
+    return host.removeprefix('www.')
+
+
+def job_cost(duration=None, filesize=None):
+    """Estimated size of a job in seconds of media; 0 when the metadata does not tell."""
+    if duration:
+        return float(duration)
+    if filesize:
+        return filesize / ASSUMED_BYTES_PER_SECOND
+    return 0.0
+
+
+class JobScheduler:
+    """Hands queued URLs to the download workers by priority, then shortest job first, per host.
+
+    Higher priorities always go first. Within a priority, jobs are ordered by their submission
+    time plus their cost (job_cost() seconds times SJF_WEIGHT), so a 3-minute clip overtakes a
+    2-hour video queued just before it, yet any job eventually runs even while shorter ones keep
+    arriving. Jobs of unknown size keep their submission order. A host with per_host_limit jobs
+    running is passed over until one of them ends.
+
+    Workers call get(finished=<their previous URL>), or get() after finish(url), which blocks
+    until a job may start and returns None once close() was called and nothing is left.
+    """
+
+    def __init__(self, per_host_limit=None):
+        self.per_host_limit = per_host_limit
+        self._queues = {}  # host -> heap of (-priority, deadline, seq, url)
+        self._running = {}  # host -> jobs started and not finished
+        self._seq = itertools.count()
+        self._closed = False
+        self._size = 0
+        self._changed = threading.Condition()
+
+    def put(self, url, priority=0, duration=None, filesize=None):
+        deadline = time.monotonic() + job_cost(duration, filesize) * SJF_WEIGHT
+        host = host_of(url)
+        with self._changed:
+            heapq.heappush(self._queues.setdefault(host, []), (-priority, deadline, next(self._seq), url))
+            self._size += 1
+            self._changed.notify()
+
+    def qsize(self):
+        return self._size
+
+    def _pick(self):
+        best = None
+        for host, jobs in self._queues.items():
+            if not jobs or (self.per_host_limit and self._running.get(host, 0) >= self.per_host_limit):
+                continue
+            if best is None or jobs[0] < self._queues[best][0]:
+                best = host
+        if best is None:
+            return None
+        self._size -= 1
+        self._running[best] = self._running.get(best, 0) + 1
+        return heapq.heappop(self._queues[best])[3]
+
+    def _finish(self, url):
+        host = host_of(url)
+        if self._running.get(host):
+            self._running[host] -= 1
+            self._changed.notify_all()
+
+    def finish(self, url):
+        """Ends a job started by get(), freeing its host's slot."""
+        with self._changed:
+            self._finish(url)
+
+    def resume(self, url):
+        """Takes the host slot of a job given back with finish() again, waiting while its host is at the limit."""
+        host = host_of(url)
+        with self._changed:
+            while self.per_host_limit and self._running.get(host, 0) >= self.per_host_limit:
+                self._changed.wait()
+            self._running[host] = self._running.get(host, 0) + 1
+
+    def get(self, finished=None):
+        """Ends the caller's previous job (if any) and waits for the next one."""
+        with self._changed:
+            if finished is not None:
+                self._finish(finished)
+            while True:
+                url = self._pick()
+                if url is not None:
+                    return url
+                if self._closed and not self._size:
+                    self._changed.notify_all()
+                    return None
+                self._changed.wait()
+
+    def close(self):
+        """No more jobs will be put; idle workers are released once the queue is empty."""
+        with self._changed:
+            self._closed = True
+            self._changed.notify_all()
@@ -0,0 +1,253 @@
+import http.client
+import os
+import queue
+import threading
+import time
+from pathlib import Path
+from urllib.parse import urljoin, urlsplit
+
+from yt_dlp.postprocessor import PostProcessor
+
+DEFAULT_SEGMENT_SIZE = 4 * 1024 * 1024
+SEGMENTED_MIN_SIZE = 32 * 1024 * 1024  # smaller files are not worth extra connections
+READ_CHUNK_SIZE = 256 * 1024
+MAX_REDIRECTS = 5
+
+
+class SegmentedDownloadError(Exception):
+    """Raised when a segmented download cannot be completed (the caller may fall back)."""
+
+
+# --- Pooled HTTP Connections ---
+class _Connection:
+    """One keep-alive HTTP(S) connection owned by a single segment worker."""
+
+    def __init__(self, timeout):
+        self.timeout = timeout
+        self._conn = None
+        self._origin = None
+
+    def request(self, url, headers):
+        """Sends a GET (following redirects) and returns the open response."""
+        for _ in range(MAX_REDIRECTS + 1):
+            parts = urlsplit(url)
+            origin = (parts.scheme, parts.netloc)
+            if self._conn is None or origin != self._origin:
+                self.close()
+                conn_class = http.client.HTTPSConnection if parts.scheme == 'https' else http.client.HTTPConnection
+                self._conn = conn_class(parts.netloc, timeout=self.timeout)
+                self._origin = origin
+
+            path = (parts.path or '/') + (f'?{parts.query}' if parts.query else '')
+            try:
+                self._conn.request('GET', path, headers=headers)
+                response = self._conn.getresponse()
+            except (OSError, http.client.HTTPException):
+                self.close()
+                raise
+
+            if response.status in (301, 302, 303, 307, 308) and response.getheader('Location'):
+                response.read()
+                url = urljoin(url, response.getheader('Location'))
+                continue
+            return response
+        raise SegmentedDownloadError(f"Too many redirects for {url}")
+
+    def close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+
+# --- Multi-Connection Segmented Downloader ---
+class SegmentedDownloader:
+    """Downloads one large file as byte ranges over several pooled connections.
+
+    The output is preallocated to its final size and every segment is written straight to its
+    offset, so there is no reassembly step. A failed segment is retried on its own, continuing
+    from the last byte it received.
+    """
+
+    def __init__(self, connections=4, segment_size=DEFAULT_SEGMENT_SIZE, retries=3, timeout=30,
+                 progress_callback=None):
+        self.connections = max(1, int(connections))
+        self.segment_size = segment_size
+        self.retries = retries
+        self.timeout = timeout
+        self.progress_callback = progress_callback
+
+    def probe(self, url, headers=None):
+        """Returns the file size if the server supports range requests, else None."""
+        conn = _Connection(self.timeout)
+        try:
+            response = conn.request(url, dict(headers or {}, Range='bytes=0-0'))
+            response.read()
+        except (OSError, http.client.HTTPException):
+            return None
+        finally:
+            conn.close()
+
+        content_range = response.getheader('Content-Range') or ''
+        if response.status != 206 or '/' not in content_range:
+            return None
+        total = content_range.rsplit('/', 1)[1]
+        return int(total) if total.isdigit() else None
+
+    def download(self, url, dest, headers=None, size=None):
+        """Downloads url to dest; returns the number of bytes. Raises SegmentedDownloadError."""
+        headers = dict(headers or {})
+        size = size or self.probe(url, headers)
+        if not size:
+            raise SegmentedDownloadError("Server does not support range requests")
+
+        dest = Path(dest)
+        temp_path = dest.with_name(dest.name + '.rthseg')
+        self._preallocate(temp_path, size)
+
+        segments = queue.Queue()
+        for start in range(0, size, self.segment_size):
+            segments.put((start, min(start + self.segment_size, size) - 1))
+
+        state = {'downloaded': 0, 'errors': [], 'started': time.monotonic()}
+        lock = threading.Lock()
+        threads = [threading.Thread(target=self._worker, args=(url, headers, temp_path, segments, size, state, lock),
+                                    daemon=True)
+                   for _ in range(min(self.connections, segments.qsize()))]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        if state['errors'] or state['downloaded'] != size:
+            temp_path.unlink(missing_ok=True)
+            detail = state['errors'][0] if state['errors'] else f"got {state['downloaded']} of {size} bytes"
+            raise SegmentedDownloadError(f"Segmented download failed: {detail}")
+
+        os.replace(temp_path, dest)
+        return size
+
+    @staticmethod
+    def _preallocate(path, size):
+        with open(path, 'wb') as f:
+            if hasattr(os, 'posix_fallocate'):
+                try:
+                    os.posix_fallocate(f.fileno(), 0, size)
+                    return
+                except OSError:
+                    pass  # e.g. not supported by the filesystem
+            f.truncate(size)
+
+    def _worker(self, url, headers, temp_path, segments, size, state, lock):
+        conn = _Connection(self.timeout)
+        try:
+            with open(temp_path, 'r+b') as f:
+                while not state['errors']:
+                    try:
+                        start, end = segments.get_nowait()
+                    except queue.Empty:
+                        return
+                    try:
+                        self._fetch_segment(conn, url, headers, f, start, end, size, state, lock)
+                    except Exception as e:
+                        with lock:
+                            state['errors'].append(str(e))
+                        return
+        finally:
+            conn.close()
+
+    def _fetch_segment(self, conn, url, headers, f, start, end, size, state, lock):
+        attempt = 0
+        while start <= end:
+            try:
+                response = conn.request(url, dict(headers, Range=f'bytes={start}-{end}'))
+                if response.status != 206:
+                    raise SegmentedDownloadError(f"HTTP {response.status} for range {start}-{end}")
+
+                f.seek(start)
+                while start <= end:
+                    chunk = response.read(min(READ_CHUNK_SIZE, end - start + 1))
+                    if not chunk:
+                        raise SegmentedDownloadError(f"Connection closed at byte {start}")
+                    f.write(chunk)
+                    start += len(chunk)
+                    self._report(len(chunk), size, state, lock)
+            except (OSError, http.client.HTTPException, SegmentedDownloadError):
+                conn.close()
+                attempt += 1
+                if attempt > self.retries:
+                    raise
+                time.sleep(min(2 ** attempt * 0.5, 8))
+
+    def _report(self, num_bytes, size, state, lock):
+        with lock:
+            state['downloaded'] += num_bytes
+            downloaded = state['downloaded']
+        # Called outside the lock: the callback may block (bandwidth limits) without stalling the other segments.
+        if self.progress_callback:
+            elapsed = time.monotonic() - state['started']
+            speed = downloaded / elapsed if elapsed > 0 else None
+            eta = (size - downloaded) / speed if speed else None
+            self.progress_callback(downloaded, size, speed, eta)
+
+
+class SegmentedDownloadPP(PostProcessor):
+    """'before_dl' hook that fetches large single-URL HTTP(S) formats with SegmentedDownloader.
+
+    The file is written under the name yt-dlp is about to download to, so yt-dlp treats it as
+    already downloaded and carries on as usual. Any failure falls back to yt-dlp's own download,
+    which is also left to fetch anything that goes through a proxy or needs cookies, since the
+    ranged requests are plain http.client connections.
+    """
+
+    def __init__(self, connections, min_size=SEGMENTED_MIN_SIZE, downloader=None):
+        super().__init__(downloader)
+        self.connections = connections
+        self.min_size = min_size
+
+    def run(self, info):
+        if info.get('requested_formats') or info.get('protocol') not in ('http', 'https') or not info.get('url'):
+            return [], info
+        if (info.get('filesize') or info.get('filesize_approx') or self.min_size) < self.min_size:
+            return [], info
+
+        if self._needs_ydl_networking(info):
+            return [], info
+
+        dest = self._downloader.prepare_filename(info, 'temp')
+        if os.path.exists(dest):
+            return [], info
+
+        segmented = SegmentedDownloader(self.connections,
+                                        progress_callback=lambda *args: self._report(info, dest, *args))
+        headers = info.get('http_headers') or {}
+        size = segmented.probe(info['url'], headers)
+        if not size or size < self.min_size:
+            return [], info
+
+        self.to_screen(f"Downloading {Path(dest).name} over {self.connections} connections")
+        try:
+            segmented.download(info['url'], dest, headers=headers, size=size)
+        except (SegmentedDownloadError, OSError) as e:
+            self.report_warning(f"{e}; falling back to a single connection")
+            return [], info
+
+        self._report(info, dest, size, size, None, 0, status='finished')
+        return [], info
+
+    def _needs_ydl_networking(self, info):
+        """True if the format's URL would be fetched through a proxy or with cookies."""
+        proxies = self._downloader.proxies
+        proxy = proxies.get(urlsplit(info['url']).scheme) or proxies.get('all')
+        if proxy and proxy != '__noproxy__':
+            return True
+        headers = {name.lower() for name in info.get('http_headers') or {}}
+        return bool('cookie' in headers or info.get('cookies')
+                    or self._downloader.cookiejar.get_cookie_header(info['url']))
+
+    def _report(self, info, dest, downloaded, total, speed, eta, status='downloading'):
+        progress = {
+            'status': status, 'downloaded_bytes': downloaded, 'total_bytes': total, 'speed': speed, 'eta': eta,
+            'filename': dest, 'tmpfilename': dest + '.rthseg', 'info_dict': info,
+        }
+        for hook in self._downloader._progress_hooks:
+            hook(progress)
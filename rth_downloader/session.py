@@ -0,0 +1,196 @@
+import contextlib
+import socket
+import ssl
+import threading
+import time
+
+import yt_dlp
+
+
+# --- Shared Download Session (connection pool, DNS cache, cookie jar) ---
+DEFAULT_DNS_TTL = 300  # seconds
+DNS_CACHE_SIZE = 1024
+# Options that shape yt-dlp's request handlers; YoutubeDLs that agree on them share one director.
+SESSION_OPTIONS = ('http_headers', 'proxy', 'nocheckcertificate', 'socket_timeout', 'source_address',
+                   'legacyserverconnect', 'impersonate', 'cookiefile', 'cookiesfrombrowser', 'compat_opts',
+                   'client_certificate', 'client_certificate_key', 'client_certificate_password')
+
+
+class SessionStats:
+    """Thread-safe counters behind the connection reuse report (times in seconds)."""
+
+    FIELDS = ('requests', 'dns_hits', 'dns_misses', 'dns_lookup_time', 'tls_handshakes', 'tls_handshake_time')
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        for field in self.FIELDS:
+            setattr(self, field, 0)
+
+    def add(self, **deltas):
+        with self._lock:
+            for field, delta in deltas.items():
+                setattr(self, field, getattr(self, field) + delta)
+
+    def snapshot(self):
+        """Returns the counters plus derived reuse rate and time saved by reuse and DNS caching.
+
+        Every new connection resolves its host first, so connections = DNS hits + misses.
+        """
+        with self._lock:
+            counts = {field: getattr(self, field) for field in self.FIELDS}
+        connections = counts['dns_hits'] + counts['dns_misses']
+        reused = max(0, counts['requests'] - connections)
+        avg_handshake = counts['tls_handshake_time'] / counts['tls_handshakes'] if counts['tls_handshakes'] else 0.0
+        avg_lookup = counts['dns_lookup_time'] / counts['dns_misses'] if counts['dns_misses'] else 0.0
+        return dict(counts, connections=connections, reused=reused,
+                    reuse_rate=reused / counts['requests'] if counts['requests'] else 0.0,
+                    handshake_time_saved=reused * avg_handshake, dns_time_saved=counts['dns_hits'] * avg_lookup)
+
+
+class DnsCache:
+    """TTL cache of getaddrinfo results; resolve is the real lookup (socket.getaddrinfo by default)."""
+
+    def __init__(self, ttl=DEFAULT_DNS_TTL, stats=None):
+        self.ttl = ttl
+        self.stats = stats or SessionStats()
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def getaddrinfo(self, host, port, family=0, type=0, proto=0, flags=0, resolve=None):
+        key = (host, port, family, type, proto, flags)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry and entry[0] > now:
+            self.stats.add(dns_hits=1)
+            return list(entry[1])
+
+        started = time.perf_counter()
+        result = (resolve or socket.getaddrinfo)(host, port, family, type, proto, flags)
+        self.stats.add(dns_misses=1, dns_lookup_time=time.perf_counter() - started)
+        with self._lock:
+            if len(self._entries) >= DNS_CACHE_SIZE:
+                self._entries.clear()
+            self._entries[key] = (now + self.ttl, result)
+        return list(result)
+
+
+class _NetworkHooks:
+    """Wraps socket.getaddrinfo and ssl.SSLContext.wrap_socket once per process, while any session is open.
+
+    The wrappers only act in a thread that is sending a request through a session's director
+    (inside active(session)): that session's DNS cache answers the lookup and its stats get the
+    TLS handshake. Every other socket in the process (the daemon, the metrics server, ...) is
+    passed straight to the originals and left out of the statistics.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._users = 0
+        self._local = threading.local()
+        self._getaddrinfo = None
+        self._wrap_socket = None
+
+    def acquire(self):
+        with self._lock:
+            self._users += 1
+            if self._users == 1:
+                self._getaddrinfo, self._wrap_socket = socket.getaddrinfo, ssl.SSLContext.wrap_socket
+                socket.getaddrinfo = self.getaddrinfo
+                ssl.SSLContext.wrap_socket = self._make_wrap_socket(self._wrap_socket)
+
+    def release(self):
+        with self._lock:
+            self._users -= 1
+            if self._users == 0:
+                socket.getaddrinfo, ssl.SSLContext.wrap_socket = self._getaddrinfo, self._wrap_socket
+
+    @contextlib.contextmanager
+    def active(self, session):
+        previous = getattr(self._local, 'session', None)
+        self._local.session = session
+        try:
+            yield
+        finally:
+            self._local.session = previous
+
+    def getaddrinfo(self, host, port, family=0, type=0, proto=0, flags=0):
+        session = getattr(self._local, 'session', None)
+        if session is None:
+            return self._getaddrinfo(host, port, family, type, proto, flags)
+        return session.dns_cache.getaddrinfo(host, port, family, type, proto, flags, resolve=self._getaddrinfo)
+
+    def _make_wrap_socket(self, original):
+        def wrap_socket(context, *args, **kwargs):
+            session = getattr(self._local, 'session', None)
+            started = time.perf_counter()
+            sock = original(context, *args, **kwargs)
+            if session is not None and kwargs.get('do_handshake_on_connect', True) and not kwargs.get('server_side'):
+                session.stats.add(tls_handshakes=1, tls_handshake_time=time.perf_counter() - started)
+            return sock
+
+        return wrap_socket
+
+
+_hooks = _NetworkHooks()
+
+
+class DownloadSession:
+    """HTTP state shared by every YoutubeDL the workers create, for the whole app lifetime.
+
+    attach() points a YoutubeDL at a shared request director (so yt-dlp's keep-alive connection
+    pool outlives single items, workers and batches) and a shared cookie jar. Requests sent
+    through that director go through the session's DNS cache and TLS handshake timer, which
+    feed stats. Keep-alive needs yt-dlp's 'requests' handler (pip install "yt-dlp[default]");
+    the plain urllib fallback opens a connection per request. close() undoes the process-wide
+    hooks once the last open session is closed.
+    """
+
+    def __init__(self, dns_ttl=DEFAULT_DNS_TTL):
+        self.stats = SessionStats()
+        self.dns_cache = DnsCache(dns_ttl, self.stats)
+        self._owners = {}  # session options -> YoutubeDL owning the shared director and cookie jar
+        self._lock = threading.Lock()
+        self._closed = False
+        _hooks.acquire()
+
+    def _owner(self, params):
+        options = {name: params[name] for name in SESSION_OPTIONS if params.get(name) is not None}
+        key = repr(sorted(options.items()))
+        with self._lock:
+            owner = self._owners.get(key)
+            if owner is None:
+                owner = yt_dlp.YoutubeDL(dict(options, quiet=True, no_warnings=True))
+                director = owner._request_director
+                send = director.send
+
+                def counted_send(request):
+                    self.stats.add(requests=1)
+                    with _hooks.active(self):
+                        return send(request)
+
+                director.send = counted_send
+                self._owners[key] = owner
+            return owner
+
+    def attach(self, ydl):
+        """Makes ydl use the shared director and cookie jar; call detach(ydl) before it is closed."""
+        owner = self._owner(ydl.params)
+        ydl.__dict__['cookiejar'] = owner.cookiejar
+        ydl.__dict__['_request_director'] = owner._request_director
+
+    def detach(self, ydl):
+        # YoutubeDL.close() closes its director; the shared one must stay open.
+        if ydl.__dict__.get('_request_director') is not None:
+            del ydl.__dict__['_request_director']
+
+    def close(self):
+        """Closes the pooled connections (e.g. at app exit); later calls do nothing."""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            owners, self._owners = list(self._owners.values()), {}
+        for owner in owners:
+            owner.close()
+        _hooks.release()
@@ -0,0 +1,210 @@
+import os
+import shutil
+import threading
+import time
+from pathlib import Path
+
+from yt_dlp.postprocessor import PostProcessor
+
+
+# --- Disk-Space-Aware Output Manager ---
+DEFAULT_MIN_FREE_SPACE = 500 * 1024 ** 2  # bytes kept free on every volume the batch writes to
+DISK_POLL_INTERVAL = 5  # seconds between free-space checks while paused
+DISK_MAX_WAIT = 600  # seconds an item waits for space that no other download will release
+
+
+class InsufficientSpaceError(OSError):
+    pass
+
+
+def free_bytes(path):
+    """Free bytes on the volume holding path (or its nearest existing parent)."""
+    path = Path(path).absolute()
+    while not path.exists() and path.parent != path:
+        path = path.parent
+    return shutil.disk_usage(path).free
+
+
+def _volume(path):
+    path = Path(path).absolute()
+    while not path.exists() and path.parent != path:
+        path = path.parent
+    return path.stat().st_dev
+
+
+def format_size_estimate(info):
+    """Expected bytes of one yt-dlp format (or merged format) dict; 0 if nothing is known."""
+    size = info.get('filesize') or info.get('filesize_approx')
+    if not size and info.get('tbr') and info.get('duration'):
+        size = info['tbr'] * 125 * info['duration']  # kbit/s -> bytes
+    return int(size or 0)
+
+
+def estimate_item_bytes(info, mode, audio_format='mp3', quality=None):
+    """Returns (download bytes, output bytes, moved) for a video whose formats have been selected.
+
+    moved is True when the download itself becomes the output (no FFmpeg job), so on the same
+    volume the output needs no extra space.
+    """
+    formats = info.get('requested_formats') or [info]
+    download = sum(format_size_estimate(dict(fmt, duration=info.get('duration'))) for fmt in formats)
+    output = download
+    if mode == 'audio':
+        moved = formats[0].get('ext') == audio_format
+        if audio_format == 'mp3' and info.get('duration') and quality:
+            output = int(info['duration'] * int(str(quality).rstrip('k')) * 125)
+    else:
+        moved = len(formats) == 1
+    return download, output, moved
+
+
+def finalize_file(src, dst):
+    """Moves a finished file to its final name so it appears complete or not at all.
+
+    Same volume: an atomic rename. Across volumes (scratch on another disk) the copy goes to
+    '<dst>.part' first and is renamed into place, then the source is removed.
+    """
+    src, dst = Path(src), Path(dst)
+    if src == dst:
+        return dst
+    dst.parent.mkdir(parents=True, exist_ok=True)
+    try:
+        os.replace(src, dst)
+    except OSError:
+        temp_path = dst.with_name(dst.name + '.part')
+        shutil.copyfile(src, temp_path)
+        os.replace(temp_path, dst)
+        src.unlink()
+    return dst
+
+
+class OutputManager:
+    """Tracks the disk space a batch needs and pauses downloads when it runs short.
+
+    Raw streams are downloaded into scratch_dir (e.g. a tmpfs or fast SSD; defaults to
+    output_dir) and only finished files are moved or written into output_dir. Before each
+    download, reserve() checks the estimated download and output sizes against the free space
+    of each volume, minus what running downloads still have to write and min_free. If they do
+    not fit, the calling worker waits (on_wait(message) is called once) until space is freed.
+    If no other download holds a reservation, nothing will free space by itself, so after
+    max_wait seconds InsufficientSpaceError is raised and the item fails.
+    """
+
+    def __init__(self, output_dir, scratch_dir=None, min_free=DEFAULT_MIN_FREE_SPACE,
+                 poll_interval=DISK_POLL_INTERVAL, max_wait=DISK_MAX_WAIT):
+        self.output_dir = Path(output_dir)
+        self.scratch_dir = Path(scratch_dir) if scratch_dir else self.output_dir
+        self.min_free = min_free or 0
+        self.poll_interval = poll_interval
+        self.max_wait = max_wait
+        self.scratch_dir.mkdir(parents=True, exist_ok=True)
+        self._volumes = (_volume(self.scratch_dir), _volume(self.output_dir))
+        self.same_volume = self._volumes[0] == self._volumes[1]
+        self._reservations = {}  # key -> {'scratch': bytes, 'output': bytes, 'written': bytes}
+        self._released = threading.Condition()
+
+    def _outstanding(self, volume):
+        """Bytes that running downloads (and their outputs) still have to write to a volume."""
+        total = 0
+        for reservation in self._reservations.values():
+            if self._volumes[0] == volume:
+                total += max(0, reservation['scratch'] - reservation['written'])
+            if self._volumes[1] == volume:
+                total += reservation['output']
+        return total
+
+    def _shortfall(self, scratch_bytes, output_bytes):
+        needs = {}
+        needs[self._volumes[0]] = needs.get(self._volumes[0], 0) + scratch_bytes
+        needs[self._volumes[1]] = needs.get(self._volumes[1], 0) + output_bytes
+        paths = {self._volumes[0]: self.scratch_dir, self._volumes[1]: self.output_dir}
+        for volume, needed in needs.items():
+            available = free_bytes(paths[volume]) - self._outstanding(volume) - self.min_free
+            if needed > available:
+                return paths[volume], needed - available
+        return None
+
+    def reserve(self, key, scratch_bytes, output_bytes, on_wait=None):
+        """Blocks until the item fits on disk, then records its reservation."""
+        waited_since = None
+        with self._released:
+            while True:
+                shortfall = self._shortfall(scratch_bytes, output_bytes)
+                if shortfall is None:
+                    break
+                path, missing = shortfall
+                message = f"Waiting for disk space: {missing / 1024 ** 2:.0f} MiB more needed on {path}"
+                if waited_since is None:
+                    waited_since = time.monotonic()
+                    if on_wait:
+                        on_wait(message)
+                elif not self._reservations and time.monotonic() - waited_since > self.max_wait:
+                    raise InsufficientSpaceError(f"Not enough disk space: {missing / 1024 ** 2:.0f} MiB more "
+                                                 f"needed on {path}")
+                self._released.wait(self.poll_interval)
+            self._reservations[key] = {'scratch': scratch_bytes, 'output': output_bytes, 'written': 0}
+        return waited_since is not None
+
+    def update(self, key, written_bytes):
+        """Records how much of a reservation's download is already on disk."""
+        with self._released:
+            reservation = self._reservations.get(key)
+            if reservation is not None:
+                reservation['written'] = written_bytes or 0
+
+    def release(self, key):
+        with self._released:
+            if self._reservations.pop(key, None) is not None:
+                self._released.notify_all()
+
+    def release_url(self, url):
+        """Drops every reservation of a source URL (e.g. after it failed)."""
+        with self._released:
+            keys = [key for key in self._reservations if key[0] == url]
+            for key in keys:
+                del self._reservations[key]
+            if keys:
+                self._released.notify_all()
+
+
+class DiskSpacePP(PostProcessor):
+    """Reserves disk space for each video once its formats are selected, before the download starts.
+
+    on_wait(url, message) is called when the download has to wait for space, and with a message
+    of None once it continues. Given streaming (a streaming.StreamingAudioPP), no space is
+    reserved for the raw download of an item it will encode while downloading; should that
+    fail, it calls reserve(info) again for the normal download.
+    """
+
+    def __init__(self, manager, mode=None, audio_format='mp3', quality=None, on_wait=None, streaming=None,
+                 downloader=None):
+        super().__init__(downloader)
+        self.manager = manager
+        self.mode = mode
+        self.audio_format = audio_format
+        self.quality = quality
+        self.on_wait = on_wait
+        self.streaming = streaming
+        self.current_url = None
+
+    def run(self, info):
+        self.reserve(info, streamed=self.streaming is not None and self.streaming.will_stream(info))
+        return [], info
+
+    def reserve(self, info, streamed=False):
+        """Reserves the item's space (replacing an earlier reservation), waiting while the disk is too full."""
+        url = self.current_url or info.get('webpage_url')
+        key = (url, info.get('id'))
+        download_bytes, output_bytes, moved = estimate_item_bytes(info, self.mode, self.audio_format, self.quality)
+        if streamed:
+            # The raw stream goes straight into FFmpeg; only the encoded file is written under the raw name.
+            download_bytes, moved = output_bytes, True
+        if moved and self.manager.same_volume:
+            output_bytes = 0  # renamed into place, not written again
+        notify = (lambda message: self.on_wait(url, message)) if self.on_wait else None
+
+        self.manager.release(key)
+        if self.manager.reserve(key, download_bytes, output_bytes, on_wait=notify):
+            self.to_screen("Enough disk space again; resuming")
+            if self.on_wait:
+                self.on_wait(url, None)
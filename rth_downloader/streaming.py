@@ -0,0 +1,272 @@
+import hashlib
+import http.client
+import os
+import queue
+import subprocess
+import threading
+import time
+from collections import deque
+from pathlib import Path
+
+from yt_dlp.networking import Request
+from yt_dlp.networking.exceptions import HTTPError, RequestError
+from yt_dlp.postprocessor import PostProcessor
+
+from .planner import pipeline_for, plan_audio_job
+from .transcode import STREAM_INFO_KEY, ffmpeg_command
+
+STREAM_CHUNK_SIZE = 64 * 1024
+STREAM_BUFFER_CHUNKS = 16  # chunks queued between the network and FFmpeg: at most 1 MiB per item
+# Containers FFmpeg can demux from a pipe. MP4/M4A only qualify with their index ('moov') up front.
+STREAMABLE_EXTS = {'webm', 'weba', 'ogg', 'opus', 'mp3', 'aac', 'm4a', 'mp4'}
+MP4_EXTS = {'m4a', 'mp4'}
+
+
+class StreamingError(Exception):
+    """Raised when a track cannot be encoded while downloading (the caller may fall back)."""
+
+
+def mp4_streamable(head):
+    """True if MP4 data starting with head has its 'moov' index before the media ('mdat')."""
+    offset = 0
+    while offset + 8 <= len(head):
+        size = int.from_bytes(head[offset:offset + 4], 'big')
+        box = head[offset + 4:offset + 8]
+        if box == b'moov':
+            return True
+        if box == b'mdat':
+            return False
+        if size == 1 and offset + 16 <= len(head):  # 64-bit box size
+            size = int.from_bytes(head[offset + 8:offset + 16], 'big')
+        if size < 8:
+            return False
+        offset += size
+    return False
+
+
+def _wait_with_cpu_time(proc):
+    """Waits for a child process; returns its CPU seconds (None where os.wait4 is missing)."""
+    if not hasattr(os, 'wait4'):
+        proc.wait()
+        return None
+    _, status, usage = os.wait4(proc.pid, 0)
+    proc.returncode = os.waitstatus_to_exitcode(status)
+    return round(usage.ru_utime + usage.ru_stime, 3)
+
+
+# --- Streaming Audio Encoder ---
+class StreamingTranscoder:
+    """Pipes an HTTP download straight into FFmpeg, so the raw stream is never written to disk.
+
+    The network reader and the thread feeding FFmpeg's stdin are joined by a queue of at most
+    buffer_chunks chunks. When the encoder falls behind, the queue fills, the reader stops
+    reading and TCP flow control slows the sender, so memory stays at about chunk_size *
+    buffer_chunks per item however long the track is. A dropped connection is resumed with a
+    Range request, up to retries times.
+    """
+
+    def __init__(self, ffmpeg, urlopen, chunk_size=STREAM_CHUNK_SIZE, buffer_chunks=STREAM_BUFFER_CHUNKS, retries=3,
+                 progress_callback=None):
+        self.ffmpeg = ffmpeg
+        self.urlopen = urlopen
+        self.chunk_size = chunk_size
+        self.buffer_chunks = buffer_chunks
+        self.retries = retries
+        self.progress_callback = progress_callback
+
+    def transcode(self, url, job, headers=None, size=None, ext=None):
+        """Runs an FFmpeg job (inputs ['-']) on the bytes of url; raises StreamingError.
+
+        Returns {'bytes', 'sha256', 'seconds', 'cpu_seconds'}: the bytes received, their SHA-256
+        (as dedup.hash_files computes it), the seconds FFmpeg still ran after the last byte and its
+        CPU time. progress_callback(downloaded, total, speed, eta[, 'finished']) follows the transfer.
+        """
+        output = job['output']
+        temp_output = f"{output}.part"
+        digest = hashlib.sha256()
+        chunks = self._read(url, dict(headers or {}), size)
+        head = next(chunks, b'')
+        if not head:
+            raise StreamingError("Empty response")
+        if ext in MP4_EXTS and not mp4_streamable(head):
+            chunks.close()
+            raise StreamingError("MP4 index is at the end of the file")
+
+        try:
+            proc = subprocess.Popen(ffmpeg_command(self.ffmpeg, job, temp_output), stdin=subprocess.PIPE,
+                                    stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+        except OSError as e:  # e.g. FFmpeg missing or not executable
+            chunks.close()
+            raise StreamingError(f"Cannot start FFmpeg: {e}")
+        stderr_tail = deque(maxlen=20)
+        buffer = queue.Queue(maxsize=self.buffer_chunks)
+        state = {'error': None}
+        threads = [threading.Thread(target=stderr_tail.extend, args=(proc.stderr,), daemon=True),
+                   threading.Thread(target=self._feed, args=(proc, buffer, state), daemon=True)]
+        for thread in threads:
+            thread.start()
+
+        received = 0
+        try:
+            chunk = head
+            while chunk:
+                digest.update(chunk)
+                received += len(chunk)
+                if not self._put(buffer, chunk, state):
+                    break
+                chunk = next(chunks, b'')
+            last_byte = time.perf_counter()
+            if self.progress_callback and not state['error']:
+                self.progress_callback(received, received, None, 0, 'finished')
+            self._put(buffer, None, state)
+            for thread in threads:
+                thread.join()
+            cpu_seconds = _wait_with_cpu_time(proc)
+        except BaseException:
+            state['error'] = state['error'] or "interrupted"
+            chunks.close()
+            proc.kill()
+            try:
+                buffer.put_nowait(None)  # wakes the feeder if it waits for data
+            except queue.Full:
+                pass  # it has data and fails on the closed pipe instead
+            proc.wait()
+            Path(temp_output).unlink(missing_ok=True)
+            raise
+
+        if proc.returncode != 0 or state['error']:
+            Path(temp_output).unlink(missing_ok=True)
+            detail = b''.join(stderr_tail).decode(errors='replace').strip()[-300:] or state['error']
+            raise StreamingError(f"FFmpeg failed for '{Path(output).name}': {detail}")
+        os.replace(temp_output, output)
+        digest.update(b'\0')
+        return {'bytes': received, 'sha256': digest.hexdigest(), 'seconds': time.perf_counter() - last_byte,
+                'cpu_seconds': cpu_seconds}
+
+    @staticmethod
+    def _put(buffer, chunk, state):
+        """Queues a chunk for FFmpeg, waiting while the buffer is full; False once the feeder failed."""
+        while not state['error']:
+            try:
+                buffer.put(chunk, timeout=0.5)
+                return True
+            except queue.Full:
+                continue  # the encoder is behind
+        return False
+
+    @staticmethod
+    def _feed(proc, buffer, state):
+        """Writes queued chunks to FFmpeg's stdin until the None that ends the stream."""
+        try:
+            while (chunk := buffer.get()) is not None:
+                proc.stdin.write(chunk)
+        except OSError as e:  # e.g. FFmpeg exited early (broken pipe)
+            state['error'] = str(e)
+        finally:
+            try:
+                proc.stdin.close()
+            except OSError:
+                pass
+
+    def _read(self, url, headers, size):
+        """Yields the response body in chunks, resuming with Range requests after a dropped connection."""
+        received = 0
+        attempt = 0
+        started = time.monotonic()
+        while True:
+            response = None
+            try:
+                request_headers = dict(headers, Range=f'bytes={received}-') if received else headers
+                response = self.urlopen(Request(url, headers=request_headers))
+                if received and response.status != 206:
+                    raise StreamingError(f"Cannot resume at byte {received} (HTTP {response.status})")
+                if not received:
+                    size = size or int(response.headers.get('Content-Length') or 0) or None
+                while chunk := response.read(self.chunk_size):
+                    received += len(chunk)
+                    attempt = 0
+                    if self.progress_callback:
+                        elapsed = time.monotonic() - started
+                        speed = received / elapsed if elapsed > 0 else None
+                        eta = (size - received) / speed if speed and size else None
+                        self.progress_callback(received, size, speed, eta)
+                    yield chunk
+                if size and received < size:
+                    raise http.client.IncompleteRead(b'', size - received)
+                return
+            except HTTPError as e:
+                raise StreamingError(f"HTTP Error {e.status}: {e.reason}")
+            except (OSError, RequestError, http.client.HTTPException) as e:
+                attempt += 1
+                if attempt > self.retries:
+                    raise StreamingError(f"Download failed at byte {received}: {e}")
+                time.sleep(min(2 ** attempt * 0.5, 8))
+            finally:
+                if response is not None:
+                    response.close()
+
+
+class StreamingAudioPP(PostProcessor):
+    """'before_dl' hook that downloads an audio format straight into its FFmpeg encode.
+
+    The output is written under yt-dlp's temp name with the target extension, which yt-dlp
+    (with 'final_ext' set to that extension, as for its own --extract-audio) takes as the
+    finished download; the TranscodeHandoffPP then only moves it into place. Formats that
+    need no conversion, cannot be read from a pipe or are already (partly) on disk are left
+    to the normal download, as is any track whose streaming fails (on_fallback(info) is then
+    called before it starts).
+    """
+
+    def __init__(self, ffmpeg, audio_format='mp3', quality=None, audio_encoder=None, on_fallback=None,
+                 downloader=None):
+        super().__init__(downloader)
+        self.ffmpeg = ffmpeg
+        self.audio_format = audio_format
+        self.quality = quality
+        self.audio_encoder = audio_encoder
+        self.on_fallback = on_fallback
+
+    def _plan(self, info):
+        """The FFmpeg job to stream the selected format into, or None to leave it to the normal download."""
+        if info.get('requested_formats') or info.get('protocol') not in ('http', 'https') or not info.get('url'):
+            return None
+        if info.get('ext') not in STREAMABLE_EXTS:
+            return None
+        raw = self._downloader.prepare_filename(info, 'temp')
+        if os.path.exists(raw) or os.path.exists(raw + '.part'):
+            return None  # finished or resumable; the normal download handles it
+        return plan_audio_job(raw, info.get('acodec'), self.audio_format, self.quality, self.audio_encoder)
+
+    def will_stream(self, info):
+        """True if run() will try to encode this item while downloading it."""
+        return self._plan(info) is not None
+
+    def run(self, info):
+        job = self._plan(info)
+        if job is None:
+            return [], info
+        job['inputs'] = ['-']
+
+        output = job['output']
+        streamer = StreamingTranscoder(self.ffmpeg, self._downloader.urlopen,
+                                       progress_callback=lambda *args: self._report(info, output, *args))
+        self.to_screen(f"Encoding {Path(output).name} while downloading")
+        try:
+            stats = streamer.transcode(info['url'], job, headers=info.get('http_headers'),
+                                       size=info.get('filesize'), ext=info.get('ext'))
+        except StreamingError as e:
+            self.report_warning(f"{e}; downloading the file first instead")
+            if self.on_fallback:
+                self.on_fallback(info)
+            return [], info
+
+        info[STREAM_INFO_KEY] = dict(stats, pipeline=pipeline_for('audio', job, streamed=True))
+        return [], info
+
+    def _report(self, info, output, downloaded, total, speed, eta, status='downloading'):
+        progress = {
+            'status': status, 'downloaded_bytes': downloaded, 'total_bytes': total, 'speed': speed, 'eta': eta,
+            'filename': output, 'tmpfilename': output + '.part', 'info_dict': info,
+        }
+        for hook in self._downloader._progress_hooks:
+            hook(progress)
@@ -0,0 +1,175 @@
+import json
+import os
+import shutil
+import subprocess
+import sys
+import threading
+from pathlib import Path
+
+from .paths import get_app_data_dir, resource_path
+
+
+class FFmpegNotFoundError(RuntimeError):
+    """Raised when neither a bundled nor a system FFmpeg can be found (or it cannot do the job)."""
+
+
+# --- FFmpeg Toolchain Probe (runs once per process, results cached on disk) ---
+TOOLCHAIN_CACHE_NAME = "toolchain.json"
+MP3_ENCODERS = ('libmp3lame', 'libshine', 'mp3_mf')  # fastest/best first
+MERGE_MUXERS = ('mp4', 'webm', 'matroska')
+
+
+def _binary_names(tool):
+    return (f"{tool}.exe", tool) if sys.platform == 'win32' else (tool, f"{tool}.exe")
+
+
+def locate_binaries():
+    """Returns (ffmpeg path, ffprobe path or None, bundled) without starting any process."""
+    # First, check if the bundled version exists (ffmpeg.exe next to the app; plain names off Windows)
+    for ffmpeg_name, ffprobe_name in zip(_binary_names('ffmpeg'), _binary_names('ffprobe')):
+        ffmpeg_path, ffprobe_path = resource_path(ffmpeg_name), resource_path(ffprobe_name)
+        if Path(ffmpeg_path).is_file() and Path(ffprobe_path).is_file():
+            return ffmpeg_path, ffprobe_path, True
+
+    # If the bundled version is not found, check system PATH as a fallback
+    # (useful when running the script directly, not as an EXE)
+    ffmpeg_path = shutil.which('ffmpeg')
+    if not ffmpeg_path:
+        raise FFmpegNotFoundError(
+            "FFmpeg is required but not found. Please ensure FFmpeg is in your system's PATH, or that the "
+            "--add-binary commands for PyInstaller were correct.")
+    return ffmpeg_path, shutil.which('ffprobe'), False
+
+
+def _run_listing(ffmpeg, option):
+    proc = subprocess.run([ffmpeg, '-hide_banner', option], stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+                          text=True, errors='replace', timeout=30)
+    return proc.stdout.splitlines()
+
+
+def parse_listing(lines, flag=None):
+    """Parses an 'ffmpeg -encoders'/'-muxers' listing into a set of names.
+
+    Entries come after the ' ---' separator as '<flags> <name>[,<name>] <description>';
+    with flag set, only entries whose flags contain it (e.g. 'E' for muxing) are kept.
+    """
+    names = set()
+    entries = False
+    for line in lines:
+        fields = line.split()
+        if not entries:
+            entries = bool(fields) and set(fields[0]) == {'-'}
+            continue
+        if len(fields) >= 2 and (flag is None or flag in fields[0]):
+            names.update(fields[1].split(','))
+    return names
+
+
+class Toolchain:
+    """What the local FFmpeg can do: paths, version, encoders and muxers."""
+
+    def __init__(self, ffmpeg, ffprobe=None, bundled=False, version=None, encoders=(), muxers=()):
+        self.ffmpeg = ffmpeg
+        self.ffprobe = ffprobe
+        self.bundled = bundled
+        self.version = version
+        self.encoders = set(encoders)
+        self.muxers = set(muxers)
+
+    @classmethod
+    def probe(cls, ffmpeg, ffprobe=None, bundled=False):
+        """Asks the binary for its version, encoders and muxers (three short-lived processes)."""
+        try:
+            version_lines = _run_listing(ffmpeg, '-version')
+            encoders = parse_listing(_run_listing(ffmpeg, '-encoders'))
+            muxers = parse_listing(_run_listing(ffmpeg, '-muxers'), flag='E')
+        except (OSError, subprocess.SubprocessError) as e:
+            raise FFmpegNotFoundError(f"FFmpeg at '{ffmpeg}' could not be run: {e}")
+        version = version_lines[0].split()[2] if version_lines and len(version_lines[0].split()) > 2 else None
+        return cls(ffmpeg, ffprobe, bundled, version, encoders, muxers)
+
+    def to_dict(self):
+        return {'ffmpeg': self.ffmpeg, 'ffprobe': self.ffprobe, 'bundled': self.bundled, 'version': self.version,
+                'encoders': sorted(self.encoders), 'muxers': sorted(self.muxers)}
+
+    @property
+    def mp3_encoder(self):
+        """The preferred available MP3 encoder, or None."""
+        return next((name for name in MP3_ENCODERS if name in self.encoders), None)
+
+    def require(self, mode, audio_format='mp3'):
+        """Raises FFmpegNotFoundError if this FFmpeg cannot produce the given download mode."""
+        if mode == "audio" and audio_format == 'm4a':
+            if 'ipod' not in self.muxers or 'aac' not in self.encoders:
+                raise FFmpegNotFoundError(f"FFmpeg at '{self.ffmpeg}' cannot write M4A (needs the ipod muxer "
+                                          f"and the aac encoder).")
+        elif mode == "audio" and (not self.mp3_encoder or 'mp3' not in self.muxers):
+            raise FFmpegNotFoundError(
+                f"FFmpeg at '{self.ffmpeg}' ({self.version or 'unknown version'}) cannot encode MP3 "
+                f"(needs one of: {', '.join(MP3_ENCODERS)}).")
+        if mode == "video" and not self.muxers.intersection(MERGE_MUXERS):
+            raise FFmpegNotFoundError(f"FFmpeg at '{self.ffmpeg}' has none of the {', '.join(MERGE_MUXERS)} muxers.")
+
+    def __repr__(self):
+        return f"Toolchain({self.ffmpeg!r}, version={self.version!r}, bundled={self.bundled})"
+
+
+def _fingerprint(path):
+    stat = os.stat(path)
+    return [str(Path(path).resolve()), stat.st_mtime_ns, stat.st_size]
+
+
+def load_toolchain(cache_path=None):
+    """Locates FFmpeg and returns its Toolchain, re-probing only when the binary changed.
+
+    The probe result is cached in cache_path keyed by the binary's path, mtime and size.
+    """
+    ffmpeg, ffprobe, bundled = locate_binaries()
+    key = _fingerprint(ffmpeg)
+
+    if cache_path:
+        try:
+            with open(cache_path, encoding='utf-8') as f:
+                cached = json.load(f)
+            if cached.get('key') == key:
+                return Toolchain(**dict(cached['toolchain'], ffprobe=ffprobe, bundled=bundled))
+        except (OSError, ValueError, KeyError, TypeError):
+            pass
+
+    toolchain = Toolchain.probe(ffmpeg, ffprobe, bundled)
+    if cache_path:
+        try:
+            Path(cache_path).write_text(json.dumps({'key': key, 'toolchain': toolchain.to_dict()}), encoding='utf-8')
+        except OSError:
+            pass
+    return toolchain
+
+
+_toolchain = None
+_toolchain_lock = threading.Lock()
+
+
+def get_toolchain():
+    """Returns the process-wide Toolchain, probing on first use; raises FFmpegNotFoundError.
+
+    A missing FFmpeg is not remembered, so installing it fixes the next download without a restart.
+    """
+    global _toolchain
+    with _toolchain_lock:
+        if _toolchain is None:
+            _toolchain = load_toolchain(get_app_data_dir() / TOOLCHAIN_CACHE_NAME)
+        return _toolchain
+
+
+def start_toolchain_probe():
+    """Probes FFmpeg on a background thread so the first download does not wait for it."""
+
+    def probe():
+        try:
+            get_toolchain()
+        except FFmpegNotFoundError:
+            pass  # reported when a download actually needs FFmpeg
+
+    thread = threading.Thread(target=probe, daemon=True)
+    thread.start()
+    return thread
@@ -0,0 +1,272 @@
+import os
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from yt_dlp.postprocessor import PostProcessor
+
+from .dedup import hash_files, link_file
+from .planner import pipeline_for, plan_audio_job
+from .storage import finalize_file
+
+
+# --- FFmpeg Transcode Stage (CPU-bound, separate process pool) ---
+MP4_COMPATIBLE_EXTS = {'mp4', 'm4a', 'm4v', 'mov'}
+
+
+CONTAINER_MUXERS = {'mp3': 'mp3', 'm4a': 'ipod', 'mp4': 'mp4', 'webm': 'webm', 'mkv': 'matroska'}
+STREAM_INFO_KEY = '__rth_stream'  # stats streaming.StreamingAudioPP leaves on a format it encoded while downloading
+
+
+def merge_container(video_ext, audio_ext, muxers=None):
+    """Picks an output container that can hold both streams without re-encoding.
+
+    muxers is the set FFmpeg supports (see toolchain.Toolchain); MKV is the fallback.
+    """
+    if video_ext in MP4_COMPATIBLE_EXTS and audio_ext in MP4_COMPATIBLE_EXTS:
+        container = 'mp4'
+    elif video_ext == audio_ext == 'webm':
+        container = 'webm'
+    else:
+        return 'mkv'
+    return container if muxers is None or CONTAINER_MUXERS[container] in muxers else 'mkv'
+
+
+def _children_cpu_time():
+    if sys.platform == 'win32':
+        return None  # os.times() does not report child processes on Windows
+    times = os.times()
+    return times.children_user + times.children_system
+
+
+def ffmpeg_command(ffmpeg, job, output):
+    """FFmpeg arguments that run a job into output; an input of '-' is read from stdin."""
+    cmd = [ffmpeg, '-y', '-hide_banner', '-loglevel', 'error']
+    for path in job['inputs']:
+        cmd += ['-i', 'pipe:0' if path == '-' else path]
+    if job['kind'] == 'audio':
+        cmd += ['-vn', '-acodec', job.get('encoder') or 'libmp3lame', '-b:a', job['quality']]
+    elif job['kind'] == 'remux':  # the audio stream already suits the container
+        cmd += ['-vn', '-c:a', 'copy']
+    else:  # merge bestvideo + bestaudio with stream copy
+        cmd += ['-map', '0:v:0', '-map', '1:a:0', '-c', 'copy']
+    return cmd + ['-f', CONTAINER_MUXERS[job['container']], output]
+
+
+def transcode_media(ffmpeg, job):
+    """Runs one FFmpeg job in a worker process; raises RuntimeError on failure.
+
+    Returns (output path, {'seconds': wall time, 'cpu_seconds': FFmpeg CPU time or None}).
+    """
+    started = time.perf_counter()
+    cpu_started = _children_cpu_time()
+    output = job['output']
+    temp_output = f"{output}.part"
+
+    proc = subprocess.run(ffmpeg_command(ffmpeg, job, temp_output), stdout=subprocess.DEVNULL,
+                          stderr=subprocess.PIPE, text=True)
+    if proc.returncode != 0:
+        if os.path.exists(temp_output):
+            os.remove(temp_output)
+        raise RuntimeError(f"FFmpeg failed for '{Path(output).name}': {proc.stderr.strip()[-300:]}")
+
+    os.replace(temp_output, output)
+    for path in job['inputs']:
+        if path != output and os.path.exists(path):
+            os.remove(path)
+
+    cpu_finished = _children_cpu_time()
+    cpu_seconds = None if cpu_started is None else round(cpu_finished - cpu_started, 3)
+    return output, {'seconds': time.perf_counter() - started, 'cpu_seconds': cpu_seconds}
+
+
+class TranscodeStage:
+    """Drains finished raw downloads into FFmpeg on a process pool sized to the CPU count.
+
+    submit() blocks once max_pending jobs are queued or running, so download workers
+    stop pulling new URLs while the encoders are behind (backpressure). One stage can be
+    shared by several worker pools; each learns of its own jobs' results through on_done.
+    """
+
+    def __init__(self, ffmpeg='ffmpeg', max_processes=None, max_pending=None):
+        self.ffmpeg = ffmpeg
+        self.max_processes = max_processes or os.cpu_count() or 1
+
+        self._executor = ProcessPoolExecutor(max_workers=self.max_processes)
+        self._slots = threading.BoundedSemaphore(max_pending or self.max_processes * 2)
+
+    def submit(self, url, job, on_done=None):
+        """Queues an FFmpeg job for the given source URL, waiting while the queue is full.
+
+        on_done(error, stats) is called once the job finishes; error is None on success and stats
+        holds the run's 'seconds' and 'cpu_seconds' (None on failure).
+        """
+        self._slots.acquire()
+        try:
+            future = self._executor.submit(transcode_media, self.ffmpeg, job)
+        except Exception:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda f: self._job_done(f, on_done))
+
+    def _job_done(self, future, on_done):
+        self._slots.release()
+        error = future.exception()
+        if on_done:
+            on_done(error, None if error else future.result()[1])
+
+    def close(self):
+        """Waits for every queued job and shuts the process pool down."""
+        self._executor.shutdown(wait=True)
+
+
+class TranscodeHandoffPP(PostProcessor):
+    """Runs after each video's downloads and hands the raw files to the TranscodeStage.
+
+    Items are recorded in the download archive (if any) once their output is final.
+    on_downloaded(url, info, output path, downloaded bytes, pipeline, saved=None) is called for every
+    downloaded video (pipeline as named by planner.pipeline_for); on_queued(url) and
+    on_transcoded(url, info, error, stats) report its post-processing state.
+    Given a dedup index (dedup.DedupIndex), the raw download is hashed first: media already
+    produced in this variant is linked to the new name instead of being finalized or converted
+    again (pipeline 'link', saved = {'bytes': ..., 'cpu': ...}), and new outputs are indexed.
+    A stage of None skips conversion but still records and reports the item.
+    Audio already encoded while downloading (streaming.StreamingAudioPP) arrives in its final
+    format and is reported as finished right away, with the encoder's stats.
+    Outputs are written to final_outtmpl, so raw downloads may live on a separate scratch
+    volume; a download that needs no FFmpeg job is moved there with storage.finalize_file.
+    """
+
+    def __init__(self, stage, mode=None, quality=None, final_outtmpl=None, audio_format='mp3', audio_encoder=None,
+                 muxers=None, variant=None, archive=None, dedup=None, on_downloaded=None, on_queued=None,
+                 on_transcoded=None, downloader=None):
+        super().__init__(downloader)
+        self.stage = stage
+        self.mode = mode
+        self.quality = quality
+        self.final_outtmpl = final_outtmpl
+        self.audio_format = audio_format
+        self.audio_encoder = audio_encoder
+        self.muxers = muxers
+        self.variant = variant or f"{mode}:{quality}"
+        self.archive = archive
+        self.dedup = dedup
+        self.on_downloaded = on_downloaded
+        self.on_queued = on_queued
+        self.on_transcoded = on_transcoded
+        self.current_url = None
+
+    def _record(self, info, output=None, sha256=None, transcode_cpu=None):
+        archive_id = self._downloader._make_archive_id(info)
+        if self.archive is not None and archive_id:
+            self.archive.add(archive_id, self.variant)
+        if self.dedup is not None and output:
+            self.dedup.add(output, self.variant, archive_id, sha256, info.get('title'), transcode_cpu)
+
+    def _final_name(self, info, ext, source):
+        if not self.final_outtmpl:
+            return str(Path(source).with_suffix(f'.{ext}'))
+        return self._downloader.prepare_filename(dict(info, ext=ext), outtmpl=self.final_outtmpl)
+
+    def _link_duplicate(self, url, info, inputs, existing, sha256):
+        """Replaces a fresh download with a link to identical media that was already produced."""
+        source = existing['path']
+        target = self._final_name(info, os.path.splitext(source)[1].lstrip('.'), inputs[0])
+        downloaded_bytes = sum(os.path.getsize(path) for path in inputs if os.path.exists(path))
+        if os.path.exists(target) and os.path.samefile(source, target):
+            method = 'existing'
+        else:
+            method = link_file(source, target)
+        for path in inputs:
+            if path != target and os.path.exists(path):
+                os.remove(path)
+        self.to_screen(f"Same media as '{Path(source).name}' ({method}); not stored again")
+        if self.on_downloaded:
+            saved = {'bytes': 0 if method == 'copy' else existing['size'], 'cpu': existing['transcode_cpu']}
+            self.on_downloaded(url, info, target, downloaded_bytes, 'link', saved=saved)
+        self._record(info, target, sha256, existing['transcode_cpu'])
+
+    def run(self, info):
+        downloads = [d for d in info.get('requested_downloads') or [] if d.get('filepath')]
+        inputs = [d['filepath'] for d in downloads]
+        if not inputs:
+            return [], info  # the download itself failed; nothing to convert or record
+
+        url = self.current_url or info.get('webpage_url')
+        job = None
+        streamed = downloads[0].get(STREAM_INFO_KEY)
+
+        sha256 = None
+        if self.dedup is not None:
+            # Raw downloads were just written, so they are read back from the page cache; a streamed
+            # item was hashed on its way into FFmpeg instead, since its raw bytes were never stored.
+            sha256 = streamed['sha256'] if streamed else hash_files(inputs)
+            existing = self.dedup.find(self.variant, sha256=sha256)
+            if existing:
+                self._link_duplicate(url, info, inputs, existing, sha256)
+                return [], info
+
+        if self.stage and self.mode == "audio":
+            job = plan_audio_job(inputs[0], downloads[0].get('acodec') or info.get('acodec'), self.audio_format,
+                                 self.quality, self.audio_encoder)
+            if job and self.final_outtmpl:
+                job['output'] = self._downloader.prepare_filename(dict(info, ext=self.audio_format),
+                                                                  outtmpl=self.final_outtmpl)
+
+        elif self.stage and self.mode == "video" and len(inputs) == 2:
+            video, audio = sorted(downloads, key=lambda d: d.get('vcodec') in (None, 'none'))
+            container = merge_container(video.get('ext'), audio.get('ext'), self.muxers)
+            output = self._downloader.prepare_filename(dict(info, ext=container), outtmpl=self.final_outtmpl)
+            job = {'kind': 'merge', 'inputs': [video['filepath'], audio['filepath']], 'output': output,
+                   'container': container}
+
+        if not job and len(inputs) == 1 and self.final_outtmpl:
+            final = self._final_name(info, os.path.splitext(inputs[0])[1].lstrip('.') or info.get('ext'), inputs[0])
+            inputs = [str(finalize_file(inputs[0], final))]
+
+        if self.on_downloaded:
+            if streamed:
+                downloaded_bytes, pipeline = streamed['bytes'], streamed['pipeline']
+            else:
+                downloaded_bytes = sum(os.path.getsize(path) for path in inputs if os.path.exists(path))
+                pipeline = pipeline_for(self.mode, job)
+            self.on_downloaded(url, info, job['output'] if job else inputs[0], downloaded_bytes, pipeline)
+
+        if streamed:
+            if self.on_queued:
+                self.on_queued(url)
+            self._transcoded(url, info, None, streamed, inputs[0], sha256)
+        elif job:
+            self.to_screen(f"Queued for FFmpeg: {Path(job['output']).name}")
+            if self.on_queued:
+                self.on_queued(url)
+            try:
+                self.stage.submit(url, job, on_done=lambda error, stats: self._transcoded(url, info, error, stats,
+                                                                                          job['output'], sha256))
+            except Exception as e:  # e.g. the process pool broke; report it like a failed job
+                self._transcoded(url, info, e, None)
+        else:
+            self._record(info, inputs[0], sha256)
+        return [], info
+
+    def _transcoded(self, url, info, error, stats, output=None, sha256=None):
+        if error is None:
+            self._record(info, output, sha256, stats['cpu_seconds'] if stats else None)
+        if self.on_transcoded:
+            self.on_transcoded(url, info, error, stats)
+
+
+def split_merged_formats(format_selector):
+    """Wraps a yt-dlp format selector so 'bestvideo+bestaudio' picks download as separate files.
+
+    The merge is then done by the TranscodeStage instead of inline in the download thread.
+    """
+
+    def selector(ctx):
+        for fmt in format_selector(ctx):
+            yield from fmt.get('requested_formats') or [fmt]
+
+    return selector
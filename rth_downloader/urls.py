@@ -0,0 +1,142 @@
+import csv
+import io
+import json
+import re
+from pathlib import Path
+from urllib.parse import parse_qsl, unquote_plus, urlencode, urlsplit, urlunsplit
+
+
+# --- Batch URL Input: extraction, canonicalization and de-duplication ---
+URL_PATTERN = re.compile(r"(?:https?://|(?:www\.|m\.|music\.)?youtube\.com/|youtu\.be/)[^\s\"'<>,;]+", re.IGNORECASE)
+TRACKING_PARAMS = {'fbclid', 'gclid'}  # click IDs that ad and social sites append to any link
+# Parameters that only mean tracking on their own sites (elsewhere 'app', 'ref' or 'si' can select content).
+SITE_TRACKING_PARAMS = {
+    'youtube.com': {'si', 'feature', 'pp', 'ab_channel', 'app'},
+    'youtu.be': {'si', 'feature', 'pp'},
+    'instagram.com': {'igshid', 'igsh'},
+    'twitter.com': {'ref_src', 'ref_url'},
+    'x.com': {'ref_src', 'ref_url'},
+    'soundcloud.com': {'si', 'ref'},
+}
+CLOSING_BRACKETS = {')': '(', ']': '['}
+YOUTUBE_HOSTS = {'youtube.com', 'www.youtube.com', 'm.youtube.com', 'music.youtube.com'}
+YOUTUBE_KEEP_PARAMS = ('v', 'list', 't', 'index')
+YOUTUBE_ID_PATHS = re.compile(r"^/(?:shorts|embed|live|v)/([\w-]{11})")
+
+
+def _site_tracking_params(host):
+    for domain, params in SITE_TRACKING_PARAMS.items():
+        if host == domain or host.endswith('.' + domain):
+            return params
+    return set()
+
+
+def _is_tracking(name, site_params=()):
+    name = name.lower()
+    return name in TRACKING_PARAMS or name in site_params or name.startswith('utm_')
+
+
+def _strip_trailing(url):
+    """Drops sentence punctuation after a URL: dots, and a ')' or ']' the URL never opened."""
+    while url:
+        last = url[-1]
+        if last == '.' or (last in CLOSING_BRACKETS and url.count(CLOSING_BRACKETS[last]) < url.count(last)):
+            url = url[:-1]
+        else:
+            return url
+    return url
+
+
+def _strip_tracking(query, site_params):
+    """A raw query string without its tracking parameters; the others are kept exactly as written."""
+    return '&'.join(segment for segment in query.split('&')
+                    if segment and not _is_tracking(unquote_plus(segment.split('=', 1)[0]), site_params))
+
+
+def canonicalize_url(url):
+    """Returns one canonical spelling of a URL so duplicates can be spotted.
+
+    Tracking parameters are dropped: utm_*, fbclid and gclid everywhere, site-specific ones (si,
+    feature, igshid, ...) on their own sites only. YouTube links are rewritten to
+    https://www.youtube.com/watch?v=ID (youtu.be, shorts, embed, live, m./music.) keeping only
+    the video, playlist, start time and index parameters. Other URLs keep the rest of their
+    query as written (blank values included) and their fragment, which some sites use for content.
+    """
+    url = _strip_trailing(url.strip())
+    if not re.match(r"^[a-z][a-z0-9+.-]*://", url, re.IGNORECASE):
+        url = 'https://' + url
+    parts = urlsplit(url)
+    host = parts.netloc.lower()
+    site_params = _site_tracking_params(host)
+    query = [(k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True) if not _is_tracking(k, site_params)]
+
+    if host == 'youtu.be' or host == 'www.youtu.be':
+        video_id = parts.path.strip('/').split('/')[0]
+        return _youtube_url('/watch', [('v', video_id)] + query)
+
+    if host in YOUTUBE_HOSTS:
+        match = YOUTUBE_ID_PATHS.match(parts.path)
+        if match:
+            return _youtube_url('/watch', [('v', match.group(1))] + query)
+        if parts.path.rstrip('/') in ('/watch', '/playlist'):
+            return _youtube_url(parts.path.rstrip('/'), query)
+        return urlunsplit(('https', 'www.youtube.com', parts.path.rstrip('/') or '/',
+                           _strip_tracking(parts.query, site_params), ''))
+
+    return urlunsplit((parts.scheme.lower(), host, parts.path or '/', _strip_tracking(parts.query, site_params),
+                       parts.fragment))
+
+
+def _youtube_url(path, query):
+    params = dict(query)
+    query = [(name, params[name]) for name in YOUTUBE_KEEP_PARAMS if params.get(name)]
+    return urlunsplit(('https', 'www.youtube.com', path, urlencode(query), ''))
+
+
+def extract_urls(text):
+    """Finds every URL in free text (one per line, CSV cells, JSON, a chat message, ...)."""
+    return URL_PATTERN.findall(text)
+
+
+def _json_strings(value):
+    if isinstance(value, str):
+        yield value
+    elif isinstance(value, dict):
+        for item in value.values():
+            yield from _json_strings(item)
+    elif isinstance(value, list):
+        for item in value:
+            yield from _json_strings(item)
+
+
+def read_url_text(text, kind='txt'):
+    """Extracts URLs from file contents: 'txt' (# comment lines ignored), 'csv' or 'json'."""
+    if kind == 'json':
+        strings = _json_strings(json.loads(text))
+    elif kind == 'csv':
+        strings = (cell for row in csv.reader(io.StringIO(text)) for cell in row)
+    else:
+        strings = (line for line in text.splitlines() if not line.strip().startswith('#'))
+    return [url for string in strings for url in extract_urls(string)]
+
+
+def read_url_file(path):
+    """Reads the URLs in a .txt, .csv or .json file (anything else is treated as text)."""
+    path = Path(path)
+    kind = path.suffix.lower().lstrip('.')
+    return read_url_text(path.read_text(encoding='utf-8-sig'), kind if kind in ('csv', 'json') else 'txt')
+
+
+def normalize_urls(urls, known=()):
+    """Canonicalizes and de-duplicates URLs in one pass, keeping the first occurrence's order.
+
+    URLs whose canonical form is in known are dropped as well. Returns (new urls, duplicates).
+    """
+    seen = set(known)
+    unique = []
+    for url in urls:
+        canonical = canonicalize_url(url)
+        if canonical not in seen:
+            seen.add(canonical)
+            unique.append(canonical)
+    return unique, len(urls) - len(unique)
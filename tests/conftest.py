@@ -0,0 +1,38 @@
+import shutil
+import sys
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parent.parent
+for path in (ROOT, ROOT / "benchmarks", ROOT / "benchmarks" / "mock_plugins"):
+    if str(path) not in sys.path:
+        sys.path.insert(0, str(path))
+
+from mock_server import MockMediaServer  # noqa: E402
+
+
+@pytest.fixture
+def app_dir(tmp_path, monkeypatch):
+    """A scratch app data directory (archive, caches, job store) for one test."""
+    monkeypatch.setenv("XDG_DATA_HOME", str(tmp_path / "data"))
+    path = tmp_path / "app"
+    path.mkdir()
+    return path
+
+
+@pytest.fixture
+def mock_server():
+    """A running MockMediaServer with a 'small' video profile, capped at 1 MiB/s."""
+    server = MockMediaServer(rate=1024 ** 2)
+    server.add_video_profile("small", 512 * 1024)
+    with server:
+        yield server
+
+
+@pytest.fixture
+def ffmpeg():
+    path = shutil.which("ffmpeg")
+    if not path:
+        pytest.skip("FFmpeg is not installed")
+    return path
@@ -0,0 +1,73 @@
+import time
+
+import pytest
+
+from mock_server import MockMediaServer
+from rth_downloader.bandwidth import BandwidthManager, TokenBucket
+from rth_downloader.config import DownloadConfig
+from rth_downloader.engine import DownloadEngine
+
+SIZE = 512 * 1024
+RATE = 512 * 1024
+
+
+@pytest.fixture
+def throttled_server():
+    """Serves each response at 2 MiB/s, so the client's own limit is the bottleneck."""
+    server = MockMediaServer(rate=2 * 1024 ** 2)
+    server.add_video_profile("small", SIZE)
+    with server:
+        yield server
+
+
+def timed_batch(app_dir, tmp_path, urls, **limits):
+    config = DownloadConfig(urls, tmp_path, mode="video", min_free_space=0, dedup=False, **limits)
+    started = time.monotonic()
+    result = DownloadEngine(app_data_dir=app_dir).run(config)
+    assert result.succeeded == len(urls)
+    return time.monotonic() - started
+
+
+def test_global_limit_caps_parallel_downloads(app_dir, ffmpeg, tmp_path, throttled_server):
+    urls = [throttled_server.video_url("small", n) for n in range(3)]
+    elapsed = timed_batch(app_dir, tmp_path, urls, rate_limit=RATE)
+    # 1.5 MiB at 512 KiB/s, less the one-second burst the bucket starts with.
+    assert elapsed >= (3 * SIZE - RATE) / RATE * 0.9
+    assert elapsed < 3 * SIZE / RATE * 2
+
+
+def test_per_item_limit(app_dir, ffmpeg, tmp_path, throttled_server):
+    elapsed = timed_batch(app_dir, tmp_path, [throttled_server.video_url("small", 1)],
+                          per_item_rate_limit=SIZE // 4)
+    assert elapsed >= (SIZE - SIZE // 4) / (SIZE // 4) * 0.9
+    assert elapsed < SIZE / (SIZE // 4) * 2
+
+
+def test_slow_server_is_not_throttled_further(app_dir, ffmpeg, tmp_path):
+    with MockMediaServer(rate=RATE // 2) as server:
+        server.add_video_profile("small", SIZE)
+        elapsed = timed_batch(app_dir, tmp_path, [server.video_url("small", 1)], rate_limit=RATE)
+    assert elapsed < SIZE / (RATE // 2) * 1.5
+
+
+def test_idle_items_leave_their_bandwidth_to_the_others():
+    manager = BandwidthManager(global_limit=RATE)
+    manager.start_item("idle")
+    manager.start_item("busy")
+    started = time.monotonic()
+    for downloaded in range(0, 2 * RATE + 1, RATE // 8):
+        manager.on_progress("busy", {'status': 'downloading', 'downloaded_bytes': downloaded, 'tmpfilename': "a"})
+    # 2 x RATE at RATE, less the one-second burst; a fixed half share would take three seconds.
+    assert time.monotonic() - started < 1.8
+
+
+def test_progress_going_backwards_is_not_charged_again(monkeypatch):
+    charged = []
+    monkeypatch.setattr(TokenBucket, 'consume', lambda bucket, num_bytes: charged.append(num_bytes))
+    manager = BandwidthManager(global_limit=RATE)
+    manager.start_item("item")
+    for downloaded in (0, 300, 200, 400):
+        manager.on_progress("item", {'status': 'downloading', 'downloaded_bytes': downloaded, 'tmpfilename': "a"})
+    manager.on_progress("item", {'status': 'downloading', 'downloaded_bytes': 50, 'tmpfilename': "b"})
+    manager.on_progress("item", {'status': 'downloading', 'downloaded_bytes': 80, 'tmpfilename': "b"})
+    assert charged == [300, 100, 30]
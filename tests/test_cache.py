@@ -0,0 +1,38 @@
+import os
+import time
+
+from rth_downloader.cache import InfoCache
+from rth_downloader.engine import DownloadEngine
+
+
+def test_disk_tier_drops_expired_and_surplus_entries(tmp_path):
+    cache = InfoCache(cache_dir=tmp_path, ttl=60, max_disk_entries=3)
+    for n in range(5):
+        cache.put(f"https://example.com/{n}", {'id': str(n)})
+        os.utime(cache._disk_path(f"https://example.com/{n}"), (time.time() - 10 + n,) * 2)
+    expired = cache._disk_path("https://example.com/0")
+    os.utime(expired, (time.time() - 120,) * 2)
+
+    cache.prune()
+    assert len(list(tmp_path.glob('*.json'))) == 3
+    assert not expired.exists()
+    assert InfoCache(cache_dir=tmp_path).get("https://example.com/4") == {'id': '4'}
+    assert InfoCache(cache_dir=tmp_path).get("https://example.com/1") is None
+
+
+def test_prune_runs_on_start_up(tmp_path):
+    cache = InfoCache(cache_dir=tmp_path, ttl=60)
+    cache.put("https://example.com/a", {'id': 'a'})
+    os.utime(cache._disk_path("https://example.com/a"), (time.time() - 120,) * 2)
+    InfoCache(cache_dir=tmp_path, ttl=60)
+    assert list(tmp_path.glob('*.json')) == []
+
+
+def test_lookups_are_exported_as_metrics(app_dir):
+    engine = DownloadEngine(app_data_dir=app_dir)
+    engine.info_cache.put("https://example.com/a", {'id': 'a'})
+    engine.info_cache.get("https://example.com/a")
+    engine.info_cache.get("https://example.com/b")
+    text = engine.metrics.render()
+    assert 'rth_info_cache_lookups{result="memory_hit"} 1' in text
+    assert 'rth_info_cache_lookups{result="miss"} 1' in text
@@ -0,0 +1,122 @@
+import os
+import stat
+import time
+
+import pytest
+
+from rth_downloader.cli import build_parser
+from rth_downloader.config import DownloadConfig
+from rth_downloader.daemon import DaemonClient, DaemonError, DownloadDaemon, EventLog
+from rth_downloader.engine import DownloadEngine
+
+
+def wait_for(jobs, timeout=60):
+    deadline = time.monotonic() + timeout
+    while any(job.state in ('queued', 'running') for job in jobs):
+        assert time.monotonic() < deadline, "jobs did not finish"
+        time.sleep(0.05)
+
+
+def test_overlapping_jobs_download_once(app_dir, ffmpeg, mock_server, tmp_path):
+    daemon = DownloadDaemon(engine=DownloadEngine(app_data_dir=app_dir), max_jobs=2).start()
+    url = mock_server.video_url("small", 1)
+    outputs = [tmp_path / "first", tmp_path / "second"]
+    try:
+        jobs = []
+        for output in outputs:
+            output.mkdir()
+            jobs.append(daemon.submit(DownloadConfig([url], output, mode="video", min_free_space=0)))
+        wait_for(jobs)
+    finally:
+        daemon.stop()
+
+    assert [job.state for job in jobs] == ['done', 'done']
+    assert mock_server.media_requests == {'small.mp4': 1}
+    assert sum(job.result.succeeded for job in jobs) == 2
+
+
+def start_daemon(app_dir, tmp_path, address):
+    daemon = DownloadDaemon(engine=DownloadEngine(app_data_dir=app_dir), allowed_roots=[tmp_path]).start()
+    server = daemon.serve(address)
+    if isinstance(server.server_address, str):
+        return daemon, server.server_address
+    return daemon, f"127.0.0.1:{server.server_address[1]}"
+
+
+def test_unix_socket_is_private(app_dir, tmp_path):
+    daemon, address = start_daemon(app_dir, tmp_path, None)
+    try:
+        assert address == str(app_dir / "daemon.sock")
+        assert stat.S_IMODE(os.stat(address).st_mode) == 0o600
+        assert DaemonClient(address).jobs() == []
+    finally:
+        daemon.stop()
+
+
+def test_tcp_requires_token(app_dir, tmp_path):
+    daemon, address = start_daemon(app_dir, tmp_path, "127.0.0.1:0")
+    try:
+        token_file = app_dir / "daemon.token"
+        assert stat.S_IMODE(os.stat(token_file).st_mode) == 0o600
+        with pytest.raises(DaemonError, match="access token"):
+            DaemonClient(address, token="wrong").jobs()
+        assert DaemonClient(address, token_file=token_file).jobs() == []
+    finally:
+        daemon.stop()
+
+
+def test_rejects_bad_requests(app_dir, tmp_path):
+    daemon, address = start_daemon(app_dir, tmp_path, None)
+    client = DaemonClient(address)
+    try:
+        outside = DownloadConfig(["http://127.0.0.1/watch?v=small_1"], app_dir.parent.parent)
+        with pytest.raises(DaemonError, match="outside the folders"):
+            client.submit(outside)
+        with pytest.raises(DaemonError, match="must be integers"):
+            client.request('GET', '/events?job=abc')
+        with pytest.raises(DaemonError, match="must be integers"):
+            next(client.events(since='x'))
+    finally:
+        daemon.stop()
+
+
+def test_client_sends_absolute_folders(app_dir, tmp_path, monkeypatch):
+    daemon, address = start_daemon(app_dir, tmp_path, None)
+    (tmp_path / "out").mkdir()
+    monkeypatch.chdir(tmp_path)
+    try:
+        job = DaemonClient(address).submit(DownloadConfig(["http://127.0.0.1/watch?v=small_1"], "out"))
+        assert job['output_dir'] == str(tmp_path / "out")
+    finally:
+        daemon.stop()
+
+
+def test_daemon_flag_takes_no_address():
+    args = build_parser().parse_args(["--daemon", "https://www.youtube.com/watch?v=abc"])
+    assert (args.daemon, args.daemon_address, args.urls) == (True, None, ["https://www.youtube.com/watch?v=abc"])
+    args = build_parser().parse_args(["--daemon-url", "127.0.0.1:8790", "URL"])
+    assert (args.daemon_address, args.urls) == ("127.0.0.1:8790", ["URL"])
+
+
+def test_client_run_reports_progress_and_sees_missed_end(app_dir, ffmpeg, mock_server, tmp_path):
+    daemon, address = start_daemon(app_dir, tmp_path, None)
+    client = DaemonClient(address)
+    output = tmp_path / "out"
+    output.mkdir()
+    try:
+        statuses = []
+        result = client.run(DownloadConfig([mock_server.video_url("small", 1)], output, mode="video",
+                                           min_free_space=0), progress_hook=lambda d: statuses.append(d['status']))
+        assert result.succeeded == 1
+        assert statuses[-1] == 'finished'
+
+        # A job whose end has dropped out of the event backlog still ends run().
+        job = daemon.submit(DownloadConfig([mock_server.video_url("small", 2)], output, mode="video",
+                                           min_free_space=0))
+        wait_for([job])
+        daemon.events = EventLog(size=1)
+        daemon.events.publish('totals', 0, {})
+        client.submit = lambda config, priority=0: {'id': job.id}
+        assert client.run(job.config).succeeded == 1
+    finally:
+        daemon.stop()
@@ -0,0 +1,61 @@
+import shutil
+from pathlib import Path
+
+import pytest
+
+from rth_downloader import pool
+from rth_downloader.config import DownloadConfig
+from rth_downloader.dedup import link_file
+from rth_downloader.engine import DownloadEngine
+
+
+def test_link_file_keeps_an_existing_target(tmp_path):
+    source, target = tmp_path / "a.mp3", tmp_path / "b.mp3"
+    source.write_bytes(b"new")
+    target.write_bytes(b"other video")
+    with pytest.raises(FileExistsError):
+        link_file(source, target, replace=False)
+    assert target.read_bytes() == b"other video"
+    assert [path.name for path in tmp_path.iterdir() if path.suffix == ".part"] == []
+    assert link_file(source, target) in ('reflink', 'hardlink', 'copy')
+    assert target.read_bytes() == b"new"
+
+
+def download_twice(app_dir, tmp_path, url, prepare=None):
+    engine = DownloadEngine(app_data_dir=app_dir)
+    results = []
+    for name in ("first", "second"):
+        output = tmp_path / name
+        output.mkdir()
+        if prepare and results:
+            prepare(output, results[0].records[0])
+        config = DownloadConfig([url], output, mode="video", min_free_space=0, skip_archived=False)
+        results.append(engine.run(config))
+    return results[1].records[0]
+
+
+def test_repeat_in_another_folder_is_linked(app_dir, ffmpeg, mock_server, tmp_path):
+    record = download_twice(app_dir, tmp_path, mock_server.video_url("small", 1))
+    assert (record.pipeline, record.downloaded_bytes) == ('link', 0)
+    assert record.bytes_saved > 0
+    assert mock_server.media_requests == {'small.mp4': 1}
+
+
+def test_copied_link_saves_no_bytes(app_dir, ffmpeg, mock_server, tmp_path, monkeypatch):
+    def copy_file(source, target, replace=True):
+        shutil.copyfile(source, target)
+        return 'copy'
+
+    monkeypatch.setattr(pool, 'link_file', copy_file)
+    record = download_twice(app_dir, tmp_path, mock_server.video_url("small", 1))
+    assert (record.pipeline, record.bytes_saved) == ('link', 0)
+
+
+def test_link_does_not_replace_another_file(app_dir, ffmpeg, mock_server, tmp_path):
+    def occupy(output, first):
+        (output / Path(first.path).name).write_bytes(b"another video")
+
+    record = download_twice(app_dir, tmp_path, mock_server.video_url("small", 1), prepare=occupy)
+    # The name is taken, so the video is downloaded again rather than linked over the other file.
+    assert record.downloaded_bytes > 0
+    assert mock_server.media_requests == {'small.mp4': 2}
@@ -0,0 +1,20 @@
+from rth_downloader.config import DownloadConfig
+from rth_downloader.engine import DownloadEngine
+from mock_server import MockMediaServer
+
+
+def test_batches_share_one_transcode_stage(app_dir, ffmpeg, tmp_path):
+    engine = DownloadEngine(app_data_dir=app_dir)
+    output = tmp_path / "out"
+    output.mkdir()
+    with MockMediaServer() as server:
+        server.add_audio_profile("audio", ffmpeg, duration=5)
+        results = [engine.run(DownloadConfig([server.video_url("audio", n)], output, min_free_space=0,
+                                             stream_audio=False, dedup=False))
+                   for n in range(2)]
+        stage = engine._transcode_stage
+
+    assert [result.failed for result in results] == [{}, {}]
+    assert [record.pipeline for result in results for record in result.records] == ['encode', 'encode']
+    assert sorted(path.suffix for path in output.iterdir()) == ['.mp3', '.mp3']
+    assert stage is not None and engine._get_transcode_stage(ffmpeg) is stage
@@ -0,0 +1,58 @@
+import os
+import stat
+import urllib.error
+import urllib.request
+
+import pytest
+
+from rth_downloader.metrics import Metrics, MetricsServer
+
+
+@pytest.fixture
+def metrics_server(tmp_path):
+    server = MetricsServer(Metrics(), 0, tmp_path).start()
+    server.url = f"http://127.0.0.1:{server.port}"
+    yield server
+    server.stop()
+
+
+def post(server, path, token=None):
+    token = server.token_file.read_text().strip() if token is None else token
+    request = urllib.request.Request(server.url + path, method='POST', headers={'Authorization': f"Bearer {token}"})
+    with urllib.request.urlopen(request) as response:
+        return response.read().decode()
+
+
+def test_metrics_are_served_on_get(metrics_server):
+    with urllib.request.urlopen(f"{metrics_server.url}/metrics") as response:
+        assert response.status == 200
+
+
+@pytest.mark.parametrize('toggle', ['profile', 'tracemalloc'])
+def test_debug_toggles_refuse_get(metrics_server, toggle):
+    with pytest.raises(urllib.error.HTTPError) as error:
+        urllib.request.urlopen(f"{metrics_server.url}/debug/{toggle}/start")
+    assert (error.value.code, error.value.headers['Allow']) == (405, 'POST')
+    assert not metrics_server.metrics.profiler.profiling
+    assert metrics_server.metrics.profiler.traced_memory() is None
+
+
+def test_debug_toggles_on_post(metrics_server, tmp_path):
+    profiler = metrics_server.metrics.profiler
+    assert post(metrics_server, "/debug/profile/start") == "Profiling started.\n"
+    assert profiler.profiling
+    post(metrics_server, "/debug/profile/stop")
+    assert not profiler.profiling
+
+    post(metrics_server, "/debug/tracemalloc/start")
+    post(metrics_server, "/debug/tracemalloc/stop")
+    assert sorted(path.name.split('-')[0] for path in tmp_path.iterdir()) == ['metrics.token', 'tracemalloc']
+
+
+def test_debug_toggles_need_the_token(metrics_server):
+    assert stat.S_IMODE(os.stat(metrics_server.token_file).st_mode) == 0o600
+    for token in ("wrong", ""):
+        with pytest.raises(urllib.error.HTTPError) as error:
+            post(metrics_server, "/debug/profile/start", token=token)
+        assert error.value.code == 403
+    assert not metrics_server.metrics.profiler.profiling
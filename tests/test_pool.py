@@ -0,0 +1,81 @@
+import threading
+
+import pytest
+from yt_dlp.utils import OnDemandPagedList
+
+from rth_downloader.config import DownloadConfig
+from rth_downloader.engine import DownloadEngine
+from rth_downloader.pool import DownloadWorkerPool, entry_url, iter_playlist_entries
+
+
+def test_worker_error_releases_slot_and_host(app_dir, ffmpeg, mock_server, tmp_path, monkeypatch):
+    engine = DownloadEngine(app_data_dir=app_dir)
+    engine.download_slots = threading.BoundedSemaphore(1)
+    broken = mock_server.video_url("small", 1)
+    is_archived = DownloadWorkerPool.is_archived
+
+    def fail_first(pool, archive_id):
+        if archive_id and archive_id.endswith("small_1"):
+            raise OSError("archive unreadable")
+        return is_archived(pool, archive_id)
+
+    monkeypatch.setattr(DownloadWorkerPool, 'is_archived', fail_first)
+    config = DownloadConfig([broken, mock_server.video_url("small", 2)], tmp_path, mode="video", max_workers=1,
+                            per_host_limit=1, min_free_space=0)
+    results = []
+    runner = threading.Thread(target=lambda: results.append(engine.run(config)), daemon=True)
+    runner.start()
+    runner.join(60)
+
+    assert results, "the batch hung after a worker error"
+    assert [record.status for record in results[0].failed_records] == ['failed']
+    assert results[0].results[broken] == ["Unexpected error: archive unreadable"]
+    assert results[0].succeeded == 1
+    assert engine.download_slots.acquire(blocking=False)
+
+
+def test_queued_items_sums_running_batches(app_dir, ffmpeg, mock_server, tmp_path):
+    engine = DownloadEngine(app_data_dir=app_dir)
+    engine.download_slots = threading.BoundedSemaphore(1)
+    engine.download_slots.acquire()  # hold every batch's first URL in its worker
+    configs = [DownloadConfig([mock_server.video_url("small", n) for n in range(first, first + 3)], tmp_path,
+                              mode="video", max_workers=1, min_free_space=0) for first in (0, 10)]
+    runners = [threading.Thread(target=engine.run, args=(config,), daemon=True) for config in configs]
+    for runner in runners:
+        runner.start()
+    try:
+        for _ in range(100):
+            if "\nrth_queued_items 4" in engine.metrics.render():
+                break
+            runners[0].join(0.05)
+        assert "\nrth_queued_items 4" in engine.metrics.render()
+    finally:
+        engine.download_slots.release()
+    for runner in runners:
+        runner.join(60)
+    assert "\nrth_queued_items 0" in engine.metrics.render()
+
+
+def test_paged_playlist_is_read_page_by_page():
+    fetched = []
+
+    def page(number):
+        fetched.append(number)
+        return [{'_type': 'url', 'url': f"https://example.com/v/{number}-{n}"} for n in range(3)]
+
+    entries = iter_playlist_entries({'_type': 'playlist', 'entries': OnDemandPagedList(page, 3)})
+    assert next(entries)['url'] == "https://example.com/v/0-0"
+    assert fetched == [0]
+    next(entries), next(entries), next(entries)
+    assert fetched == [0, 1]
+
+
+@pytest.mark.parametrize('entry, url', [
+    ({'url': "dQw4w9WgXcQ", 'ie_key': 'Youtube'}, "https://www.youtube.com/watch?v=dQw4w9WgXcQ"),
+    ({'url': "https://example.com/v/1", 'ie_key': 'Generic'}, "https://example.com/v/1"),
+    ({'url': "abc", 'webpage_url': "https://example.com/v/abc"}, "https://example.com/v/abc"),
+    ({'url': "abc", 'ie_key': 'Unknown'}, "abc"),
+    ({}, None),
+])
+def test_entry_url(entry, url):
+    assert entry_url(entry) == url
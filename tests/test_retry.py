@@ -0,0 +1,83 @@
+import hashlib
+import threading
+
+import pytest
+
+from fault_server import FaultInjectingServer
+from rth_downloader.config import DownloadConfig
+from rth_downloader.engine import DownloadEngine
+from rth_downloader.retry import RetryPolicy
+
+SIZE = 1024 ** 2
+
+
+@pytest.fixture
+def fault_server(monkeypatch, ffmpeg):
+    monkeypatch.setattr(RetryPolicy, 'delay', lambda self, attempt: 0.05)
+    server = FaultInjectingServer()
+    server.add_video_profile("small", SIZE)
+    server.add_video_profile("flaky", SIZE)
+    with server:
+        yield server
+
+
+def download(app_dir, tmp_path, url, retries=3):
+    output = tmp_path / "out"
+    output.mkdir(exist_ok=True)
+    config = DownloadConfig([url], output, mode="video", retries=retries, min_free_space=0)
+    [record] = DownloadEngine(app_data_dir=app_dir).run(config).records
+    return record
+
+
+@pytest.mark.parametrize('status', [500, 503])
+def test_server_errors_are_retried(app_dir, tmp_path, fault_server, status):
+    fault_server.add_fault("small_1", status=status, count=2)
+    record = download(app_dir, tmp_path, fault_server.video_url("small", 1))
+    assert (record.status, record.attempts) == ('done', 3)
+
+
+def test_server_errors_give_up_after_retries(app_dir, tmp_path, fault_server):
+    fault_server.add_fault("small_1", status=503, count=9)
+    record = download(app_dir, tmp_path, fault_server.video_url("small", 1), retries=2)
+    assert (record.status, record.attempts, record.error_class) == ('failed', 3, 'network')
+
+
+def test_rate_limit_with_retry_after_is_retried(app_dir, tmp_path, fault_server):
+    fault_server.add_fault("small_2", status=429, retry_after=1)
+    record = download(app_dir, tmp_path, fault_server.video_url("small", 2))
+    assert (record.status, record.attempts) == ('done', 2)
+
+
+def test_not_found_is_not_retried(app_dir, tmp_path, fault_server):
+    fault_server.add_fault("small_3", status=404, count=9)
+    record = download(app_dir, tmp_path, fault_server.video_url("small", 3))
+    assert (record.status, record.attempts, record.error_class) == ('failed', 1, 'unavailable')
+
+
+def test_reset_media_stream_resumes(app_dir, tmp_path, fault_server):
+    fault_server.add_fault("flaky.mp4", reset_after=SIZE // 2)
+    record = download(app_dir, tmp_path, fault_server.video_url("flaky", 1))
+    assert record.status == 'done'
+    starts = fault_server.range_starts["flaky.mp4"]
+    assert starts[0] == 0 and starts[-1] > 0, "the second request did not resume from the .part file"
+    source = (fault_server.media_dir / "flaky.mp4").read_bytes()
+    assert hashlib.sha256(open(record.path, 'rb').read()).digest() == hashlib.sha256(source).digest()
+
+
+def test_retry_wait_frees_the_download_slot(app_dir, tmp_path, fault_server, monkeypatch):
+    monkeypatch.setattr(RetryPolicy, 'delay', lambda self, attempt: 1.0)
+    fault_server.add_fault("small_1", status=503)
+    engine = DownloadEngine(app_data_dir=app_dir)
+    engine.download_slots = threading.BoundedSemaphore(1)
+    urls = [fault_server.video_url("small", n) for n in (1, 2)]
+    config = DownloadConfig(urls, tmp_path / "out", mode="video", max_workers=2, per_host_limit=1,
+                            min_free_space=0, priorities={urls[0]: 1})
+    result = engine.run(config)
+    assert [record.url for record in result.records] == [urls[1], urls[0]], "the retrying item kept its slot"
+    assert engine.download_slots.acquire(blocking=False)
+
+
+def test_batches_share_the_global_backoff(app_dir):
+    engine = DownloadEngine(app_data_dir=app_dir)
+    pause = [engine.backoff.rate_limited() for _ in range(engine.backoff.threshold)][-1]
+    assert pause > 0 and engine.backoff.remaining() > 0
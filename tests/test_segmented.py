@@ -0,0 +1,52 @@
+import hashlib
+import threading
+import time
+
+import pytest
+import yt_dlp
+
+from mock_server import MockMediaServer
+from rth_downloader.segmented import SegmentedDownloader, SegmentedDownloadPP
+
+SIZE = 2 * 1024 ** 2
+
+
+@pytest.fixture
+def media_server():
+    server = MockMediaServer()
+    server.add_video_profile("large", SIZE)
+    with server:
+        yield server
+
+
+def test_segments_download_in_parallel_with_a_slow_callback(tmp_path, media_server):
+    active = {'now': 0, 'max': 0}
+    lock = threading.Lock()
+
+    def slow_callback(downloaded, total, speed, eta):
+        with lock:
+            active['now'] += 1
+            active['max'] = max(active['max'], active['now'])
+        time.sleep(0.02)  # e.g. a bandwidth limit sleeping in the progress hook
+        with lock:
+            active['now'] -= 1
+
+    dest = tmp_path / "large.mp4"
+    downloader = SegmentedDownloader(4, segment_size=256 * 1024, progress_callback=slow_callback)
+    assert downloader.download(f"{media_server.base_url}/media/large.mp4", dest) == SIZE
+    assert active['max'] > 1
+    source = (media_server.media_dir / "large.mp4").read_bytes()
+    assert hashlib.sha256(dest.read_bytes()).digest() == hashlib.sha256(source).digest()
+
+
+@pytest.mark.parametrize('params, headers', [
+    ({'proxy': 'http://127.0.0.1:9'}, {}),
+    ({}, {'Cookie': 'session=1'}),
+])
+def test_proxy_or_cookies_leave_the_download_to_yt_dlp(tmp_path, media_server, params, headers):
+    info = {'id': 'large_1', 'title': 'large', 'ext': 'mp4', 'protocol': 'http', 'filesize': SIZE,
+            'url': f"{media_server.base_url}/media/large.mp4", 'http_headers': headers}
+    with yt_dlp.YoutubeDL(dict(params, quiet=True, outtmpl=str(tmp_path / '%(title)s.%(ext)s'))) as ydl:
+        SegmentedDownloadPP(4, min_size=1, downloader=ydl).run(info)
+    assert media_server.media_requests == {}
+    assert list(tmp_path.iterdir()) == []
@@ -0,0 +1,42 @@
+import socket
+import ssl
+import urllib.request
+
+import yt_dlp
+
+from rth_downloader.session import DownloadSession, _hooks
+
+
+def test_hooks_are_installed_once_and_undone():
+    before = (socket.getaddrinfo, ssl.SSLContext.wrap_socket)
+    sessions = [DownloadSession() for _ in range(3)]
+    wrap_socket = ssl.SSLContext.wrap_socket
+    assert socket.getaddrinfo == _hooks.getaddrinfo
+    sessions[0].close()
+    sessions[0].close()
+    assert ssl.SSLContext.wrap_socket is wrap_socket, "the TLS timer was wrapped again"
+    for session in sessions[1:]:
+        session.close()
+    assert (socket.getaddrinfo, ssl.SSLContext.wrap_socket) == before
+
+
+def test_only_session_requests_are_counted(mock_server):
+    url = f"http://localhost:{mock_server.base_url.rsplit(':', 1)[1]}/media/small.mp4"
+    session = DownloadSession()
+    try:
+        socket.getaddrinfo("localhost", 80)
+        with urllib.request.urlopen(url) as response:
+            response.read()
+        assert session.stats.snapshot()['connections'] == 0
+
+        with yt_dlp.YoutubeDL({'quiet': True}) as ydl:
+            session.attach(ydl)
+            try:
+                with ydl.urlopen(url) as response:
+                    response.read()
+            finally:
+                session.detach(ydl)
+        stats = session.stats.snapshot()
+        assert (stats['requests'], stats['dns_misses']) == (1, 1)
+    finally:
+        session.close()
@@ -0,0 +1,25 @@
+import subprocess
+import sys
+
+import pytest
+
+from bench_startup import CHILD_CODE, REPO_DIR, eager_modules
+
+HEADLESS_FORBIDDEN = ('yt_dlp', 'tkinter', 'PIL')
+
+
+def imported_modules(code):
+    """The module names loaded by running code in a fresh interpreter."""
+    code += "; import sys; print('\\n'.join(sys.modules))"
+    proc = subprocess.run([sys.executable, '-c', code], cwd=REPO_DIR, capture_output=True, text=True, check=True)
+    return proc.stdout.split()
+
+
+def test_package_import_loads_no_heavy_modules():
+    assert eager_modules(imported_modules("import rth_downloader"), HEADLESS_FORBIDDEN) == []
+
+
+def test_gui_module_defers_heavy_imports():
+    # Import time itself is left to benchmarks/bench_startup.py: a wall-clock budget is flaky on shared machines.
+    pytest.importorskip('tkinter')
+    assert eager_modules(imported_modules(CHILD_CODE)) == []
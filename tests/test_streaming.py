@@ -0,0 +1,82 @@
+import hashlib
+
+import pytest
+import yt_dlp
+
+from mock_server import MockMediaServer
+from rth_downloader.config import DownloadConfig
+from rth_downloader.engine import DownloadEngine
+from rth_downloader.planner import plan_audio_job
+from rth_downloader.storage import OutputManager
+from rth_downloader.streaming import StreamingError, StreamingTranscoder
+
+
+@pytest.fixture
+def audio_server(ffmpeg):
+    server = MockMediaServer()
+    server.add_audio_profile("audio", ffmpeg, duration=20)
+    with server:
+        yield server
+
+
+def stream_job(folder):
+    job = plan_audio_job(folder / "track.m4a", 'mp4a.40.2', 'mp3', '128k')
+    job['inputs'] = ['-']
+    return job
+
+
+def test_audio_is_encoded_while_downloading(app_dir, tmp_path, audio_server):
+    output = tmp_path / "out"
+    output.mkdir()
+    config = DownloadConfig([audio_server.video_url("audio", 1)], output, stream_audio=True, min_free_space=0)
+    [record] = DownloadEngine(app_data_dir=app_dir).run(config).records
+
+    assert (record.status, record.pipeline) == ('done', 'stream')
+    assert record.downloaded_bytes == (audio_server.media_dir / "audio.m4a").stat().st_size
+    assert [path.name for path in output.iterdir()] == ["Mock audio_1.mp3"]
+    assert audio_server.media_requests == {'audio.m4a': 1}
+
+
+def test_streaming_is_off_by_default(app_dir, tmp_path, audio_server):
+    output = tmp_path / "out"
+    output.mkdir()
+    config = DownloadConfig([audio_server.video_url("audio", 1)], output, min_free_space=0)
+    [record] = DownloadEngine(app_data_dir=app_dir).run(config).records
+    assert (record.status, record.pipeline) == ('done', 'encode')
+
+
+def test_missing_ffmpeg_raises_streaming_error(tmp_path, audio_server):
+    job = stream_job(tmp_path)
+    with yt_dlp.YoutubeDL({'quiet': True}) as ydl:
+        streamer = StreamingTranscoder(str(tmp_path / "no-ffmpeg"), ydl.urlopen)
+        with pytest.raises(StreamingError, match="Cannot start FFmpeg"):
+            streamer.transcode(f"{audio_server.base_url}/media/audio.m4a", job, ext='m4a')
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_stream_hash_matches_the_source(tmp_path, ffmpeg, audio_server):
+    job = stream_job(tmp_path)
+    with yt_dlp.YoutubeDL({'quiet': True}) as ydl:
+        stats = StreamingTranscoder(ffmpeg, ydl.urlopen).transcode(f"{audio_server.base_url}/media/audio.m4a", job,
+                                                                   ext='m4a')
+    source = (audio_server.media_dir / "audio.m4a").read_bytes()
+    assert stats['sha256'] == hashlib.sha256(source + b'\0').hexdigest()
+    assert (tmp_path / "track.mp3").stat().st_size > 0
+
+
+@pytest.mark.parametrize('stream', [True, False])
+def test_streamed_audio_reserves_no_raw_download(app_dir, tmp_path, audio_server, monkeypatch, stream):
+    reservations = []
+    reserve = OutputManager.reserve
+
+    def record(manager, key, scratch_bytes, output_bytes, on_wait=None):
+        reservations.append(scratch_bytes)
+        return reserve(manager, key, scratch_bytes, output_bytes, on_wait)
+
+    monkeypatch.setattr(OutputManager, 'reserve', record)
+    config = DownloadConfig([audio_server.video_url("audio", 1)], tmp_path / "out", quality='128k', stream_audio=stream,
+                            min_free_space=0)
+    DownloadEngine(app_data_dir=app_dir).run(config)
+    # Streamed, only the 20 s of 128 kbit/s MP3 lands on the scratch volume, not the raw M4A.
+    raw_size = (audio_server.media_dir / "audio.m4a").stat().st_size
+    assert reservations == ([20 * 128 * 125] if stream else [raw_size])
@@ -0,0 +1,45 @@
+import pytest
+
+from rth_downloader.urls import canonicalize_url, extract_urls, normalize_urls
+
+
+@pytest.mark.parametrize('url, canonical', [
+    ("https://youtu.be/dQw4w9WgXcQ?si=abc&t=42", "https://www.youtube.com/watch?v=dQw4w9WgXcQ&t=42"),
+    ("m.youtube.com/shorts/dQw4w9WgXcQ?feature=share", "https://www.youtube.com/watch?v=dQw4w9WgXcQ"),
+    ("https://www.youtube.com/@channel/videos?app=desktop", "https://www.youtube.com/@channel/videos"),
+    ("https://soundcloud.com/artist/track?si=1&utm_source=x", "https://soundcloud.com/artist/track"),
+    ("https://example.com/v?id=1&fbclid=2", "https://example.com/v?id=1"),
+    # Generic names are only tracking on the sites known to use them that way.
+    ("https://example.com/watch?app=player&ref=main&pp=2&si=3",
+     "https://example.com/watch?app=player&ref=main&pp=2&si=3"),
+])
+def test_tracking_params(url, canonical):
+    assert canonicalize_url(url) == canonical
+
+
+@pytest.mark.parametrize('url, canonical', [
+    ("https://en.wikipedia.org/wiki/Python_(programming_language)",
+     "https://en.wikipedia.org/wiki/Python_(programming_language)"),
+    ("https://en.wikipedia.org/wiki/Python_(programming_language))",
+     "https://en.wikipedia.org/wiki/Python_(programming_language)"),
+    ("https://example.com/a/[1]", "https://example.com/a/[1]"),
+    ("https://example.com/video].", "https://example.com/video"),
+    ("https://example.com/video.", "https://example.com/video"),
+])
+def test_trailing_punctuation(url, canonical):
+    assert canonicalize_url(url) == canonical
+
+
+@pytest.mark.parametrize('url, canonical', [
+    ("https://example.com/v?a&b=&c=1&utm_source=x", "https://example.com/v?a&b=&c=1"),
+    ("https://example.com/search?q=a%20b+c", "https://example.com/search?q=a%20b+c"),
+    ("https://example.com/app#/video/42?utm_source=x", "https://example.com/app#/video/42?utm_source=x"),
+    ("https://youtu.be/dQw4w9WgXcQ#t=10", "https://www.youtube.com/watch?v=dQw4w9WgXcQ"),
+])
+def test_other_parameters_and_fragments_are_kept(url, canonical):
+    assert canonicalize_url(url) == canonical
+
+
+def test_urls_in_prose_are_deduplicated():
+    text = "Watch (https://youtu.be/dQw4w9WgXcQ) or https://www.youtube.com/watch?v=dQw4w9WgXcQ&si=x."
+    assert normalize_urls(extract_urls(text)) == (["https://www.youtube.com/watch?v=dQw4w9WgXcQ"], 1)